@@ -0,0 +1,127 @@
+"""
+Job view and application counters behind the institution analytics dashboard.
+
+Views are counted in memory and written in batches by flush(), because a job detail
+request must not pay for an UPDATE. Only audience views count: job seekers and other users
+opening an active job, not its poster or admins. Applications (and their deletions) are
+written once their transaction commits, one UPDATE for all the applications a request (or
+deferred_signals() block) made or deleted.
+"""
+
+import atexit
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from main.deferred import defer
+from main.tasks import submit
+from .models import Job, JobDailyStats
+from .permissions import ahas_institution_role, has_institution_role
+
+_views = Counter()
+_lock = threading.Lock()
+_timer = None
+
+
+def is_audience_view(user, job):
+    """
+    Whether user opening job counts as a view: not its poster and not an admin.
+    """
+    return job.posted_by_id != user.id and user.role != 'admin' and not has_institution_role(user, 'admin')
+
+
+async def ais_audience_view(user, job):
+    return job.posted_by_id != user.id and user.role != 'admin' and not await ahas_institution_role(user, 'admin')
+
+
+def record_view(job_id):
+    """
+    Count a job view. Pending views are written once JOB_VIEW_BATCH_SIZE distinct jobs
+    have been viewed, and at the latest JOB_VIEW_FLUSH_INTERVAL seconds after the first of them.
+    """
+    global _timer
+    with _lock:
+        _views[job_id] += 1
+        due = len(_views) >= settings.JOB_VIEW_BATCH_SIZE
+        if not due and _timer is None:
+            # A timer rather than the next view, so a quiet worker still writes its views
+            _timer = threading.Timer(settings.JOB_VIEW_FLUSH_INTERVAL, submit, (flush,))
+            _timer.daemon = True
+            _timer.start()
+    if due:
+        # Not tied to a transaction, and also called from the async job detail view
+        submit(flush)
+
+
+def flush():
+    """
+    Write all pending views; returns how many were written.
+    """
+    global _views, _timer
+    with _lock:
+        views, _views = _views, Counter()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if views:
+        add_counts(views, 'views')
+    return sum(views.values())
+
+
+def record_application(job_id):
+    defer(add_application_counts, job_id, 1, merge=int.__add__)
+
+
+def add_application_counts(counts):
+    add_counts(counts, 'applications')
+
+
+def forget_application(job_id):
+    defer(subtract_application_counts, job_id, 1, merge=int.__add__)
+
+
+def subtract_application_counts(counts):
+    """
+    Take {job_id: count} off Job.applications_count in one UPDATE. Jobs deleted along with
+    their applications are already gone. The daily rollup keeps the applications; they
+    were received that day.
+    """
+    Job.objects.filter(id__in=list(counts)).update(
+        applications_count=Greatest(F('applications_count') - _increments(counts, 'id'), Value(0))
+    )
+
+
+def _increments(counts, key):
+    return Case(*[When(**{key: pk}, then=Value(count)) for pk, count in counts.items()], default=Value(0))
+
+
+@transaction.atomic
+def add_counts(counts, field):
+    """
+    Add {job_id: count} to Job.<field>_count and today's JobDailyStats.<field>,
+    in one UPDATE per table however many jobs are involved.
+    """
+    # Jobs deleted since the event was counted are skipped
+    job_ids = list(Job.objects.filter(id__in=list(counts)).values_list('id', flat=True))
+    if not job_ids:
+        return
+    counts = {job_id: counts[job_id] for job_id in job_ids}
+    today = timezone.localdate()
+
+    Job.objects.filter(id__in=job_ids).update(
+        **{f'{field}_count': F(f'{field}_count') + _increments(counts, 'id')}
+    )
+    JobDailyStats.objects.bulk_create(
+        [JobDailyStats(job_id=job_id, date=today) for job_id in job_ids], ignore_conflicts=True
+    )
+    JobDailyStats.objects.filter(job_id__in=job_ids, date=today).update(
+        **{field: F(field) + _increments(counts, 'job_id')}
+    )
+
+
+atexit.register(flush)
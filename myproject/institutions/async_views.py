@@ -0,0 +1,37 @@
+from django.http import JsonResponse
+from rest_framework.exceptions import NotFound, PermissionDenied
+
+from main.async_views import async_api_view, paginate
+from . import analytics
+from .models import Job
+from .permissions import acan_read_job, ahas_institution_role
+from .serializers import JobSerializer
+from .views import filter_jobs
+
+# Everything JobSerializer reads, so serializing never queries
+JOB_RELATIONS = ('institution', 'posted_by__userprofile')
+
+
+@async_api_view
+async def job_list(request):
+    # IsInstitutionCompany
+    if not await ahas_institution_role(request.user, 'company'):
+        raise PermissionDenied()
+
+    jobs = filter_jobs(Job.objects.select_related(*JOB_RELATIONS), request.GET)
+    return JsonResponse(await paginate(request, jobs, JobSerializer))
+
+
+@async_api_view
+async def job_detail(request, pk):
+    job = await Job.objects.select_related(*JOB_RELATIONS).filter(pk=pk).afirst()
+    if job is None:
+        raise NotFound('No Job matches the given query.')
+
+    # IsJobOwnerOrAdminOrReadOnly
+    if not await acan_read_job(request.user, job):
+        raise PermissionDenied()
+
+    if await analytics.ais_audience_view(request.user, job):
+        analytics.record_view(job.id)
+    return JsonResponse(JobSerializer(job, context={'request': request}).data)
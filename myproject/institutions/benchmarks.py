@@ -0,0 +1,127 @@
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.exceptions import ValidationError
+
+from main.benchmarking import BenchmarkTestCase
+from main.models import CustomUser, UserProfile
+from .models import Institution, InstitutionMember, Job, JobApplication
+from .permissions import (
+    IsInstitutionAdmin, IsInstitutionCompany,
+    IsInstitutionMember, IsJobOwnerOrAdmin,
+    IsApplicationOwnerOrJobPoster
+)
+from .serializers import JobApplicationSerializer
+
+
+class InstitutionsBenchmarkData:
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = CustomUser.objects.create(username='employer', email='employer@example.com', role='employer')
+        cls.seeker = CustomUser.objects.create(username='seeker', email='seeker@example.com', role='job_seeker')
+        cls.institution = Institution.objects.bulk_create([Institution(name='Bench Institution')])[0]
+        InstitutionMember.objects.bulk_create([
+            InstitutionMember(user=cls.employer, institution=cls.institution, role='company'),
+            InstitutionMember(user=cls.seeker, institution=cls.institution, role='job_seeker'),
+        ])
+        cls.job = Job.objects.bulk_create([Job(
+            title='Backend Engineer', description='Bench', job_type='full_time',
+            institution=cls.institution, posted_by=cls.employer,
+        )])[0]
+        cls.application = JobApplication.objects.bulk_create([
+            JobApplication(job=cls.job, user=cls.seeker)
+        ])[0]
+
+    def make_request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+
+class PermissionBenchmark(InstitutionsBenchmarkData, BenchmarkTestCase):
+    def test_has_permission(self):
+        request = self.make_request(self.employer)
+        for permission_class in (IsInstitutionAdmin, IsInstitutionCompany):
+            permission = permission_class()
+            self.benchmark(f'{permission_class.__name__}.has_permission',
+                           lambda: permission.has_permission(request, None), max_queries=1)
+
+    def test_has_object_permission(self):
+        request = self.make_request(self.seeker)
+        # A fresh instance per call mirrors get_object(): foreign keys are loaded, related rows are not.
+        # The requester owns neither object, so every branch of each check is evaluated.
+        job = lambda: Job(id=self.job.id, institution_id=self.institution.id, posted_by_id=self.employer.id)
+        application = lambda: JobApplication(id=self.application.id, job_id=self.job.id, user_id=self.employer.id)
+        cases = (
+            (IsInstitutionMember, job),
+            (IsJobOwnerOrAdmin, job),
+            (IsApplicationOwnerOrJobPoster, application),
+        )
+        for permission_class, make_obj in cases:
+            permission = permission_class()
+            self.benchmark(
+                f'{permission_class.__name__}.has_object_permission',
+                lambda: permission.has_object_permission(request, None, make_obj()),
+                max_queries=4,
+            )
+
+
+class JobApplicationSerializerBenchmark(BenchmarkTestCase):
+    ROW_COUNTS = (1, 10, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        employer = CustomUser.objects.create(username='employer', email='employer@example.com', role='employer')
+        institution = Institution.objects.bulk_create([Institution(name='Bench Institution')])[0]
+        job = Job.objects.bulk_create([Job(
+            title='Backend Engineer', description='Bench', job_type='full_time',
+            institution=institution, posted_by=employer,
+        )])[0]
+        seekers = CustomUser.objects.bulk_create([
+            CustomUser(username=f'seeker-{i}', email=f'seeker{i}@example.com', role='job_seeker')
+            for i in range(max(cls.ROW_COUNTS))
+        ])
+        # The employer got its profile from the post_save signal; bulk_create skips signals
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in seekers])
+        JobApplication.objects.bulk_create([JobApplication(job=job, user=user) for user in seekers])
+
+    def test_serialize_list(self):
+        request = RequestFactory().get('/api/institutions/job-applications/')
+        request.user = CustomUser.objects.get(email='employer@example.com')
+
+        for count in self.ROW_COUNTS:
+            def serialize():
+                applications = JobApplication.objects.all()[:count]
+                return JobApplicationSerializer(applications, many=True, context={'request': request}).data
+
+            result = self.benchmark(f'JobApplicationSerializer[{count} rows]', serialize)
+            self.assertGreater(result.queries_per_op, 0)
+
+
+class JobApplicationCreateBenchmark(InstitutionsBenchmarkData, BenchmarkTestCase):
+    """
+    The apply path: accepted applications insert without a uniqueness SELECT first,
+    and duplicates are turned away by the unique constraint.
+    """
+
+    def apply(self, user, job):
+        request = self.make_request(user)
+        serializer = JobApplicationSerializer(data={'job_id': job.id}, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(user=user)
+
+    def test_create(self):
+        applicant = CustomUser.objects.create(username='applicant', email='applicant@example.com', role='job_seeker')
+
+        def apply_and_roll_back():
+            with transaction.atomic():
+                self.apply(applicant, self.job)
+                transaction.set_rollback(True)
+
+        self.benchmark('JobApplicationSerializer.create', apply_and_roll_back)
+
+    def test_duplicate(self):
+        def apply_again():
+            with self.assertRaises(ValidationError):
+                self.apply(self.seeker, self.job)
+
+        self.benchmark('JobApplicationSerializer.create[duplicate]', apply_again)
@@ -0,0 +1,210 @@
+"""
+Location lookup for jobs and institutions without a GIS database.
+
+Free-text locations are matched against a small local gazetteer, and jobs store the
+coordinates plus a geohash. Radius and bounding-box searches first narrow rows with
+geohash prefix ranges, which an ordinary B-tree index serves. They then apply the exact
+latitude/longitude bounds and the haversine distance.
+"""
+
+import math
+import re
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+
+GEOHASH_PRECISION = 7  # cells of roughly 150m x 150m
+MAX_COVER_CELLS = 16
+EARTH_RADIUS_KM = 6371.0
+MAX_RADIUS_KM = 500
+
+# Place name -> (latitude, longitude)
+GAZETTEER = {
+    'kathmandu': (27.7172, 85.3240),
+    'lalitpur': (27.6588, 85.3247),
+    'bhaktapur': (27.6710, 85.4298),
+    'kirtipur': (27.6787, 85.2775),
+    'pokhara': (28.2096, 83.9856),
+    'biratnagar': (26.4525, 87.2718),
+    'birgunj': (27.0104, 84.8770),
+    'bharatpur': (27.6833, 84.4333),
+    'butwal': (27.7006, 83.4484),
+    'bhairahawa': (27.5057, 83.4540),
+    'dharan': (26.8065, 87.2846),
+    'itahari': (26.6646, 87.2718),
+    'hetauda': (27.4284, 85.0322),
+    'janakpur': (26.7288, 85.9263),
+    'nepalgunj': (28.0500, 81.6167),
+    'dhangadhi': (28.6833, 80.6000),
+    'damak': (26.6588, 87.7024),
+    'birtamod': (26.6433, 87.9894),
+    'tansen': (27.8670, 83.5466),
+    'gorkha': (28.0000, 84.6333),
+}
+
+ALIASES = {
+    'ktm': 'kathmandu',
+    'kathmandu valley': 'kathmandu',
+    'patan': 'lalitpur',
+    'bhaktpur': 'bhaktapur',
+    'chitwan': 'bharatpur',
+    'siddharthanagar': 'bhairahawa',
+    'janakpurdham': 'janakpur',
+    'birganj': 'birgunj',
+    'nepalganj': 'nepalgunj',
+}
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def normalize_location(text):
+    """
+    Lowercase, drop punctuation and collapse whitespace: " Kathmandu,  Nepal " -> "kathmandu nepal".
+    """
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', text or '')).strip().lower()
+
+
+def geocode(text):
+    """
+    (latitude, longitude) of the first gazetteer place named in text, or None.
+    Tries each comma-separated part, so "Baneshwor, Kathmandu" resolves to Kathmandu.
+    """
+    for part in (text or '').split(','):
+        place = normalize_location(part)
+        place = ALIASES.get(place, place)
+        if place in GAZETTEER:
+            return GAZETTEER[place]
+        # "Kathmandu Nepal", "Pokhara-17"
+        for word in place.split():
+            word = ALIASES.get(word, word)
+            if word in GAZETTEER:
+                return GAZETTEER[word]
+    return None
+
+
+def geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, span = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (span[0] + span[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            span[0] = mid
+        else:
+            span[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """
+    (height, width) in degrees of a geohash cell.
+    """
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def covering_cells(south, west, north, east):
+    """
+    The geohash prefixes covering the box, at the finest precision that needs at most
+    MAX_COVER_CELLS, or None when even single-character cells need more (a continent-sized box).
+    """
+    cells = None
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = cell_size(precision)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        columns = math.floor(east / width) - math.floor(west / width) + 1
+        if rows * columns > MAX_COVER_CELLS:
+            break
+        cells = {
+            geohash(min(south + row * height, north), min(west + column * width, east), precision)
+            for row in range(rows) for column in range(columns)
+        }
+    return cells
+
+
+def bounding_box(latitude, longitude, radius_km):
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lng_delta = math.degrees(radius_km / EARTH_RADIUS_KM / max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - lat_delta, longitude - lng_delta, latitude + lat_delta, longitude + lng_delta
+
+
+def within_box(queryset, south, west, north, east):
+    cells = covering_cells(south, west, north, east)
+    if cells is not None:
+        prefixes = Q()
+        for cell in cells:
+            # A prefix match written as a range, so a plain index on geohash serves it on every
+            # backend and collation ("z" is the last geohash character)
+            prefixes |= Q(geohash__range=(cell, cell.ljust(GEOHASH_PRECISION, 'z')))
+        queryset = queryset.filter(prefixes)
+    return queryset.filter(latitude__range=(south, north), longitude__range=(west, east))
+
+
+def distance_km(latitude, longitude):
+    """
+    Haversine distance from the point to the row's latitude/longitude, as a query expression.
+    """
+    lat1, lat2 = Radians(Value(latitude)), Radians(F('latitude'))
+    half_dlat = (lat2 - lat1) / 2
+    half_dlng = (Radians(F('longitude')) - Radians(Value(longitude))) / 2
+    a = Power(Sin(half_dlat), 2) + Cos(lat1) * Cos(lat2) * Power(Sin(half_dlng), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a, output_field=FloatField()))
+
+
+def parse_point(value):
+    """
+    "lat,lng" or a gazetteer place name -> (latitude, longitude).
+    """
+    parts = value.split(',')
+    if len(parts) == 2:
+        try:
+            latitude, longitude = float(parts[0]), float(parts[1])
+        except ValueError:
+            pass
+        else:
+            if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+                return latitude, longitude
+            raise ValidationError({'near': 'Coordinates out of range'})
+    point = geocode(value)
+    if point is None:
+        raise ValidationError({'near': f"Unknown place '{value}'; use a known city or 'lat,lng'"})
+    return point
+
+
+def filter_by_location(queryset, query_params):
+    """
+    Apply the near/radius_km and bbox job list filters. With near, jobs are ordered by distance.
+    """
+    bbox = query_params.get('bbox')
+    if bbox:
+        try:
+            west, south, east, north = (float(part) for part in bbox.split(','))
+        except ValueError:
+            raise ValidationError({'bbox': 'Use bbox=west,south,east,north in degrees'})
+        if south > north or west > east:
+            raise ValidationError({'bbox': 'south must not exceed north, nor west exceed east'})
+        queryset = within_box(queryset, south, west, north, east)
+
+    near = query_params.get('near')
+    if near:
+        latitude, longitude = parse_point(near)
+        try:
+            radius_km = float(query_params.get('radius_km', 10))
+        except ValueError:
+            raise ValidationError({'radius_km': 'Must be a number'})
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValidationError({'radius_km': f'Must be between 0 and {MAX_RADIUS_KM}'})
+        queryset = (within_box(queryset, *bounding_box(latitude, longitude, radius_km))
+                    .annotate(distance_km=distance_km(latitude, longitude))
+                    .filter(distance_km__lte=radius_km)
+                    .order_by('distance_km'))
+    return queryset
@@ -0,0 +1,84 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import Notification
+from institutions import stats
+from institutions.models import Job
+
+
+class Command(BaseCommand):
+    help = ('Deactivate active jobs whose expires_at has passed, in batches, and notify their posters. '
+            'Run from cron, or keep it running with --interval')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help='Seconds to pause between batches so other writers get the table')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running and sweep again every this many seconds')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the expired jobs')
+
+    def handle(self, *args, **options):
+        while True:
+            if options['dry_run']:
+                count = self.expired().count()
+                self.stdout.write(f"{count} active jobs have expired")
+            else:
+                count = self.sweep(options['batch_size'], options['sleep'])
+                self.stdout.write(self.style.SUCCESS(f"Expired {count} jobs"))
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def expired(self):
+        # Served by the (status, expires_at) index
+        return Job.objects.filter(status='active', expires_at__lte=timezone.now())
+
+    def sweep(self, batch_size, sleep):
+        expired = 0
+        while True:
+            count = self.expire_batch(batch_size)
+            expired += count
+            if count < batch_size:
+                return expired
+            if sleep:
+                time.sleep(sleep)
+
+    @transaction.atomic
+    def expire_batch(self, batch_size):
+        """
+        Deactivate up to batch_size expired jobs with one UPDATE, then write their
+        notifications with one INSERT and their stats moves with one UPDATE per institution.
+        """
+        # skip_locked lets concurrent sweepers (and job edits) pass each other; ignored on SQLite
+        jobs = list(
+            self.expired().select_for_update(skip_locked=True).order_by('expires_at')
+            .values('id', 'title', 'institution_id', 'posted_by_id')[:batch_size]
+        )
+        if not jobs:
+            return 0
+
+        # Signals do not fire for update(), so notifications and stats are written here
+        Job.objects.filter(id__in=[job['id'] for job in jobs]).update(status='inactive')
+
+        Notification.objects.bulk_create([
+            Notification(
+                recipient_id=job['posted_by_id'],
+                notification_type='job',
+                title="Job Expired",
+                message=f"Your job posting '{job['title']}' has expired and is no longer active.",
+                related_object_id=job['id'],
+                related_object_type='job'
+            )
+            for job in jobs if job['posted_by_id']
+        ])
+
+        per_institution = Counter(job['institution_id'] for job in jobs)
+        for institution_id, count in per_institution.items():
+            stats.adjust(institution_id, {stats.JOB_FIELDS['active']: -count, stats.JOB_FIELDS['inactive']: count})
+        return len(jobs)
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from institutions import geo
+from institutions.models import Institution, Job
+
+
+class Command(BaseCommand):
+    help = ('Fill latitude/longitude/geohash on institutions and jobs from their free-text location, '
+            'for rows saved before geocoding existed (or after the gazetteer grows, with --all)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to pause between job batches so other writers get the table')
+        parser.add_argument('--all', action='store_true', help='Re-geocode rows that already have coordinates')
+
+    def handle(self, *args, **options):
+        institutions = Institution.objects.all()
+        if not options['all']:
+            institutions = institutions.filter(latitude__isnull=True)
+        located = []
+        for institution in institutions.only('id', 'location').iterator(chunk_size=options['batch_size']):
+            point = geo.geocode(institution.location)
+            if point:
+                institution.latitude, institution.longitude = point
+                located.append(institution)
+        Institution.objects.bulk_update(located, ['latitude', 'longitude'], batch_size=options['batch_size'])
+        self.stdout.write(f"Located {len(located)} institutions")
+
+        points = {
+            institution_id: (latitude, longitude)
+            for institution_id, latitude, longitude in Institution.objects.filter(
+                latitude__isnull=False).values_list('id', 'latitude', 'longitude')
+        }
+        jobs = Job.objects.all()
+        if not options['all']:
+            jobs = jobs.filter(latitude__isnull=True)
+
+        # Keyset pagination: each batch is one indexed range scan however far in we are
+        last_id, total = 0, 0
+        while True:
+            batch = list(jobs.filter(id__gt=last_id).order_by('id')
+                         .only('id', 'location', 'institution_id')[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            located = []
+            for job in batch:
+                point = (geo.geocode(job.location) if job.location.strip()
+                         else points.get(job.institution_id))
+                if point:
+                    job.latitude, job.longitude = point
+                    job.geohash = geo.geohash(*point)
+                    located.append(job)
+            Job.objects.bulk_update(located, ['latitude', 'longitude', 'geohash'])
+            total += len(located)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Located {total} jobs"))
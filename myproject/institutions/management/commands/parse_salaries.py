@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from institutions import salary
+from institutions.models import Job
+
+SALARY_FIELDS = ['salary_min', 'salary_max', 'salary_currency', 'salary_period']
+
+
+class Command(BaseCommand):
+    help = ('Fill the salary_min/salary_max/salary_currency/salary_period columns from salary_range, '
+            'in batches, for jobs saved before they existed or after the parser or exchange rates change')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to pause between batches so other writers get the table')
+
+    def handle(self, *args, **options):
+        # Keyset pagination: each batch is one indexed range scan however far in we are
+        last_id, scanned, changed = 0, 0, 0
+        while True:
+            batch = list(Job.objects.filter(id__gt=last_id).order_by('id')
+                         .only('id', 'salary_range', *SALARY_FIELDS)[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            scanned += len(batch)
+
+            updated = []
+            # Distinct salary texts repeat a lot; parse each once per batch
+            parsed = {text: salary.fields(text) for text in {job.salary_range for job in batch}}
+            for job in batch:
+                values = parsed[job.salary_range]
+                if any(getattr(job, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(job, field, value)
+                    updated.append(job)
+            Job.objects.bulk_update(updated, SALARY_FIELDS)
+            changed += len(updated)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Parsed {scanned} jobs, updated {changed}"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from institutions import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute InstitutionStats from the member, job and application tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--institution', dest='institutions', type=int, action='append',
+                            help='Only rebuild this institution (repeatable)')
+
+    def handle(self, *args, **options):
+        count = stats.rebuild(options['institutions'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} institutions"))
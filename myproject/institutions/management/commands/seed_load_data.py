@@ -0,0 +1,204 @@
+import json
+import random
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.models import CustomUser, UserProfile, Notification
+from institutions.models import Institution, InstitutionMember, Job, JobApplication
+
+EMAIL_DOMAIN = 'loadtest.local'
+
+JOB_TITLES = [
+    'Backend Engineer', 'Frontend Developer', 'Data Analyst', 'DevOps Engineer', 'QA Engineer',
+    'Product Manager', 'Accountant', 'Sales Executive', 'Customer Support Officer', 'HR Officer',
+    'Graphic Designer', 'Content Writer', 'Marketing Officer', 'Network Administrator', 'Teacher',
+]
+LOCATIONS = [
+    'Kathmandu', 'Lalitpur', 'Bhaktapur', 'Pokhara', 'Biratnagar', 'Birgunj', 'Butwal',
+    'Dharan', 'Hetauda', 'Nepalgunj', 'Remote',
+]
+SALARY_RANGES = [
+    'NPR 30,000 - 45,000 per month', 'NPR 50,000 - 80,000 per month', 'NPR 80k-120k/month',
+    'Rs. 25000', 'USD 1,500 - 2,500 per month', 'Negotiable', '',
+]
+SKILLS = [
+    'Python', 'Django', 'JavaScript', 'React', 'SQL', 'PostgreSQL', 'Docker', 'AWS', 'Excel',
+    'Accounting', 'Communication', 'Figma', 'SEO', 'Linux', 'Java', 'Go',
+]
+NOTIFICATION_TYPES = [choice for choice, _ in Notification.NOTIFICATION_TYPES]
+
+
+class Command(BaseCommand):
+    help = 'Seed the database with realistic volumes of load-test data and write a manifest for locustfile.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seekers', type=int, default=1000)
+        parser.add_argument('--employers', type=int, default=100)
+        parser.add_argument('--admins', type=int, default=5)
+        parser.add_argument('--institutions', type=int, default=50)
+        parser.add_argument('--jobs', type=int, default=2000)
+        parser.add_argument('--applications', type=int, default=20000)
+        parser.add_argument('--notifications-per-user', type=int, default=20)
+        parser.add_argument('--password', default='loadtest-pass')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--manifest', default=str(settings.BASE_DIR / 'benchmarks' / 'manifest.json'))
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded load-test data first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        if options['clear']:
+            self.clear()
+
+        with transaction.atomic():
+            # Hash once; every seeded account shares the same password
+            password = make_password(options['password'])
+            seekers = self.create_users('seeker', options['seekers'], 'job_seeker', password, batch_size)
+            employers = self.create_users('employer', options['employers'], 'employer', password, batch_size)
+            admins = self.create_users('admin', options['admins'], 'admin', password, batch_size)
+            all_users = seekers + employers + admins
+
+            UserProfile.objects.bulk_create([
+                UserProfile(
+                    user=user,
+                    full_name=user.username.replace('-', ' ').title(),
+                    skills=rng.sample(SKILLS, rng.randint(2, 6)),
+                    experience=f'{rng.randint(0, 15)} years',
+                )
+                for user in all_users
+            ], batch_size=batch_size)
+
+            institutions = Institution.objects.bulk_create([
+                Institution(
+                    name=f'Loadtest Institution {i}',
+                    description='Seeded for load testing',
+                    location=rng.choice(LOCATIONS),
+                )
+                for i in range(options['institutions'])
+            ], batch_size=batch_size)
+
+            # Every employer is a company member of one institution so it may post and list jobs
+            employer_institution = {}
+            members = []
+            for employer in employers:
+                institution = rng.choice(institutions)
+                employer_institution[employer.id] = institution
+                members.append(InstitutionMember(user=employer, institution=institution, role='company'))
+            for institution in institutions:
+                admin = rng.choice(admins) if admins else None
+                if admin:
+                    members.append(InstitutionMember(user=admin, institution=institution, role='admin'))
+            InstitutionMember.objects.bulk_create(members, batch_size=batch_size, ignore_conflicts=True)
+
+            jobs = []
+            for _ in range(options['jobs']):
+                employer = rng.choice(employers)
+                jobs.append(Job(
+                    title=rng.choice(JOB_TITLES),
+                    description='Seeded job description. ' * rng.randint(5, 30),
+                    location=rng.choice(LOCATIONS),
+                    salary_range=rng.choice(SALARY_RANGES),
+                    job_type=rng.choice([choice for choice, _ in Job.JOB_TYPE_CHOICES]),
+                    status='active' if rng.random() < 0.8 else 'inactive',
+                    institution=employer_institution[employer.id],
+                    posted_by=employer,
+                ))
+            jobs = Job.objects.bulk_create(jobs, batch_size=batch_size)
+
+            pairs = set()
+            max_pairs = len(jobs) * len(seekers)
+            target = min(options['applications'], max_pairs)
+            while len(pairs) < target:
+                pairs.add((rng.randrange(len(jobs)), rng.randrange(len(seekers))))
+            JobApplication.objects.bulk_create([
+                JobApplication(
+                    job=jobs[job_index],
+                    user=seekers[seeker_index],
+                    cover_letter='I am interested in this position.',
+                    status=rng.choice([choice for choice, _ in JobApplication.STATUS_CHOICES]),
+                )
+                for job_index, seeker_index in pairs
+            ], batch_size=batch_size)
+            applications_per_job = Counter(job_index for job_index, _ in pairs)
+            for job_index, job in enumerate(jobs):
+                job.applications_count = applications_per_job[job_index]
+            Job.objects.bulk_update(jobs, ['applications_count'], batch_size=batch_size)
+
+            notifications = []
+            for user in all_users:
+                for _ in range(options['notifications_per_user']):
+                    notifications.append(Notification(
+                        recipient=user,
+                        notification_type=rng.choice(NOTIFICATION_TYPES),
+                        title='Seeded notification',
+                        message='Seeded for load testing.',
+                        is_read=rng.random() < 0.5,
+                    ))
+                if len(notifications) >= batch_size:
+                    Notification.objects.bulk_create(notifications, batch_size=batch_size)
+                    notifications = []
+            Notification.objects.bulk_create(notifications, batch_size=batch_size)
+
+        # bulk_create skips save() and signals; fill what they would have, as for pre-existing rows
+        backfill = {'stdout': self.stdout}
+        call_command('parse_salaries', batch_size=batch_size, **backfill)
+        call_command('geocode_locations', batch_size=batch_size, **backfill)
+        call_command('backfill_profile_skills', batch_size=batch_size, **backfill)
+        call_command('rebuild_institution_stats', institutions=[institution.id for institution in institutions],
+                     **backfill)
+
+        jobs_by_employer = defaultdict(list)
+        for job in jobs:
+            jobs_by_employer[job.posted_by_id].append(job.id)
+
+        manifest = {
+            'password': options['password'],
+            'seekers': [user.email for user in seekers],
+            'employers': [
+                {
+                    'email': user.email,
+                    'institution_id': employer_institution[user.id].id,
+                    'job_ids': jobs_by_employer[user.id],
+                }
+                for user in employers
+            ],
+            'admins': [user.email for user in admins],
+            'job_ids': [job.id for job in jobs],
+            'active_job_ids': [job.id for job in jobs if job.status == 'active'],
+            'user_ids': [user.id for user in all_users],
+        }
+        manifest_path = Path(options['manifest'])
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(all_users)} users, {len(institutions)} institutions, {len(jobs)} jobs, "
+            f"{len(pairs)} applications and {len(all_users) * options['notifications_per_user']} notifications. "
+            f"Manifest written to {manifest_path}"
+        ))
+
+    def create_users(self, prefix, count, role, password, batch_size):
+        users = [
+            CustomUser(
+                username=f'{prefix}-{i}',
+                email=f'{prefix}{i}@{EMAIL_DOMAIN}',
+                password=password,
+                role=role,
+                is_staff=role == 'admin',
+            )
+            for i in range(count)
+        ]
+        return CustomUser.objects.bulk_create(users, batch_size=batch_size)
+
+    def clear(self):
+        Institution.objects.filter(name__startswith='Loadtest Institution ').delete()
+        deleted, _ = CustomUser.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        self.stdout.write(f"Removed {deleted} previously seeded rows")
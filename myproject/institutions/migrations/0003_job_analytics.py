@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_application_counts(apps, schema_editor):
+    Job = apps.get_model('institutions', 'Job')
+    JobApplication = apps.get_model('institutions', 'JobApplication')
+    JobDailyStats = apps.get_model('institutions', 'JobDailyStats')
+
+    per_job = JobApplication.objects.filter(job=OuterRef('pk')).order_by().values('job').annotate(n=Count('id'))
+    Job.objects.update(applications_count=Coalesce(Subquery(per_job.values('n')), 0))
+
+    per_day = (JobApplication.objects.annotate(date=TruncDate('applied_at'))
+               .values('job_id', 'date').annotate(n=Count('id')).order_by())
+    JobDailyStats.objects.bulk_create(
+        (JobDailyStats(job_id=row['job_id'], date=row['date'], applications=row['n']) for row in per_day.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='applications_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='JobDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('applications', models.PositiveIntegerField(default=0)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='institutions.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='institution_date_4d2937_idx')],
+                'unique_together': {('job', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_application_counts, migrations.RunPython.noop),
+    ]
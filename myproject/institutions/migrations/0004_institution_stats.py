@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0003_job_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstitutionStats',
+            fields=[
+                ('institution', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='institutions.institution')),
+                ('admin_members', models.PositiveIntegerField(default=0)),
+                ('company_members', models.PositiveIntegerField(default=0)),
+                ('job_seeker_members', models.PositiveIntegerField(default=0)),
+                ('active_jobs', models.PositiveIntegerField(default=0)),
+                ('inactive_jobs', models.PositiveIntegerField(default=0)),
+                ('pending_applications', models.PositiveIntegerField(default=0)),
+                ('reviewed_applications', models.PositiveIntegerField(default=0)),
+                ('accepted_applications', models.PositiveIntegerField(default=0)),
+                ('rejected_applications', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:47
+
+from datetime import timedelta
+
+import institutions.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def expire_from_created_at(apps, schema_editor):
+    # Existing jobs get the TTL counted from when they were posted, so stale ones expire on the next run
+    Job = apps.get_model('institutions', 'Job')
+    Job.objects.update(expires_at=F('created_at') + timedelta(days=settings.JOB_DEFAULT_TTL_DAYS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0004_institution_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, default=institutions.models.default_job_expiry, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'expires_at'], name='institution_status_07e3f7_idx'),
+        ),
+        migrations.RunPython(expire_from_created_at, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,25 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from main.models import Notification
+from main.tracking import TrackedFieldsMixin
+from . import geo, salary
 
 
-class Institution(models.Model):
+class Institution(TrackedFieldsMixin, models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     location = models.CharField(max_length=255, blank=True)
+    # Geocoded from location on save (institutions.geo)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Jobs without a location of their own follow these (see save)
+    tracked_fields = ('latitude', 'longitude')
+
     class Meta:
         ordering = ['name']
         indexes = [models.Index(fields=['name'])]
@@ -18,7 +29,15 @@ class Institution(models.Model):
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
+        kwargs['update_fields'] = locate(self, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
+        if self.saved_changes:
+            # Move the jobs placed at the institution's old coordinates
+            point = (self.latitude, self.longitude) if self.latitude is not None else None
+            Job.objects.filter(institution_id=self.id, location__regex=r'^\s*$').update(
+                latitude=self.latitude, longitude=self.longitude,
+                geohash=geo.geohash(*point) if point else '',
+            )
         if is_new:
             Notification.create_admin_notification(
                 title="New Institution Created",
@@ -28,7 +47,7 @@ class Institution(models.Model):
             )
 
 
-class InstitutionMember(models.Model):
+class InstitutionMember(TrackedFieldsMixin, models.Model):
     ROLE_CHOICES = [
         ('admin', 'Admin'),
         ('company', 'Company'),
@@ -39,6 +58,9 @@ class InstitutionMember(models.Model):
     role = models.CharField(max_length=50, choices=ROLE_CHOICES)
     joined_at = models.DateTimeField(auto_now_add=True)
 
+    # Old values land in saved_changes on save (main.tracking)
+    tracked_fields = ('institution_id', 'role')
+
     class Meta:
         unique_together = ('user', 'institution')
         indexes = [models.Index(fields=['user', 'institution'])]
@@ -60,7 +82,47 @@ class InstitutionMember(models.Model):
             )
 
 
-class Job(models.Model):
+def locate(instance, update_fields):
+    """
+    Geocode instance.location into its latitude/longitude (and geohash, where the model has one)
+    when location is being saved. Returns update_fields widened to include the derived fields.
+    """
+    if update_fields is not None and 'location' not in update_fields:
+        return update_fields
+    point = geo.geocode(instance.location)
+    if not instance.location.strip() and isinstance(instance, Job) and instance.institution_id:
+        # A job without a location of its own is placed at its institution. One with a location
+        # the gazetteer does not know ("Remote", a village) is left without coordinates.
+        point = Institution.objects.filter(id=instance.institution_id).values_list(
+            'latitude', 'longitude').first()
+        if point and point[0] is None:
+            point = None
+    instance.latitude, instance.longitude = point or (None, None)
+    derived = ['latitude', 'longitude']
+    if isinstance(instance, Job):
+        instance.geohash = geo.geohash(*point) if point else ''
+        derived.append('geohash')
+    return None if update_fields is None else [*update_fields, *derived]
+
+
+def parse_salary(job, update_fields):
+    """
+    Fill the job's salary_* columns from salary_range when salary_range is being saved.
+    Returns update_fields widened to include them.
+    """
+    if update_fields is not None and 'salary_range' not in update_fields:
+        return update_fields
+    parsed = salary.fields(job.salary_range)
+    for field, value in parsed.items():
+        setattr(job, field, value)
+    return None if update_fields is None else [*update_fields, *parsed]
+
+
+def default_job_expiry():
+    return timezone.now() + timedelta(days=settings.JOB_DEFAULT_TTL_DAYS)
+
+
+class Job(TrackedFieldsMixin, models.Model):
     JOB_TYPE_CHOICES = [
         ('full_time', 'Full Time'),
         ('part_time', 'Part Time'),
@@ -74,18 +136,38 @@ class Job(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     location = models.CharField(max_length=255, blank=True)
+    # Geocoded from location (or the institution's) on save; geohash serves the radius/bbox filters
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)
     salary_range = models.CharField(max_length=100, blank=True)
+    # Parsed from salary_range on save (institutions.salary); min/max are NPR per month
+    salary_min = models.PositiveIntegerField(null=True, blank=True)
+    salary_max = models.PositiveIntegerField(null=True, blank=True)
+    salary_currency = models.CharField(max_length=3, blank=True)
+    salary_period = models.CharField(max_length=10, blank=True)
     job_type = models.CharField(max_length=50, choices=JOB_TYPE_CHOICES)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='active')
     institution = models.ForeignKey(Institution, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
     posted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True,
                                   related_name='posted_jobs')
     created_at = models.DateTimeField(auto_now_add=True)
+    # expire_jobs deactivates active jobs once this passes; null means the job never expires
+    expires_at = models.DateTimeField(default=default_job_expiry, null=True, blank=True)
+    # Denormalized counters maintained by institutions.analytics
+    views_count = models.PositiveIntegerField(default=0)
+    applications_count = models.PositiveIntegerField(default=0)
+
+    tracked_fields = ('institution_id', 'status')
 
     class Meta:
         indexes = [
             models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'expires_at']),
             models.Index(fields=['institution']),
+            models.Index(fields=['salary_min']),
+            models.Index(fields=['salary_max']),
+            models.Index(fields=['posted_by', 'created_at']),
         ]
         ordering = ['-created_at']
 
@@ -94,6 +176,7 @@ class Job(models.Model):
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
+        kwargs['update_fields'] = parse_salary(self, locate(self, kwargs.get('update_fields')))
         super().save(*args, **kwargs)
         if is_new and self.posted_by:
             Notification.create_notification(
@@ -106,7 +189,7 @@ class Job(models.Model):
             )
 
 
-class JobApplication(models.Model):
+class JobApplication(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('reviewed', 'Reviewed'),
@@ -119,16 +202,20 @@ class JobApplication(models.Model):
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='pending')
     applied_at = models.DateTimeField(auto_now_add=True)
 
+    tracked_fields = ('status',)
+
     class Meta:
         unique_together = ('job', 'user')
-        indexes = [models.Index(fields=['job', 'status'])]
+        indexes = [
+            models.Index(fields=['job', 'status']),
+            models.Index(fields=['user', 'applied_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.job.title} ({self.status})"
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
-        old_status = getattr(self, 'status', None) if not is_new else None
         super().save(*args, **kwargs)
         if is_new:
             Notification.create_notification(
@@ -140,15 +227,20 @@ class JobApplication(models.Model):
                 related_object_type='job_application'
             )
             if self.job.posted_by:
-                Notification.create_notification(
+                username, title = self.user.username, self.job.title
+                Notification.create_or_coalesce(
                     recipient=self.job.posted_by,
                     notification_type='job_application',
+                    group_key=f"job-applications:{self.job_id}",
                     title="New Job Application",
-                    message=f"{self.user.username} applied for your job '{self.job.title}'.",
+                    message=lambda count: (
+                        f"{username} applied for your job '{title}'." if count == 1
+                        else f"{count} new applications for '{title}', latest from {username}."
+                    ),
                     related_object_id=self.id,
                     related_object_type='job_application'
                 )
-        elif old_status != self.status:
+        elif 'status' in self.saved_changes:
             Notification.create_notification(
                 recipient=self.user,
                 notification_type='job_application',
@@ -157,3 +249,42 @@ class JobApplication(models.Model):
                 related_object_id=self.id,
                 related_object_type='job_application'
             )
+
+
+class JobDailyStats(models.Model):
+    """
+    Per-day rollup of job views and applications received, for the institution analytics dashboard.
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    applications = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('job', 'date')
+        indexes = [models.Index(fields=['date'])]
+
+    def __str__(self):
+        return f"{self.job_id} on {self.date}: {self.views} views, {self.applications} applications"
+
+
+class InstitutionStats(models.Model):
+    """
+    Dashboard counters for an institution, kept current by institutions.stats as members,
+    jobs and applications change, and rebuilt by `python manage.py rebuild_institution_stats`.
+    """
+    institution = models.OneToOneField(Institution, on_delete=models.CASCADE, primary_key=True,
+                                       related_name='stats')
+    admin_members = models.PositiveIntegerField(default=0)
+    company_members = models.PositiveIntegerField(default=0)
+    job_seeker_members = models.PositiveIntegerField(default=0)
+    active_jobs = models.PositiveIntegerField(default=0)
+    inactive_jobs = models.PositiveIntegerField(default=0)
+    pending_applications = models.PositiveIntegerField(default=0)
+    reviewed_applications = models.PositiveIntegerField(default=0)
+    accepted_applications = models.PositiveIntegerField(default=0)
+    rejected_applications = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for institution {self.institution_id}"
@@ -1,16 +1,62 @@
-from rest_framework.permissions import BasePermission
+from rest_framework.permissions import SAFE_METHODS, BasePermission
 from .models import InstitutionMember
 
+
+# Each check is a helper with a sync and an async variant, shared by the permission classes
+# below and the async views (institutions.async_views), so the two cannot drift apart.
+
+def _role_memberships(user, role):
+    return InstitutionMember.objects.filter(user_id=user.id, role=role)
+
+
+def has_institution_role(user, role):
+    """
+    Whether user is a member with role ('admin', 'company', ...) of any institution.
+    """
+    return user.is_authenticated and _role_memberships(user, role).exists()
+
+
+async def ahas_institution_role(user, role):
+    return user.is_authenticated and await _role_memberships(user, role).aexists()
+
+
+def is_job_owner_or_admin(user, job):
+    """
+    Whether user posted job or is an institution admin.
+    """
+    return user.is_authenticated and (job.posted_by_id == user.id or has_institution_role(user, 'admin'))
+
+
+async def ais_job_owner_or_admin(user, job):
+    return user.is_authenticated and (job.posted_by_id == user.id or await ahas_institution_role(user, 'admin'))
+
+
+def can_read_job(user, job):
+    """
+    Whether user may open job: any signed-in user while it is active, otherwise its poster or an admin.
+    """
+    return user.is_authenticated and (job.status == 'active' or is_job_owner_or_admin(user, job))
+
+
+async def acan_read_job(user, job):
+    return user.is_authenticated and (job.status == 'active' or await ais_job_owner_or_admin(user, job))
+
+
 class IsInstitutionAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and InstitutionMember.objects.filter(
-            user=request.user, role='admin'
-        ).exists()
+        return has_institution_role(request.user, 'admin')
 
 class IsInstitutionCompany(BasePermission):
+    def has_permission(self, request, view):
+        return has_institution_role(request.user, 'company')
+
+class IsInstitutionStaff(BasePermission):
+    """
+    Admin or company member of the institution named by the URL's pk.
+    """
     def has_permission(self, request, view):
         return request.user.is_authenticated and InstitutionMember.objects.filter(
-            user=request.user, role='company'
+            user=request.user, institution_id=view.kwargs['pk'], role__in=['admin', 'company']
         ).exists()
 
 class IsInstitutionMember(BasePermission):
@@ -21,10 +67,17 @@ class IsInstitutionMember(BasePermission):
 
 class IsJobOwnerOrAdmin(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user.is_authenticated and (
-            obj.posted_by == request.user or
-            InstitutionMember.objects.filter(user=request.user, role='admin').exists()
-        )
+        return is_job_owner_or_admin(request.user, obj)
+
+class IsJobOwnerOrAdminOrReadOnly(BasePermission):
+    """
+    Active jobs are readable by everyone signed in (job seekers open them to apply); only
+    the poster or an admin may read an inactive job or change one.
+    """
+    def has_object_permission(self, request, view, obj):
+        if request.method in SAFE_METHODS:
+            return can_read_job(request.user, obj)
+        return is_job_owner_or_admin(request.user, obj)
 
 class IsApplicationOwnerOrJobPoster(BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -0,0 +1,133 @@
+"""
+Parse free-text Job.salary_range values ("NPR 80k-120k/month", "Rs. 25000", "USD 1,500 - 2,500 per month")
+into numbers that can be filtered and sorted.
+
+Job.salary_min/salary_max hold the parsed bounds converted to NPR per month, so a USD yearly
+figure and an NPR monthly one compare directly. salary_currency and salary_period keep what the
+poster actually wrote.
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+CURRENCIES = [
+    # (pattern, code), checked in order
+    (r'\bnpr\b|\bn?rs\.?(?=\W|\d|$)|रु', 'NPR'),
+    (r'\busd\b|us\$|\$', 'USD'),
+    (r'\binr\b|₹', 'INR'),
+    (r'\beur\b|€', 'EUR'),
+    (r'\bgbp\b|£', 'GBP'),
+]
+
+# "/" needs no word boundary before it: "20/hour" and "20 / hour" are both hourly
+PERIODS = [
+    (r'(?:\bper|/|\ban?)\s*(?:hour|hr)\b|\bhourly\b|/\s*h\b', 'hour'),
+    (r'(?:\bper|/|\ba)\s*day\b|\bdaily\b', 'day'),
+    (r'(?:\bper|/|\ba)\s*(?:week|wk)\b|\bweekly\b', 'week'),
+    (r'(?:\bper|/|\ba)\s*(?:year|yr|annum)\b|\byearly\b|\bannual(?:ly)?\b|\bp\.?a\b|\blpa\b', 'year'),
+    (r'(?:\bper|/|\ba)\s*(?:month|mo)\b|\bmonthly\b|\bp\.?m\b', 'month'),
+]
+
+# Multiply an amount quoted per period to get a monthly amount (six-day weeks, eight-hour days)
+MONTHLY_FACTOR = {'hour': 208, 'day': 26, 'week': 52 / 12, 'month': 1, 'year': 1 / 12}
+
+MULTIPLIERS = {'k': 1_000, 'lakh': 100_000, 'lakhs': 100_000, 'lac': 100_000, 'lacs': 100_000,
+               'l': 100_000, 'lpa': 100_000, 'mn': 1_000_000, 'million': 1_000_000, 'crore': 10_000_000}
+
+AMOUNT = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k|lakhs?|lacs?|lpa|l|mn|million|crore)?(?![a-z])')
+# Experience requirements quoted next to the salary ("3 years exp", "2-5 yrs of experience")
+EXPERIENCE = re.compile(r'\d[\d.]*\s*(?:(?:-|–|to)\s*\d[\d.]*\s*)?\+?\s*(?:years?|yrs?)\b')
+UPPER_ONLY = re.compile(r'\b(?:up\s*to|upto|max(?:imum)?|below|under)\b')
+LOWER_ONLY = re.compile(r'\b(?:from|min(?:imum)?|above|over|starting)\b|\+')
+
+
+# Largest value the salary_min/salary_max columns hold on every backend (PositiveIntegerField)
+MAX_AMOUNT = 2_147_483_647
+
+
+class Salary(NamedTuple):
+    min: Optional[int]  # NPR per month, None if unbounded, out of range or the currency has no exchange rate
+    max: Optional[int]
+    currency: str
+    period: str
+
+
+def parse(text):
+    """
+    Salary for a salary_range string, or None when it names no amount ("Negotiable", "").
+    """
+    text = EXPERIENCE.sub(' ', (text or '').lower())
+    amounts = []
+    for number, unit in AMOUNT.findall(text):
+        amounts.append((float(number.replace(',', '')), MULTIPLIERS.get(unit)))
+    if not amounts:
+        return None
+
+    amounts = amounts[:2]
+    if len(amounts) == 2 and amounts[0][1] is None and amounts[1][1] and amounts[0][0] <= amounts[1][0]:
+        # "80-120k": the unit on the upper bound applies to both
+        amounts[0] = (amounts[0][0], amounts[1][1])
+    low, high = (number * (unit or 1) for number, unit in (amounts[0], amounts[-1]))
+    if low > high:
+        low, high = high, low
+
+    currency = next((code for pattern, code in CURRENCIES if re.search(pattern, text)), 'NPR')
+    period = next((name for pattern, name in PERIODS if re.search(pattern, text)), 'month')
+
+    if len(amounts) == 1:
+        if UPPER_ONLY.search(text):
+            low = None
+        elif LOWER_ONLY.search(text):
+            high = None
+
+    rate = settings.SALARY_EXCHANGE_RATES.get(currency)
+
+    def monthly(amount):
+        if amount is None or rate is None:
+            return None
+        amount = round(amount * rate * MONTHLY_FACTOR[period])
+        return amount if amount <= MAX_AMOUNT else None
+
+    return Salary(monthly(low), monthly(high), currency, period)
+
+
+def fields(text):
+    """
+    The Job salary_* column values for a salary_range string.
+    """
+    salary = parse(text)
+    if salary is None:
+        return {'salary_min': None, 'salary_max': None, 'salary_currency': '', 'salary_period': ''}
+    return {'salary_min': salary.min, 'salary_max': salary.max,
+            'salary_currency': salary.currency, 'salary_period': salary.period}
+
+
+ORDERINGS = ('salary_min', '-salary_min', 'salary_max', '-salary_max')
+
+
+def filter_by_salary(queryset, query_params):
+    """
+    Apply the salary_min/salary_max job list filters (NPR per month) and salary ordering.
+    Jobs without a parsed salary never match a salary filter and sort last.
+    """
+    for param, lookup in (('salary_min', 'salary_min__gte'), ('salary_max', 'salary_max__lte')):
+        value = query_params.get(param)
+        if value:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValidationError({param: 'Must be a whole number of NPR per month'})
+            queryset = queryset.filter(**{lookup: value})
+
+    ordering = query_params.get('ordering')
+    if ordering:
+        if ordering not in ORDERINGS:
+            raise ValidationError({'ordering': f"Must be one of {', '.join(ORDERINGS)}"})
+        field = F(ordering.lstrip('-'))
+        field = field.desc(nulls_last=True) if ordering.startswith('-') else field.asc(nulls_last=True)
+        queryset = queryset.order_by(field, '-created_at', '-id')
+    return queryset
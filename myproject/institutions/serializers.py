@@ -1,21 +1,57 @@
 
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Institution, InstitutionMember, Job, JobApplication
+from rest_framework.settings import api_settings
+from .models import Institution, InstitutionMember, InstitutionStats, Job, JobApplication, default_job_expiry
+from .stats import APPLICATION_FIELDS, JOB_FIELDS, MEMBER_FIELDS
 from main.models import CustomUser
 from main.serializers import UserProfileSerializer
 
 class InstitutionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Institution
-        fields = ['id', 'name', 'description', 'location', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'name', 'description', 'location', 'latitude', 'longitude', 'created_at']
+        read_only_fields = ['latitude', 'longitude', 'created_at']
 
     def validate_name(self, value):
         if not value.strip():
             raise serializers.ValidationError("Institution name cannot be empty.")
         return value
 
-class InstitutionMemberSerializer(serializers.ModelSerializer):
+class UniqueCreateMixin:
+    """
+    Saves rely on the model's unique_together constraint rather than a SELECT beforehand:
+    the write runs under a savepoint, and a unique violation becomes unique_error.
+    Set Meta.validators = [] so DRF does not add its own UniqueTogetherValidator query.
+    """
+    unique_error = None
+
+    def create(self, validated_data):
+        return self.save_unique(super().create, None, validated_data)
+
+    def update(self, instance, validated_data):
+        return self.save_unique(super().update, instance, validated_data)
+
+    def save_unique(self, save, instance, validated_data):
+        try:
+            with transaction.atomic():
+                return save(validated_data) if instance is None else save(instance, validated_data)
+        except IntegrityError:
+            # Only the failure path pays for a lookup, to tell a duplicate from other violations
+            model = self.Meta.model
+            duplicates = model.objects.filter(**{
+                field: validated_data[field] if field in validated_data else getattr(instance, field)
+                for field in model._meta.unique_together[0]
+            })
+            if instance is not None:
+                duplicates = duplicates.exclude(pk=instance.pk)
+            if not duplicates.exists():
+                raise
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [self.unique_error]})
+
+
+class InstitutionMemberSerializer(UniqueCreateMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
     institution = InstitutionSerializer(read_only=True)
     user_id = serializers.PrimaryKeyRelatedField(
@@ -29,13 +65,9 @@ class InstitutionMemberSerializer(serializers.ModelSerializer):
         model = InstitutionMember
         fields = ['id', 'user', 'user_id', 'institution', 'institution_id', 'role', 'joined_at']
         read_only_fields = ['joined_at']
+        validators = []
 
-    def validate(self, data):
-        if InstitutionMember.objects.filter(
-            user=data['user'], institution=data['institution']
-        ).exists():
-            raise serializers.ValidationError("This user is already a member of this institution.")
-        return data
+    unique_error = "This user is already a member of this institution."
 
 class JobSerializer(serializers.ModelSerializer):
     institution = InstitutionSerializer(read_only=True)
@@ -43,21 +75,35 @@ class JobSerializer(serializers.ModelSerializer):
     institution_id = serializers.PrimaryKeyRelatedField(
         queryset=Institution.objects.all(), source='institution', write_only=True, required=False
     )
+    # Only present on results of a near= search
+    distance_km = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Job
-        fields = ['id', 'title', 'description', 'location', 'salary_range', 'job_type', 'status',
-                  'institution', 'institution_id', 'posted_by', 'created_at']
-        read_only_fields = ['created_at', 'posted_by']
+        fields = ['id', 'title', 'description', 'location', 'latitude', 'longitude', 'distance_km',
+                  'salary_range', 'salary_min', 'salary_max', 'salary_currency', 'salary_period',
+                  'job_type', 'status', 'institution', 'institution_id', 'posted_by',
+                  'created_at', 'expires_at', 'views_count', 'applications_count']
+        read_only_fields = ['latitude', 'longitude', 'salary_min', 'salary_max', 'salary_currency',
+                            'salary_period', 'created_at', 'posted_by', 'views_count', 'applications_count']
 
     def validate(self, data):
         if 'institution' in data and not InstitutionMember.objects.filter(
             user=self.context['request'].user, institution=data['institution'], role='company'
         ).exists():
             raise serializers.ValidationError("You must be a company member of the institution to post a job.")
+        if data.get('status', self.instance.status if self.instance else 'active') == 'active':
+            expires_at = data.get('expires_at')
+            if expires_at is not None and expires_at <= timezone.now():
+                raise serializers.ValidationError({'expires_at': "An active job cannot expire in the past."})
+            reactivated = self.instance is not None and self.instance.status != 'active'
+            if reactivated and 'expires_at' not in data and self.instance.expires_at is not None \
+                    and self.instance.expires_at <= timezone.now():
+                # An expired job gets a fresh TTL, or expire_jobs would close it again
+                data['expires_at'] = default_job_expiry()
         return data
 
-class JobApplicationSerializer(serializers.ModelSerializer):
+class JobApplicationSerializer(UniqueCreateMixin, serializers.ModelSerializer):
     job = JobSerializer(read_only=True)
     user = UserProfileSerializer(read_only=True)
     job_id = serializers.PrimaryKeyRelatedField(
@@ -68,10 +114,20 @@ class JobApplicationSerializer(serializers.ModelSerializer):
         model = JobApplication
         fields = ['id', 'job', 'job_id', 'user', 'cover_letter', 'status', 'applied_at']
         read_only_fields = ['user', 'applied_at']
+        validators = []
 
-    def validate(self, data):
-        if JobApplication.objects.filter(
-            job=data['job'], user=self.context['request'].user
-        ).exists():
-            raise serializers.ValidationError("You have already applied for this job.")
-        return data
\ No newline at end of file
+    unique_error = "You have already applied for this job."
+
+class InstitutionStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InstitutionStats
+        fields = ['institution', 'updated_at']
+
+    def to_representation(self, instance):
+        return {
+            'institution_id': instance.institution_id,
+            'members': {role: getattr(instance, field) for role, field in MEMBER_FIELDS.items()},
+            'jobs': {status: getattr(instance, field) for status, field in JOB_FIELDS.items()},
+            'applications': {status: getattr(instance, field) for status, field in APPLICATION_FIELDS.items()},
+            'updated_at': serializers.DateTimeField().to_representation(instance.updated_at),
+        }
@@ -1,11 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from .models import InstitutionMember
+from . import analytics, stats
+from .models import Institution, InstitutionMember, InstitutionStats, Job, JobApplication
 from main.models import Notification
 
 @receiver(post_save, sender=InstitutionMember)
 def notify_institution_member_update(sender, instance, created, **kwargs):
-    if not created and instance.role != instance._original_role:
+    if not created and 'role' in instance.saved_changes:
         Notification.create_notification(
             recipient=instance.user,
             notification_type='institution',
@@ -15,5 +16,91 @@ def notify_institution_member_update(sender, instance, created, **kwargs):
             related_object_type='institution'
         )
 
-    # Store original role for comparison on next save
-    instance._original_role = instance.role
+
+@receiver(post_save, sender=JobApplication)
+def count_job_application(sender, instance, created, **kwargs):
+    if created:
+        analytics.record_application(instance.job_id)
+
+
+@receiver(post_delete, sender=JobApplication)
+def uncount_job_application(sender, instance, **kwargs):
+    analytics.forget_application(instance.job_id)
+
+
+# InstitutionStats maintenance (see institutions.stats). Role/status/institution changes come
+# from the models' saved_changes (main.tracking), so updates cost no extra query.
+
+
+@receiver(post_save, sender=Institution)
+def create_institution_stats(sender, instance, created, **kwargs):
+    if created:
+        InstitutionStats.objects.create(institution=instance)
+
+
+@receiver(post_save, sender=InstitutionMember)
+def count_institution_member(sender, instance, created, **kwargs):
+    field = stats.MEMBER_FIELDS.get(instance.role)
+    if created:
+        stats.adjust_later(instance.institution_id, {field: 1})
+    elif instance.saved_changes:
+        stats.move(instance.previous('institution_id'), stats.MEMBER_FIELDS.get(instance.previous('role')),
+                   instance.institution_id, field)
+
+
+@receiver(post_delete, sender=InstitutionMember)
+def uncount_institution_member(sender, instance, **kwargs):
+    stats.adjust_later(instance.institution_id, {stats.MEMBER_FIELDS.get(instance.role): -1})
+
+
+@receiver(post_save, sender=Job)
+def count_job(sender, instance, created, **kwargs):
+    field = stats.JOB_FIELDS.get(instance.status)
+    if created:
+        stats.adjust_later(instance.institution_id, {field: 1})
+    elif instance.saved_changes:
+        old_institution_id = instance.previous('institution_id')
+        stats.move(old_institution_id, stats.JOB_FIELDS.get(instance.previous('status')), instance.institution_id, field)
+        if 'institution_id' in instance.saved_changes:
+            # The job's applications move with it
+            for application_field, count in stats.application_counts(instance.id).items():
+                stats.move(old_institution_id, application_field, instance.institution_id, application_field, count)
+
+
+# {job_id: institution_id} of jobs being deleted, so their cascaded applications
+# resolve their institution without a query each
+_deleted_job_institutions = {}
+
+
+@receiver(pre_delete, sender=Job)
+def remember_deleted_job(sender, instance, **kwargs):
+    _deleted_job_institutions[instance.id] = instance.institution_id
+
+
+@receiver(post_delete, sender=Job)
+def uncount_job(sender, instance, **kwargs):
+    _deleted_job_institutions.pop(instance.id, None)
+    stats.adjust_later(instance.institution_id, {stats.JOB_FIELDS.get(instance.status): -1})
+
+
+def application_institution_id(application):
+    if JobApplication.job.is_cached(application):
+        return application.job.institution_id
+    if application.job_id in _deleted_job_institutions:
+        return _deleted_job_institutions[application.job_id]
+    return Job.objects.filter(id=application.job_id).values_list('institution_id', flat=True).first()
+
+
+@receiver(post_save, sender=JobApplication)
+def count_application_status(sender, instance, created, **kwargs):
+    field = stats.APPLICATION_FIELDS.get(instance.status)
+    if created:
+        stats.adjust_later(application_institution_id(instance), {field: 1})
+    elif 'status' in instance.saved_changes:
+        old_field = stats.APPLICATION_FIELDS.get(instance.saved_changes['status'])
+        stats.adjust_later(application_institution_id(instance), {old_field: -1, field: 1})
+
+
+@receiver(post_delete, sender=JobApplication)
+def uncount_application_status(sender, instance, **kwargs):
+    stats.adjust_later(application_institution_id(instance), {stats.APPLICATION_FIELDS.get(instance.status): -1})
@@ -0,0 +1,97 @@
+"""
+Incremental maintenance of InstitutionStats.
+
+Signal handlers (institutions.signals) turn member, job and application changes into
+counter deltas. Deltas are applied once the transaction commits, with a single UPDATE per
+institution for all the changes a request (or deferred_signals() block) made. A missing stats row is left missing and
+built from scratch by rebuild() on first read, so it can never double count.
+"""
+
+from django.db.models import Count, F
+from django.utils import timezone
+
+from main.deferred import defer, merge_counts
+from .models import Institution, InstitutionMember, InstitutionStats, Job, JobApplication
+
+MEMBER_FIELDS = {role: f'{role}_members' for role, _ in InstitutionMember.ROLE_CHOICES}
+JOB_FIELDS = {status: f'{status}_jobs' for status, _ in Job.STATUS_CHOICES}
+APPLICATION_FIELDS = {status: f'{status}_applications' for status, _ in JobApplication.STATUS_CHOICES}
+COUNTER_FIELDS = [*MEMBER_FIELDS.values(), *JOB_FIELDS.values(), *APPLICATION_FIELDS.values()]
+
+
+def adjust(institution_id, deltas):
+    """
+    Add {field: delta} to the institution's counters.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if field and delta}
+    if institution_id is None or not deltas:
+        return
+    InstitutionStats.objects.filter(institution_id=institution_id).update(
+        updated_at=timezone.now(), **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def adjust_later(institution_id, deltas):
+    """
+    adjust() once the transaction commits, merged with the institution's other pending deltas.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if field and delta}
+    if institution_id is not None and deltas:
+        defer(apply_deltas, institution_id, deltas, merge=merge_counts)
+
+
+def apply_deltas(pending):
+    for institution_id, deltas in pending.items():
+        adjust(institution_id, deltas)
+
+
+def move(old_institution_id, old_field, new_institution_id, new_field, count=1):
+    """
+    Move count from old_field of one institution to new_field of another (or the same) one,
+    once the transaction commits.
+    """
+    if (old_institution_id, old_field) == (new_institution_id, new_field):
+        return
+    if old_institution_id == new_institution_id:
+        adjust_later(old_institution_id, {old_field: -count, new_field: count})
+    else:
+        adjust_later(old_institution_id, {old_field: -count})
+        adjust_later(new_institution_id, {new_field: count})
+
+
+def application_counts(job_id):
+    """
+    {stats field: count} of the job's applications, for moving them along with the job.
+    """
+    rows = JobApplication.objects.filter(job_id=job_id).values_list('status').annotate(n=Count('id')).order_by()
+    return {APPLICATION_FIELDS.get(status): n for status, n in rows}
+
+
+def rebuild(institution_ids=None):
+    """
+    Recompute the stats rows of the given institutions (all when None) with one aggregate
+    query per table, and upsert them. Returns the number of rows written.
+    """
+    institutions = Institution.objects.all()
+    if institution_ids is not None:
+        institutions = institutions.filter(id__in=institution_ids)
+    rows = {pk: InstitutionStats(institution_id=pk) for pk in institutions.values_list('id', flat=True)}
+
+    aggregates = [
+        (InstitutionMember, 'institution_id', 'role', MEMBER_FIELDS),
+        (Job, 'institution_id', 'status', JOB_FIELDS),
+        (JobApplication, 'job__institution_id', 'status', APPLICATION_FIELDS),
+    ]
+    for model, institution_field, value_field, fields in aggregates:
+        queryset = model.objects.values_list(institution_field, value_field)
+        if institution_ids is not None:
+            queryset = queryset.filter(**{f'{institution_field}__in': institution_ids})
+        for institution_id, value, count in queryset.annotate(n=Count('pk')).order_by():
+            if institution_id in rows and value in fields:
+                setattr(rows[institution_id], fields[value], count)
+
+    InstitutionStats.objects.bulk_create(
+        rows.values(), update_conflicts=True, unique_fields=['institution'],
+        update_fields=[*COUNTER_FIELDS, 'updated_at'], batch_size=500,
+    )
+    return len(rows)
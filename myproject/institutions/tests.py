@@ -1,3 +1,713 @@
-from django.test import TestCase
+import io
+import json
+import math
+import pickle
+import tempfile
+import threading
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from main.deferred import deferred_signals
+from main.models import CustomUser, Notification, ProfileSkill
+from main.tokens import issue_tokens
+from . import analytics, geo, permissions, salary, stats
+from .models import Institution, InstitutionMember, InstitutionStats, Job, JobApplication
+from .serializers import InstitutionMemberSerializer, JobApplicationSerializer
+
+
+# Needs a test database that several threads can write to at once (not SQLite's in-memory one)
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentApplyTest(TransactionTestCase):
+    """
+    Parallel duplicate applies must leave exactly one application, with every other request
+    getting the same 400 the serializer used to return, now that the unique constraint decides.
+    """
+    CLIENTS = 16
+
+    def setUp(self):
+        employer = CustomUser.objects.create(username='employer', email='employer@example.com', role='employer')
+        self.seeker = CustomUser.objects.create(username='seeker', email='seeker@example.com', role='job_seeker')
+        institution = Institution.objects.create(name='Concurrency Institution')
+        InstitutionMember.objects.create(user=employer, institution=institution, role='company')
+        self.job = Job.objects.create(
+            title='Backend Engineer', description='Test', job_type='full_time',
+            institution=institution, posted_by=employer,
+        )
+
+    def apply_in_parallel(self, users):
+        barrier = threading.Barrier(len(users))
+        responses = []
+        lock = threading.Lock()
+
+        def apply(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                response = client.post('/api/institutions/job-applications/', {'job_id': self.job.id},
+                                       format='json', secure=True)
+                with lock:
+                    responses.append(response)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=apply, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_duplicate_applies(self):
+        responses = self.apply_in_parallel([self.seeker] * self.CLIENTS)
+
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [201] + [400] * (self.CLIENTS - 1))
+        for response in responses:
+            if response.status_code == 400:
+                self.assertEqual(response.json()['non_field_errors'], ["You have already applied for this job."])
+        self.assertEqual(JobApplication.objects.filter(job=self.job, user=self.seeker).count(), 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.applications_count, 1)
+
+    def test_distinct_applies(self):
+        seekers = [
+            CustomUser.objects.create(username=f'seeker-{i}', email=f'seeker{i}@example.com', role='job_seeker')
+            for i in range(self.CLIENTS)
+        ]
+        responses = self.apply_in_parallel(seekers)
+
+        self.assertEqual([response.status_code for response in responses], [201] * self.CLIENTS)
+        self.assertEqual(JobApplication.objects.filter(job=self.job).count(), self.CLIENTS)
+
+
+class UniqueApplyTest(TestCase):
+    """
+    Duplicates are caught by the unique constraint; the serializers must turn the IntegrityError
+    into the 400 they used to return from their own validation.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = CustomUser.objects.create(username='employer', email='employer@example.com', role='employer')
+        cls.seeker = CustomUser.objects.create(username='seeker', email='seeker@example.com', role='job_seeker')
+        cls.institution = Institution.objects.create(name='Unique Institution')
+        InstitutionMember.objects.create(user=cls.employer, institution=cls.institution, role='admin')
+        cls.job = Job.objects.create(title='Backend Engineer', description='Test', job_type='full_time',
+                                     institution=cls.institution, posted_by=cls.employer)
+
+    def test_duplicate_application_is_a_validation_error(self):
+        JobApplication.objects.create(job=self.job, user=self.seeker)
+        serializer = JobApplicationSerializer(data={'job_id': self.job.id})
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save(user=self.seeker)
+        self.assertEqual(raised.exception.detail['non_field_errors'], ["You have already applied for this job."])
+        self.assertEqual(JobApplication.objects.filter(job=self.job, user=self.seeker).count(), 1)
+
+    def test_duplicate_apply_request_gets_400(self):
+        client = APIClient()
+        client.force_authenticate(self.seeker)
+        url = '/api/institutions/job-applications/'
+        self.assertEqual(client.post(url, {'job_id': self.job.id}, format='json', secure=True).status_code, 201)
+        response = client.post(url, {'job_id': self.job.id}, format='json', secure=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['non_field_errors'], ["You have already applied for this job."])
+
+    def test_duplicate_membership_is_a_validation_error(self):
+        serializer = InstitutionMemberSerializer(data={
+            'user_id': self.employer.id, 'institution_id': self.institution.id, 'role': 'company',
+        })
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertEqual(InstitutionMember.objects.filter(user=self.employer).count(), 1)
+
+
+
+class ScopedListTest(TestCase):
+    """
+    The member and application lists only show rows the user is party to; site admins see all.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        def user(name, role='job_seeker'):
+            return CustomUser.objects.create(username=name, email=f'{name}@example.com', role=role)
+
+        cls.admin = user('admin', role='admin')
+        cls.poster, cls.other_poster = user('poster', 'employer'), user('other_poster', 'employer')
+        cls.seeker, cls.other_seeker = user('seeker'), user('other_seeker')
+        cls.nepal, cls.pokhara = Institution.objects.create(name='Nepal'), Institution.objects.create(name='Pokhara')
+        cls.members = {
+            'poster': InstitutionMember.objects.create(user=cls.poster, institution=cls.nepal, role='company'),
+            'other_poster': InstitutionMember.objects.create(user=cls.other_poster, institution=cls.pokhara,
+                                                             role='company'),
+            'seeker': InstitutionMember.objects.create(user=cls.seeker, institution=cls.nepal, role='company'),
+        }
+        cls.job = Job.objects.create(title='Poster job', description='Test', job_type='full_time',
+                                     institution=cls.nepal, posted_by=cls.poster)
+        cls.other_job = Job.objects.create(title='Other job', description='Test', job_type='full_time',
+                                           institution=cls.pokhara, posted_by=cls.other_poster)
+        cls.applications = {
+            (seeker, job): JobApplication.objects.create(user=getattr(cls, seeker), job=getattr(cls, job))
+            for seeker in ('seeker', 'other_seeker') for job in ('job', 'other_job')
+        }
+
+    def list_ids(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.json()['results']}
+
+    def application_ids(self, user):
+        return self.list_ids(user, '/api/institutions/job-applications/')
+
+    def member_ids(self, user):
+        return self.list_ids(user, '/api/institutions/institution-members/')
+
+    def test_seeker_sees_own_applications(self):
+        self.assertEqual(self.application_ids(self.other_seeker), {
+            self.applications['other_seeker', 'job'].id, self.applications['other_seeker', 'other_job'].id,
+        })
+
+    def test_poster_sees_applications_to_their_jobs(self):
+        self.assertEqual(self.application_ids(self.poster), {
+            self.applications['seeker', 'job'].id, self.applications['other_seeker', 'job'].id,
+        })
+
+    def test_user_filter_cannot_widen_scope(self):
+        url = f'/api/institutions/job-applications/?user_id={self.other_seeker.id}'
+        self.assertEqual(self.list_ids(self.seeker, url), set())
+
+    def test_member_sees_co_members(self):
+        self.assertEqual(self.member_ids(self.seeker), {self.members['poster'].id, self.members['seeker'].id})
+        self.assertEqual(self.member_ids(self.other_poster), {self.members['other_poster'].id})
+        self.assertEqual(self.member_ids(self.other_seeker), set())
+
+    def test_admin_sees_everything(self):
+        self.assertEqual(self.application_ids(self.admin), {a.id for a in self.applications.values()})
+        self.assertEqual(self.member_ids(self.admin), {m.id for m in self.members.values()})
+
+
+class TrackedFieldsTest(TestCase):
+    """
+    saved_changes holds the tracked fields a save changed, with their old values, without a query.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username='admin', email='admin@example.com', role='admin')
+        cls.poster = CustomUser.objects.create(username='poster', email='poster@example.com', role='employer')
+        cls.institution = Institution.objects.create(name='Tracked')
+        cls.job = Job.objects.create(title='Tracked job', description='Test', job_type='full_time',
+                                     institution=cls.institution, posted_by=cls.poster)
+
+    def test_from_db(self):
+        job = Job.objects.get(id=self.job.id)
+        self.assertEqual(job.saved_changes, {})
+        self.assertEqual(job.changed_fields(), {})
+        job.status = 'inactive'
+        self.assertEqual(job.changed_fields(), {'status': 'active'})
+        with self.assertNumQueries(1):
+            job.save(update_fields=['status'])
+        self.assertEqual(job.saved_changes, {'status': 'active'})
+        self.assertEqual(job.previous('status'), 'active')
+        self.assertEqual(job.changed_fields(), {})
+
+    def test_unchanged_save(self):
+        job = Job.objects.get(id=self.job.id)
+        job.title = 'Renamed'
+        job.save()
+        self.assertEqual(job.saved_changes, {})
+        self.assertEqual(job.previous('status'), 'active')
+
+    def test_update_fields(self):
+        job = Job.objects.get(id=self.job.id)
+        job.status = 'inactive'
+        job.title = 'Renamed'
+        job.save(update_fields=['title'])
+        # status was not written, so it is neither a saved change nor forgotten
+        self.assertEqual(job.saved_changes, {})
+        self.assertEqual(job.changed_fields(), {'status': 'active'})
+        job.save(update_fields=['status'])
+        self.assertEqual(job.saved_changes, {'status': 'active'})
+        self.assertEqual(job.changed_fields(), {})
+
+    def test_deferred_field_is_read_when_needed(self):
+        job = Job.objects.only('id', 'institution_id').get(id=self.job.id)
+        job.status = 'inactive'
+        # One query for the old status, one for the UPDATE
+        with self.assertNumQueries(2):
+            job.save(update_fields=['status'])
+        self.assertEqual(job.saved_changes, {'status': 'active'})
+
+    def test_refresh_from_db(self):
+        job = Job.objects.get(id=self.job.id)
+        Job.objects.filter(id=job.id).update(status='inactive')
+        job.refresh_from_db()
+        self.assertEqual(job.changed_fields(), {})
+
+    def test_new_instances_and_pickling(self):
+        job = Job(title='New', description='Test', job_type='full_time', status='inactive')
+        self.assertEqual(job.changed_fields(), {})
+        job.save()
+        self.assertEqual(job.saved_changes, {})
+        job.status = 'active'
+        job.save()
+        self.assertEqual(pickle.loads(pickle.dumps(job)).saved_changes, {'status': 'inactive'})
+
+    def test_status_change_notifies_admins(self):
+        client = APIClient()
+        client.force_authenticate(self.poster)
+        url = f'/api/institutions/jobs/{self.job.id}/'
+        updates = Notification.objects.filter(recipient=self.admin, title='Job Status Updated',
+                                              related_object_id=self.job.id)
+
+        self.assertEqual(client.patch(url, {'title': 'Renamed'}, format='json', secure=True).status_code, 200)
+        self.assertFalse(updates.exists())
+        self.assertEqual(client.patch(url, {'status': 'active'}, format='json', secure=True).status_code, 200)
+        self.assertFalse(updates.exists())
+        self.assertEqual(client.patch(url, {'status': 'inactive'}, format='json', secure=True).status_code, 200)
+        self.assertEqual(updates.count(), 1)
+
+
+@override_settings(JOB_DEFAULT_TTL_DAYS=30)
+class JobReactivationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.poster = CustomUser.objects.create(username='poster', email='poster@example.com', role='employer')
+        cls.job = Job.objects.create(title='Expired job', description='Test', job_type='full_time', status='inactive',
+                                     posted_by=cls.poster, expires_at=timezone.now() - timedelta(days=1))
+
+    def patch(self, data):
+        client = APIClient()
+        client.force_authenticate(self.poster)
+        return client.patch(f'/api/institutions/jobs/{self.job.id}/', data, format='json', secure=True)
+
+    def test_reactivation_renews_expiry(self):
+        self.assertEqual(self.patch({'status': 'active'}).status_code, 200)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'active')
+        self.assertAlmostEqual(self.job.expires_at, timezone.now() + timedelta(days=30), delta=timedelta(minutes=1))
+
+    def test_reactivation_keeps_a_given_expiry(self):
+        expires_at = timezone.now() + timedelta(days=5)
+        self.assertEqual(self.patch({'status': 'active', 'expires_at': expires_at.isoformat()}).status_code, 200)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.expires_at, expires_at)
+
+        self.assertEqual(self.patch({'status': 'inactive', 'expires_at': None}).status_code, 200)
+        self.assertEqual(self.patch({'status': 'active'}).status_code, 200)
+        self.job.refresh_from_db()
+        self.assertIsNone(self.job.expires_at)
+
+    def test_active_job_cannot_expire_in_the_past(self):
+        response = self.patch({'status': 'active', 'expires_at': (timezone.now() - timedelta(hours=1)).isoformat()})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expires_at', response.json())
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'inactive')
+
+    def test_editing_an_inactive_job_keeps_its_expiry(self):
+        expires_at = self.job.expires_at
+        self.assertEqual(self.patch({'title': 'Still expired'}).status_code, 200)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.expires_at, expires_at)
+
+
+class ApplicationDigestTest(TestCase):
+    def test_poster_gets_one_digest_per_job(self):
+        poster = CustomUser.objects.create(username='poster', email='poster@example.com', role='employer')
+        job = Job.objects.create(title='Busy job', description='Test', job_type='full_time', posted_by=poster)
+        seekers = [CustomUser.objects.create(username=f'seeker{i}', email=f'seeker{i}@example.com') for i in range(3)]
+        applications = [JobApplication.objects.create(job=job, user=seeker) for seeker in seekers]
+
+        digest = Notification.objects.get(recipient=poster, title='New Job Application')
+        self.assertEqual(digest.aggregate_count, 3)
+        self.assertEqual(digest.message, "3 new applications for 'Busy job', latest from seeker2.")
+        self.assertEqual(digest.related_object_id, applications[-1].id)
+
+
+class InstitutionStatsTest(TestCase):
+    """
+    The incremental counters match what rebuild() computes from scratch after every kind of change.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.poster = CustomUser.objects.create(username='poster', email='poster@example.com', role='employer')
+        cls.seekers = [CustomUser.objects.create(username=f'seeker{i}', email=f'seeker{i}@example.com')
+                       for i in range(3)]
+
+    def setUp(self):
+        with self.changes():
+            self.nepal = Institution.objects.create(name='Nepal')
+            self.pokhara = Institution.objects.create(name='Pokhara')
+            InstitutionMember.objects.create(user=self.poster, institution=self.nepal, role='company')
+            self.job = Job.objects.create(title='Engineer', description='Test', job_type='full_time',
+                                          institution=self.nepal, posted_by=self.poster)
+            self.applications = [JobApplication.objects.create(job=self.job, user=seeker) for seeker in self.seekers]
+
+    def changes(self):
+        # Commit and run the deferred deltas, as the end of a request would
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def counters(self, institution):
+        row = InstitutionStats.objects.filter(institution=institution).values(*stats.COUNTER_FIELDS).first()
+        return {field: count for field, count in row.items() if count}
+
+    def assertCounters(self, institution, expected):
+        self.assertEqual(self.counters(institution), expected)
+        # The incremental counts agree with a full recount
+        stats.rebuild([institution.id])
+        self.assertEqual(self.counters(institution), expected)
+
+    def test_create(self):
+        self.assertCounters(self.nepal, {'company_members': 1, 'active_jobs': 1, 'pending_applications': 3})
+        self.assertCounters(self.pokhara, {})
+
+    def test_status_transitions(self):
+        with self.changes():
+            self.job.status = 'inactive'
+            self.job.save()
+            for application, status in zip(self.applications, ['reviewed', 'accepted']):
+                application.status = status
+                application.save()
+            membership = InstitutionMember.objects.get(user=self.poster)
+            membership.role = 'admin'
+            membership.save()
+        self.assertCounters(self.nepal, {'admin_members': 1, 'inactive_jobs': 1, 'pending_applications': 1,
+                                         'reviewed_applications': 1, 'accepted_applications': 1})
+
+    def test_move_job(self):
+        with self.changes():
+            self.job.institution = self.pokhara
+            self.job.save()
+        self.assertCounters(self.nepal, {'company_members': 1})
+        self.assertCounters(self.pokhara, {'active_jobs': 1, 'pending_applications': 3})
+
+    def test_delete(self):
+        with self.changes():
+            self.applications[0].delete()
+            InstitutionMember.objects.filter(user=self.poster).delete()
+        self.assertCounters(self.nepal, {'active_jobs': 1, 'pending_applications': 2})
+
+    def test_cascade_delete(self):
+        with CaptureQueriesContext(connection) as queries, self.changes():
+            self.job.delete()
+        self.assertCounters(self.nepal, {'company_members': 1})
+        # The applications resolve their institution from the job being deleted, not a query each
+        job_lookups = [q['sql'] for q in queries if q['sql'].startswith('SELECT "institutions_job"."institution_id"')]
+        self.assertEqual(job_lookups, [])
+
+    def test_deltas_are_batched(self):
+        with CaptureQueriesContext(connection) as queries, self.changes(), deferred_signals():
+            for application in self.applications:
+                application.status = 'rejected'
+                application.save()
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "institutions_institutionstats"')]
+        self.assertEqual(len(updates), 1)
+        self.assertCounters(self.nepal, {'company_members': 1, 'active_jobs': 1, 'rejected_applications': 3})
+
+    def test_rebuild_command(self):
+        InstitutionStats.objects.all().delete()
+        call_command('rebuild_institution_stats', '--institution', str(self.nepal.id), stdout=io.StringIO())
+        self.assertCounters(self.nepal, {'company_members': 1, 'active_jobs': 1, 'pending_applications': 3})
+        self.assertFalse(InstitutionStats.objects.filter(institution=self.pokhara).exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SeedLoadDataTest(TestCase):
+    def test_seeded_rows_have_derived_columns(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = Path(directory) / 'manifest.json'
+            call_command('seed_load_data', seekers=20, employers=4, admins=1, institutions=3, jobs=30,
+                         applications=60, notifications_per_user=1, manifest=str(manifest), stdout=io.StringIO())
+            self.assertTrue(json.loads(manifest.read_text())['active_job_ids'])
+
+        jobs = Job.objects.all()
+        self.assertTrue(jobs.exclude(salary_min=None).exists())
+        self.assertTrue(jobs.exclude(geohash='').exists())
+        self.assertEqual(sum(jobs.values_list('applications_count', flat=True)), 60)
+        self.assertTrue(ProfileSkill.objects.exists())
+        counts = list(InstitutionStats.objects.order_by('pk').values_list(*stats.COUNTER_FIELDS))
+        self.assertEqual(len(counts), 3)
+        stats.rebuild()
+        self.assertEqual(list(InstitutionStats.objects.order_by('pk').values_list(*stats.COUNTER_FIELDS)), counts)
+
+@override_settings(SALARY_EXCHANGE_RATES={'NPR': 1.0, 'USD': 133.0, 'INR': 1.6})
+class SalaryParseTest(SimpleTestCase):
+    CASES = [
+        # (salary_range, (min, max, currency, period)), min/max in NPR per month
+        ('', None),
+        ('Negotiable', None),
+        ('Rs. 25000', (25000, 25000, 'NPR', 'month')),
+        ('NPR 80k-120k/month', (80000, 120000, 'NPR', 'month')),
+        ('NPR 80-120k', (80000, 120000, 'NPR', 'month')),
+        ('NPR 50,000 - 80,000 per month', (50000, 80000, 'NPR', 'month')),
+        ('रु 40000', (40000, 40000, 'NPR', 'month')),
+        ('USD 1,500 - 2,500 per month', (199500, 332500, 'USD', 'month')),
+        ('$20/hour', (553280, 553280, 'USD', 'hour')),
+        ('USD 20 / hour', (553280, 553280, 'USD', 'hour')),
+        ('USD 20 an hour', (553280, 553280, 'USD', 'hour')),
+        ('NPR 1500 / day', (39000, 39000, 'NPR', 'day')),
+        ('NPR 12 lakh per year', (100000, 100000, 'NPR', 'year')),
+        ('12 LPA', (100000, 100000, 'NPR', 'year')),
+        ('INR 50000 monthly', (80000, 80000, 'INR', 'month')),
+        ('EUR 3000', (None, None, 'EUR', 'month')),
+        ('Up to NPR 60000', (None, 60000, 'NPR', 'month')),
+        ('NPR 60000+', (60000, None, 'NPR', 'month')),
+        ('120000 - 80000', (80000, 120000, 'NPR', 'month')),
+        # Too large for the salary columns
+        ('NPR 500 crore', (None, None, 'NPR', 'month')),
+        ('NPR 40000 - 500 crore', (40000, None, 'NPR', 'month')),
+        # Experience requirements are not amounts
+        ('3 years exp, NPR 40000', (40000, 40000, 'NPR', 'month')),
+        ('2-5 yrs experience, NPR 40,000-60,000', (40000, 60000, 'NPR', 'month')),
+        ('NPR 50000 per month, 3+ years of experience', (50000, 50000, 'NPR', 'month')),
+    ]
+
+    def test_parse(self):
+        for text, expected in self.CASES:
+            with self.subTest(text=text):
+                self.assertEqual(salary.parse(text), expected and salary.Salary(*expected))
+
+    def test_fields_without_amount(self):
+        self.assertEqual(salary.fields('Negotiable'), {
+            'salary_min': None, 'salary_max': None, 'salary_currency': '', 'salary_period': '',
+        })
+
+
+class PermissionHelperTest(TestCase):
+    """
+    The sync permission classes and the async views share these checks; both variants must agree.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        institution = Institution.objects.create(name='Helper Institution')
+        cls.poster = CustomUser.objects.create(username='poster', email='poster@example.com', role='employer')
+        cls.admin = CustomUser.objects.create(username='admin', email='admin@example.com', role='employer')
+        cls.seeker = CustomUser.objects.create(username='seeker', email='seeker@example.com', role='job_seeker')
+        InstitutionMember.objects.create(user=cls.poster, institution=institution, role='company')
+        InstitutionMember.objects.create(user=cls.admin, institution=institution, role='admin')
+        cls.job = Job.objects.create(title='Engineer', description='Test', job_type='full_time',
+                                     institution=institution, posted_by=cls.poster)
+
+    async def test_sync_and_async_agree(self):
+        expected = {
+            self.poster: {'company': True, 'admin': False, 'job': True},
+            self.admin: {'company': False, 'admin': True, 'job': True},
+            self.seeker: {'company': False, 'admin': False, 'job': False},
+        }
+        for user, results in expected.items():
+            with self.subTest(user=user.username):
+                for role in ('company', 'admin'):
+                    self.assertIs(await permissions.ahas_institution_role(user, role), results[role])
+                    self.assertIs(await sync_to_async(permissions.has_institution_role)(user, role), results[role])
+                self.assertIs(await permissions.ais_job_owner_or_admin(user, self.job), results['job'])
+                self.assertIs(await sync_to_async(permissions.is_job_owner_or_admin)(user, self.job),
+                              results['job'])
+
+
+class AnalyticsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.institution = Institution.objects.create(name='Analytics Institution')
+        cls.poster = CustomUser.objects.create(username='poster', email='poster@example.com', role='employer')
+        cls.admin = CustomUser.objects.create(username='admin', email='admin@example.com', role='employer')
+        cls.seeker = CustomUser.objects.create(username='seeker', email='seeker@example.com', role='job_seeker')
+        InstitutionMember.objects.create(user=cls.poster, institution=cls.institution, role='company')
+        InstitutionMember.objects.create(user=cls.admin, institution=cls.institution, role='admin')
+
+    def setUp(self):
+        # Run the deferred stats and counter updates, as the end of a request would
+        with self.captureOnCommitCallbacks(execute=True):
+            self.job = Job.objects.create(title='Engineer', description='Test', job_type='full_time',
+                                          institution=self.institution, posted_by=self.poster)
+            self.applications = [
+                JobApplication.objects.create(job=self.job, user=CustomUser.objects.create(
+                    username=f'applicant-{i}', email=f'applicant{i}@example.com', role='job_seeker'))
+                for i in range(3)
+            ]
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.applications_count, 3)
+
+    def job_updates(self, queries):
+        return [q['sql'] for q in queries if q['sql'].startswith('UPDATE "institutions_job" ')]
+
+    def test_deleted_applications_are_subtracted_in_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True), deferred_signals():
+                for application in self.applications[:2]:
+                    application.delete()
+        self.assertEqual(len(self.job_updates(queries)), 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.applications_count, 1)
+
+    def test_deleting_a_job_batches_the_cascade(self):
+        # One UPDATE for all the cascaded applications; it matches nothing once the job is gone
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True), deferred_signals():
+                self.job.delete()
+        self.assertEqual(len(self.job_updates(queries)), 1)
+        self.assertFalse(Job.objects.filter(id=self.job.id).exists())
+
+    def test_audience_views(self):
+        self.assertFalse(analytics.is_audience_view(self.poster, self.job))
+        self.assertFalse(analytics.is_audience_view(self.admin, self.job))
+        self.assertTrue(analytics.is_audience_view(self.seeker, self.job))
+
+    def test_poster_views_are_not_counted(self):
+        client = APIClient()
+        client.force_authenticate(self.poster)
+        analytics.flush()
+        response = client.get(f'/api/institutions/jobs/{self.job.id}/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.job.id)
+        self.assertEqual(analytics.flush(), 0)
+
+    def test_seeker_views_are_counted(self):
+        client = APIClient()
+        client.force_authenticate(self.seeker)
+        analytics.flush()
+        for _ in range(2):
+            self.assertEqual(client.get(f'/api/institutions/jobs/{self.job.id}/', secure=True).status_code, 200)
+        self.assertEqual(analytics.flush(), 2)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.views_count, 2)
+        self.assertEqual(self.job.daily_stats.get().views, 2)
+
+    async def test_async_seeker_views_are_counted(self):
+        await sync_to_async(analytics.flush)()
+        client = AsyncClient()
+        client.cookies['access_token'] = str(issue_tokens(self.seeker).access_token)
+        response = await client.get(f'/api/institutions/jobs/{self.job.id}/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await sync_to_async(analytics.flush)(), 1)
+
+    def test_seekers_only_read_active_jobs(self):
+        client = APIClient()
+        client.force_authenticate(self.seeker)
+        url = f'/api/institutions/jobs/{self.job.id}/'
+        self.assertEqual(client.patch(url, {'title': 'Taken over'}, format='json', secure=True).status_code, 403)
+        Job.objects.filter(id=self.job.id).update(status='inactive')
+        self.assertEqual(client.get(url, secure=True).status_code, 403)
+        client.force_authenticate(self.poster)
+        self.assertEqual(client.get(url, secure=True).status_code, 200)
+
+    @override_settings(JOB_VIEW_FLUSH_INTERVAL=0.01)
+    def test_pending_views_flush_on_a_timer(self):
+        analytics.flush()
+        flushed = threading.Event()
+        with mock.patch('institutions.analytics.submit', side_effect=lambda func: flushed.set()) as submit:
+            analytics.record_view(self.job.id)
+            analytics.record_view(self.job.id)
+            self.assertTrue(flushed.wait(5))
+        submit.assert_called_once_with(analytics.flush)
+        self.assertEqual(analytics.flush(), 2)
+
+
+class GeohashTest(SimpleTestCase):
+    def test_geohash(self):
+        self.assertEqual(geo.geohash(57.64911, 10.40744, precision=11), 'u4pruydqqvj')
+        self.assertEqual(geo.geohash(57.64911, 10.40744), 'u4pruyd')
+        self.assertEqual(geo.geohash(-90, -180, precision=3), '000')
+
+    def test_covering_cells_cover_the_box(self):
+        south, west, north, east = geo.bounding_box(*geo.GAZETTEER['kathmandu'], 10)
+        cells = geo.covering_cells(south, west, north, east)
+        self.assertTrue(0 < len(cells) <= geo.MAX_COVER_CELLS)
+        steps = 20
+        for i in range(steps + 1):
+            for j in range(steps + 1):
+                point = (south + (north - south) * i / steps, west + (east - west) * j / steps)
+                with self.subTest(point=point):
+                    self.assertTrue(any(geo.geohash(*point).startswith(cell) for cell in cells))
+
+    def test_covering_cells_for_huge_boxes(self):
+        self.assertIsNone(geo.covering_cells(-80, -170, 80, 170))
+
+    def test_geocode(self):
+        self.assertEqual(geo.geocode('Baneshwor, Kathmandu'), geo.GAZETTEER['kathmandu'])
+        self.assertEqual(geo.geocode('Lalitpur'), geo.GAZETTEER['lalitpur'])
+        self.assertIsNone(geo.geocode('Remote'))
+
+
+class LocationFilterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.institution = Institution.objects.create(name='Geo Institution', location='Pokhara')
+        cls.jobs = {
+            location: Job.objects.create(title=location or 'Unlisted', description='Test', job_type='full_time',
+                                         location=location, institution=cls.institution)
+            for location in ('Kathmandu', 'Patan', 'Bhaktapur', 'Chitwan', 'Remote', '')
+        }
+
+    def search(self, **params):
+        query = QueryDict(mutable=True)
+        query.update(params)
+        return list(geo.filter_by_location(Job.objects.all(), query))
+
+    def test_near(self):
+        results = self.search(near='Kathmandu', radius_km='10')
+        self.assertEqual([job.location for job in results], ['Kathmandu', 'Patan'])
+        self.assertEqual(results[0].distance_km, 0)
+        self.assertAlmostEqual(results[1].distance_km, 6.5, delta=0.2)
+
+    def test_near_point_and_radius(self):
+        results = self.search(near='27.7172,85.3240', radius_km='15')
+        self.assertEqual([job.location for job in results], ['Kathmandu', 'Patan', 'Bhaktapur'])
+
+    def test_near_matches_exact_distance(self):
+        # The geohash prefilter must not drop anything the exact haversine check keeps
+        origin = geo.GAZETTEER['kathmandu']
+        for radius in (1, 5, 12, 80, 150, 500):
+            with self.subTest(radius=radius):
+                expected = {job.id for job in Job.objects.filter(latitude__isnull=False)
+                            if haversine(origin, (job.latitude, job.longitude)) <= radius}
+                self.assertEqual({job.id for job in self.search(near='Kathmandu', radius_km=str(radius))},
+                                 expected)
+
+    def test_bbox(self):
+        west, south, east, north = 85.2, 27.6, 85.5, 27.8
+        results = self.search(bbox=f'{west},{south},{east},{north}')
+        self.assertEqual({job.location for job in results}, {'Kathmandu', 'Patan', 'Bhaktapur'})
+
+    def test_jobs_without_a_location_use_the_institution(self):
+        unlisted, remote = self.jobs[''], self.jobs['Remote']
+        self.assertEqual((unlisted.latitude, unlisted.longitude), geo.GAZETTEER['pokhara'])
+        self.assertEqual(unlisted.geohash, geo.geohash(*geo.GAZETTEER['pokhara']))
+        self.assertIsNone(remote.latitude)
+        self.assertEqual(remote.geohash, '')
+
+    def test_institution_move_updates_unlisted_jobs(self):
+        institution = Institution.objects.get(id=self.institution.id)
+        institution.location = 'Kathmandu'
+        institution.save()
+        unlisted = Job.objects.get(id=self.jobs[''].id)
+        self.assertEqual((unlisted.latitude, unlisted.longitude), geo.GAZETTEER['kathmandu'])
+        self.assertEqual(unlisted.geohash, geo.geohash(*geo.GAZETTEER['kathmandu']))
+        # Jobs with their own location stay put
+        self.assertEqual(Job.objects.get(id=self.jobs['Chitwan'].id).latitude, geo.GAZETTEER['bharatpur'][0])
+
+    def test_invalid_input(self):
+        for params in ({'bbox': '1,2,3'}, {'bbox': '85.5,27.6,85.2,27.8'}, {'near': 'Atlantis'},
+                       {'near': '95,85'}, {'near': 'Kathmandu', 'radius_km': '0'},
+                       {'near': 'Kathmandu', 'radius_km': 'far'}):
+            with self.subTest(params=params), self.assertRaises(ValidationError):
+                self.search(**params)
+
+
+def haversine(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(h))
@@ -1,13 +1,16 @@
 from django.urls import path
-from . import views
+from main.async_views import async_get
+from . import async_views, views
 
 urlpatterns = [
     path('institutions/', views.InstitutionListCreate.as_view(), name='institution-list-create'),
     path('institutions/<int:pk>/', views.InstitutionDetail.as_view(), name='institution-detail'),
+    path('institutions/<int:pk>/analytics/', views.InstitutionAnalytics.as_view(), name='institution-analytics'),
+    path('institutions/<int:pk>/stats/', views.InstitutionStatsDetail.as_view(), name='institution-stats'),
     path('institution-members/', views.InstitutionMemberListCreate.as_view(), name='institution-member-list-create'),
     path('institution-members/<int:pk>/', views.InstitutionMemberDetail.as_view(), name='institution-member-detail'),
-    path('jobs/', views.JobListCreate.as_view(), name='job-list-create'),
-    path('jobs/<int:pk>/', views.JobDetail.as_view(), name='job-detail'),
+    path('jobs/', async_get(views.JobListCreate.as_view(), async_views.job_list), name='job-list-create'),
+    path('jobs/<int:pk>/', async_get(views.JobDetail.as_view(), async_views.job_detail), name='job-detail'),
     path('job-applications/', views.JobApplicationListCreate.as_view(), name='job-application-list-create'),
     path('job-applications/<int:pk>/', views.JobApplicationDetail.as_view(), name='job-application-detail'),
 ]
@@ -1,18 +1,22 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from datetime import timedelta
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import Q, Sum
+from django.utils import timezone
+from main.idempotency import idempotent
 from main.utils import transaction_atomic
 from main.models import Notification
-from .models import Institution, InstitutionMember, Job, JobApplication
+from . import analytics, geo, salary, stats
+from .models import Institution, InstitutionMember, InstitutionStats, Job, JobApplication, JobDailyStats
 from .serializers import (
-    InstitutionSerializer, InstitutionMemberSerializer,
+    InstitutionSerializer, InstitutionMemberSerializer, InstitutionStatsSerializer,
     JobSerializer, JobApplicationSerializer
 )
 from .permissions import (
-    IsInstitutionAdmin, IsInstitutionCompany,
-    IsInstitutionMember, IsJobOwnerOrAdmin,
+    IsInstitutionAdmin, IsInstitutionCompany, IsInstitutionStaff,
+    IsInstitutionMember, IsJobOwnerOrAdminOrReadOnly,
     IsApplicationOwnerOrJobPoster
 )
 from main.views import StandardResultsSetPagination
@@ -45,6 +49,64 @@ class InstitutionDetail(generics.RetrieveUpdateDestroyAPIView):
         )
         super().perform_destroy(instance)
 
+def conversion_rate(applications, views):
+    return round(applications / views, 4) if views else None
+
+class InstitutionAnalytics(generics.GenericAPIView):
+    """
+    Views, applications and conversion per job plus a daily series for the institution's jobs
+    """
+    permission_classes = [IsAuthenticated, IsInstitutionStaff]
+
+    def get(self, request, pk):
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+        except ValueError:
+            return Response({"error": "days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Include views still buffered in this process
+        analytics.flush()
+
+        jobs = list(Job.objects.filter(institution_id=pk).order_by('-views_count').values(
+            'id', 'title', 'status', 'views_count', 'applications_count'
+        ))
+        for job in jobs:
+            job['conversion_rate'] = conversion_rate(job['applications_count'], job['views_count'])
+
+        since = timezone.localdate() - timedelta(days=days - 1)
+        daily = list(JobDailyStats.objects.filter(job__institution_id=pk, date__gte=since)
+                     .values('date').annotate(views=Sum('views'), applications=Sum('applications'))
+                     .order_by('date'))
+
+        views = sum(job['views_count'] for job in jobs)
+        applications = sum(job['applications_count'] for job in jobs)
+        return Response({
+            "institution_id": pk,
+            "days": days,
+            "totals": {
+                "views": views,
+                "applications": applications,
+                "conversion_rate": conversion_rate(applications, views),
+            },
+            "jobs": jobs,
+            "daily": daily,
+        }, status=status.HTTP_200_OK)
+
+class InstitutionStatsDetail(generics.GenericAPIView):
+    """
+    Member, job and application counters for the institution, read from InstitutionStats
+    """
+    serializer_class = InstitutionStatsSerializer
+    permission_classes = [IsAuthenticated, IsInstitutionStaff]
+
+    def get(self, request, pk):
+        row = InstitutionStats.objects.filter(institution_id=pk).first()
+        if row is None:
+            # Institutions that predate the stats table or were bulk-created
+            stats.rebuild([pk])
+            row = get_object_or_404(InstitutionStats, institution_id=pk)
+        return Response(self.get_serializer(row).data, status=status.HTTP_200_OK)
+
 class InstitutionMemberListCreate(generics.ListCreateAPIView):
     queryset = InstitutionMember.objects.all()
     serializer_class = InstitutionMemberSerializer
@@ -52,10 +114,16 @@ class InstitutionMemberListCreate(generics.ListCreateAPIView):
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        user = self.request.user
+        if user.role != 'admin':
+            # Members of the institutions the user belongs to, via the (user, institution) index
+            queryset = queryset.filter(
+                institution__in=InstitutionMember.objects.filter(user=user).values('institution')
+            )
         institution_id = self.request.query_params.get('institution_id')
         if institution_id:
             queryset = queryset.filter(institution_id=institution_id)
-        return queryset
+        return queryset.order_by('-joined_at', '-id')
 
     def perform_create(self, serializer):
         serializer.save()
@@ -77,6 +145,29 @@ class InstitutionMemberDetail(generics.RetrieveUpdateDestroyAPIView):
         )
         super().perform_destroy(instance)
 
+def filter_jobs(queryset, query_params):
+    """
+    Apply the job list query filters; shared with the async job list (institutions.async_views).
+    """
+    search_query = query_params.get('search')
+    institution_id = query_params.get('institution_id')
+    job_type = query_params.get('job_type')
+    status = query_params.get('status')
+
+    if search_query:
+        queryset = queryset.filter(
+            Q(title__icontains=search_query) |
+            Q(description__icontains=search_query)
+        )
+    if institution_id:
+        queryset = queryset.filter(institution_id=institution_id)
+    if job_type:
+        queryset = queryset.filter(job_type=job_type)
+    if status:
+        queryset = queryset.filter(status=status)
+    queryset = geo.filter_by_location(queryset, query_params)
+    return salary.filter_by_salary(queryset, query_params)
+
 class JobListCreate(generics.ListCreateAPIView):
     queryset = Job.objects.all()
     serializer_class = JobSerializer
@@ -84,24 +175,7 @@ class JobListCreate(generics.ListCreateAPIView):
     pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        search_query = self.request.query_params.get('search')
-        institution_id = self.request.query_params.get('institution_id')
-        job_type = self.request.query_params.get('job_type')
-        status = self.request.query_params.get('status')
-
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
-        if institution_id:
-            queryset = queryset.filter(institution_id=institution_id)
-        if job_type:
-            queryset = queryset.filter(job_type=job_type)
-        if status:
-            queryset = queryset.filter(status=status)
-        return queryset
+        return filter_jobs(super().get_queryset(), self.request.query_params)
 
     def perform_create(self, serializer):
         serializer.save(posted_by=self.request.user)
@@ -109,12 +183,17 @@ class JobListCreate(generics.ListCreateAPIView):
 class JobDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = Job.objects.all()
     serializer_class = JobSerializer
-    permission_classes = [IsAuthenticated, IsJobOwnerOrAdmin]
+    permission_classes = [IsAuthenticated, IsJobOwnerOrAdminOrReadOnly]
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if analytics.is_audience_view(request.user, instance):
+            analytics.record_view(instance.id)
+        return Response(self.get_serializer(instance).data)
 
     def perform_update(self, serializer):
-        old_status = self.get_object().status
         instance = serializer.save()
-        if old_status != instance.status:
+        if 'status' in instance.saved_changes:
             Notification.create_admin_notification(
                 title="Job Status Updated",
                 message=f"Job '{instance.title}' status changed to {instance.status} by {self.request.user.username}.",
@@ -139,6 +218,13 @@ class JobApplicationListCreate(generics.ListCreateAPIView):
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        user = self.request.user
+        if user.role != 'admin':
+            # The user's own applications and those to jobs they posted. Each side of the OR has
+            # its own index, (user, applied_at) and (posted_by, created_at) via the job subquery.
+            queryset = queryset.filter(
+                Q(user=user) | Q(job__in=Job.objects.filter(posted_by=user).values('id'))
+            )
         job_id = self.request.query_params.get('job_id')
         user_id = self.request.query_params.get('user_id')
         status = self.request.query_params.get('status')
@@ -149,7 +235,11 @@ class JobApplicationListCreate(generics.ListCreateAPIView):
             queryset = queryset.filter(user_id=user_id)
         if status:
             queryset = queryset.filter(status=status)
-        return queryset
+        return queryset.order_by('-applied_at', '-id')
+
+    @idempotent('job-applications')
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
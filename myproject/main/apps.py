@@ -5,6 +5,6 @@ class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
 
-
-def ready(self):
-    import main.signals
+    def ready(self):
+        import main.checks
+        import main.signals
@@ -0,0 +1,120 @@
+"""
+Async implementations of the hottest read endpoints, for deployments served by myproject.asgi.
+
+With ASYNC_VIEWS_ENABLED, async_get() routes GET requests to these views and every other
+method to the DRF view, so writes keep their serializers, permissions and transactions.
+Querysets load every relation the serializer touches up front (select_related) because
+lazy loading is not allowed inside an async view.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import CookieJWTAuthentication
+from .models import Notification, UserProfile
+from .serializers import NotificationSerializer, UserProfileSerializer
+from .views import StandardResultsSetPagination
+
+
+def async_get(sync_view, async_view):
+    """
+    Serve GET with async_view and all other methods with sync_view.
+    Returns sync_view unchanged when ASYNC_VIEWS_ENABLED is off: under WSGI an async view
+    would need an event loop per request.
+    """
+    if not settings.ASYNC_VIEWS_ENABLED:
+        return sync_view
+    sync_dispatch = sync_to_async(sync_view)
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            return await async_view(request, *args, **kwargs)
+        return await sync_dispatch(request, *args, **kwargs)
+    return view
+
+
+def async_api_view(view):
+    """
+    Authenticate with CookieJWTAuthentication (IsAuthenticated) and render APIExceptions
+    the way custom_exception_handler does.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            auth = await CookieJWTAuthentication().aauthenticate(request)
+            if auth is None:
+                raise NotAuthenticated()
+            request.user, request.auth = auth
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            # DRF answers 403 here because CookieJWTAuthentication sends no WWW-Authenticate header
+            status_code = 403 if isinstance(exc, (NotAuthenticated, AuthenticationFailed)) else exc.status_code
+            return JsonResponse({'detail': exc.detail, 'status_code': status_code}, status=status_code)
+    return wrapper
+
+
+async def paginate(request, queryset, serializer_class, pagination_class=StandardResultsSetPagination):
+    """
+    Async counterpart of pagination_class.paginate_queryset + get_paginated_response.
+    """
+    page_size = pagination_class().get_page_size(Request(request))
+    paginator = Paginator(queryset, page_size)
+    paginator.count = await queryset.acount()
+
+    page_number = request.GET.get(pagination_class.page_query_param, 1)
+    if page_number in pagination_class.last_page_strings:
+        page_number = paginator.num_pages
+    try:
+        number = paginator.validate_number(page_number)
+    except InvalidPage:
+        raise NotFound('Invalid page.')
+
+    bottom = (number - 1) * page_size
+    rows = [obj async for obj in queryset[bottom:bottom + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if number < paginator.num_pages:
+        next_url = replace_query_param(url, pagination_class.page_query_param, number + 1)
+    if number > 1:
+        previous_url = (remove_query_param(url, pagination_class.page_query_param) if number == 2
+                        else replace_query_param(url, pagination_class.page_query_param, number - 1))
+
+    return {
+        'count': paginator.count,
+        'next': next_url,
+        'previous': previous_url,
+        'results': serializer_class(rows, many=True, context={'request': request}).data,
+    }
+
+
+@async_api_view
+async def notification_list(request):
+    notifications = Notification.objects.filter(recipient_id=request.user.id).select_related('recipient')
+
+    is_read = request.GET.get('is_read')
+    if is_read is not None:
+        notifications = notifications.filter(is_read=is_read.lower() == 'true')
+
+    notification_type = request.GET.get('type')
+    if notification_type:
+        notifications = notifications.filter(notification_type=notification_type)
+
+    return JsonResponse(await paginate(request, notifications, NotificationSerializer))
+
+
+@async_api_view
+async def user_profile(request):
+    profile = await UserProfile.objects.select_related('user').filter(user_id=request.user.id).afirst()
+    if profile is None:
+        return JsonResponse({'error': 'Profile not found'}, status=404)
+    return JsonResponse(UserProfileSerializer(profile, context={'request': request}).data)
@@ -0,0 +1,65 @@
+"""
+Buffered writer for the AuthEvent log.
+
+Events are kept in memory and written with one bulk insert once AUTH_EVENT_BATCH_SIZE have
+accumulated, and at the latest AUTH_EVENT_FLUSH_INTERVAL seconds after the first of them, so
+an idle worker does not sit on them. A worker that is killed loses at most that window;
+AUTH_EVENT_BATCH_SIZE=1 writes every event through.
+"""
+
+import atexit
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AuthEvent
+from .tasks import run_in_background, submit
+
+_buffer = []
+_lock = threading.Lock()
+_timer = None
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR') if request is not None else None
+
+
+def record(event_type, user_id=None, request=None):
+    """
+    Buffer an auth event; see the module docstring for when the buffer is written.
+    """
+    global _timer
+    event = AuthEvent(
+        user_id=user_id,
+        event_type=event_type,
+        ip_address=client_ip(request),
+        created_at=timezone.now(),
+    )
+    with _lock:
+        _buffer.append(event)
+        due = len(_buffer) >= settings.AUTH_EVENT_BATCH_SIZE
+        if not due and _timer is None:
+            _timer = threading.Timer(settings.AUTH_EVENT_FLUSH_INTERVAL, submit, (flush,))
+            _timer.daemon = True
+            _timer.start()
+    if due:
+        run_in_background(flush)
+
+
+def flush():
+    """
+    Write all buffered events; returns how many were written.
+    """
+    global _buffer, _timer
+    with _lock:
+        events, _buffer = _buffer, []
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if events:
+        AuthEvent.objects.bulk_create(events, batch_size=settings.AUTH_EVENT_BATCH_SIZE)
+    return len(events)
+
+
+atexit.register(flush)
@@ -6,7 +6,7 @@ import logging
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 
 
-from .models import Notification
+from .tokens import TOKEN_VERSION_CLAIM, aget_token_version, get_token_version, user_from_token
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +16,58 @@ CustomUser = get_user_model()
 class CookieJWTAuthentication(BaseAuthentication):
     """
     Custom authentication class to validate JWT tokens from cookies.
+
+    Tokens carry the user's token version; it is checked against the cached
+    current version (see main.tokens), so deactivation, password changes and
+    logout revoke tokens without a CustomUser query on every request.
+
+    aauthenticate() is the same check for the async views (main.async_views).
     """
 
     def authenticate(self, request):
+        token = self._get_token(request)
+        if token is None:
+            return None
+
+        try:
+            user_id = token['user_id']
+            if TOKEN_VERSION_CLAIM not in token.payload:
+                # Issued before token versions existed
+                return self._authenticate_legacy(user_id, token)
+
+            self._check_version(token, get_token_version(user_id))
+            return (user_from_token(token), token)
+
+        except AuthenticationFailed:
+            raise
+        except Exception as e:
+            logger.error(f"Authentication error: {str(e)}", exc_info=True)
+            raise AuthenticationFailed('Invalid token')
+
+    async def aauthenticate(self, request):
+        token = self._get_token(request)
+        if token is None:
+            return None
+
+        try:
+            user_id = token['user_id']
+            if TOKEN_VERSION_CLAIM not in token.payload:
+                user = await CustomUser.objects.filter(id=user_id).afirst()
+                return self._check_legacy_user(user, user_id, token)
+
+            self._check_version(token, await aget_token_version(user_id))
+            return (user_from_token(token), token)
+
+        except AuthenticationFailed:
+            raise
+        except Exception as e:
+            logger.error(f"Authentication error: {str(e)}", exc_info=True)
+            raise AuthenticationFailed('Invalid token')
+
+    def _get_token(self, request):
+        """
+        Return the validated access token from the cookie, or None if there is no cookie.
+        """
         access_token = request.COOKIES.get('access_token')
 
         if not access_token:
@@ -28,26 +77,30 @@ class CookieJWTAuthentication(BaseAuthentication):
         try:
             # Validate the token
             token = AccessToken(access_token)
-            user_id = token.payload.get('user_id')
-            if not user_id:
-                logger.error("No user_id in token payload")
-                raise AuthenticationFailed('Invalid token')
-
-            # Get the user
-            user = CustomUser.objects.get(id=user_id)
-            if not user.is_active:
-                logger.error(f"User {user_id} is inactive")
-                raise AuthenticationFailed('User account is disabled')
-
-            logger.debug(f"Authenticated user: {user.username}")
-            return (user, token)
-
         except (TokenError, InvalidToken) as e:
             logger.error(f"Invalid access token: {str(e)}")
             raise AuthenticationFailed('Invalid or expired token')
-        except CustomUser.DoesNotExist:
-            logger.error(f"User with ID {user_id} not found")
+
+        if not token.payload.get('user_id'):
+            logger.error("No user_id in token payload")
             raise AuthenticationFailed('Invalid token')
-        except Exception as e:
-            logger.error(f"Authentication error: {str(e)}", exc_info=True)
+        return token
+
+    def _check_version(self, token, current_version):
+        if token[TOKEN_VERSION_CLAIM] != current_version:
+            logger.info(f"Revoked token used for user {token['user_id']}")
+            raise AuthenticationFailed('Token has been revoked')
+
+    def _authenticate_legacy(self, user_id, token):
+        return self._check_legacy_user(CustomUser.objects.filter(id=user_id).first(), user_id, token)
+
+    def _check_legacy_user(self, user, user_id, token):
+        if user is None:
+            logger.error(f"User with ID {user_id} not found")
             raise AuthenticationFailed('Invalid token')
+        if not user.is_active:
+            logger.error(f"User {user_id} is inactive")
+            raise AuthenticationFailed('User account is disabled')
+
+        logger.debug(f"Authenticated user: {user.username}")
+        return (user, token)
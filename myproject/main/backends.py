@@ -0,0 +1,46 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+
+from .models import CustomUser
+from .tasks import run_in_background
+
+
+def rehash_password(user_id, encoded, raw_password):
+    """
+    Store raw_password with the current hashing profile, unless the password changed meanwhile.
+    """
+    CustomUser.objects.filter(id=user_id, password=encoded).update(password=make_password(raw_password))
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with email and password using a single indexed lookup.
+
+    Unlike ModelBackend, a hash that needs upgrading (e.g. after a change of
+    PASSWORD_HASHING_PROFILE) is rewritten in the background instead of
+    during the login request.
+
+    django.contrib.auth.authenticate() (e.g. the admin login) passes the
+    USERNAME_FIELD value, the email, as username; it is accepted too.
+    """
+
+    def authenticate(self, request, email=None, password=None, username=None, **kwargs):
+        if email is None:
+            email = username
+        if email is None or password is None:
+            return None
+
+        try:
+            user = CustomUser.objects.get(email=email)
+        except CustomUser.DoesNotExist:
+            # Run the hasher anyway so response time does not reveal which emails exist
+            make_password(password)
+            return None
+
+        is_correct, must_update = verify_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+
+        if must_update:
+            run_in_background(rehash_password, user.id, user.password, password)
+        return user
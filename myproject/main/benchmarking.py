@@ -0,0 +1,134 @@
+"""
+Micro-benchmark harness for code paths that are cheap enough to time in isolation.
+
+Benchmarks are TestCase methods calling self.benchmark() and run against the
+in-memory SQLite test database:
+
+    python manage.py test main.benchmarks institutions.benchmarks
+
+Set BENCHMARK_OUTPUT to write the results as JSON and BENCHMARK_BASELINE to a
+previous output file to fail any benchmark whose ops/sec dropped by more than
+BENCHMARK_REGRESSION_THRESHOLD or whose queries/op increased.
+"""
+
+import json
+import sys
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    seconds: float
+    queries_per_op: int
+
+    @property
+    def ops_per_sec(self):
+        return self.iterations / self.seconds if self.seconds else float('inf')
+
+    @property
+    def us_per_op(self):
+        return self.seconds / self.iterations * 1_000_000
+
+    def as_dict(self):
+        return dict(asdict(self), ops_per_sec=self.ops_per_sec, us_per_op=self.us_per_op)
+
+
+def run_benchmark(name, func, min_time=0.2, min_iterations=5, max_iterations=1_000_000):
+    """
+    Time func() until both min_time seconds and min_iterations calls have passed.
+    Queries are counted on a separate call so the timed loop runs without the debug cursor.
+    """
+    func()  # warm-up
+
+    with CaptureQueriesContext(connection) as captured:
+        func()
+    queries_per_op = len(captured)
+
+    iterations = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        iterations += 1
+        elapsed = time.perf_counter() - start
+        if (elapsed >= min_time and iterations >= min_iterations) or iterations >= max_iterations:
+            break
+
+    return BenchmarkResult(name=name, iterations=iterations, seconds=elapsed, queries_per_op=queries_per_op)
+
+
+def load_baseline():
+    path = settings.BENCHMARK_BASELINE
+    if not path or not Path(path).exists():
+        return {}
+    return json.loads(Path(path).read_text())
+
+
+def write_results(results):
+    """
+    Merge results into BENCHMARK_OUTPUT so several test modules can share one file.
+    """
+    path = settings.BENCHMARK_OUTPUT
+    if not path:
+        return
+    path = Path(path)
+    existing = json.loads(path.read_text()) if path.exists() else {}
+    existing.update({name: result.as_dict() for name, result in results.items()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(existing, indent=2, sort_keys=True))
+
+
+@tag('benchmark')
+class BenchmarkTestCase(TestCase):
+    """
+    Base class for benchmarks; results are reported when the class finishes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = {}
+        cls.baseline = load_baseline()
+
+    @classmethod
+    def tearDownClass(cls):
+        for result in cls.results.values():
+            sys.stderr.write(
+                f"\n{result.name:<60} {result.ops_per_sec:>12,.0f} ops/s "
+                f"{result.us_per_op:>10,.1f} us/op {result.queries_per_op:>4} queries/op"
+            )
+        if cls.results:
+            sys.stderr.write('\n')
+        write_results(cls.results)
+        super().tearDownClass()
+
+    def benchmark(self, name, func, max_queries=None, **kwargs):
+        result = run_benchmark(name, func, **kwargs)
+        self.results[name] = result
+
+        if max_queries is not None:
+            self.assertLessEqual(
+                result.queries_per_op, max_queries,
+                f"{name} ran {result.queries_per_op} queries per call, expected at most {max_queries}"
+            )
+
+        previous = self.baseline.get(name)
+        if previous:
+            self.assertLessEqual(
+                result.queries_per_op, previous['queries_per_op'],
+                f"{name} queries/op regressed from {previous['queries_per_op']} to {result.queries_per_op}"
+            )
+            floor = previous['ops_per_sec'] * (1 - settings.BENCHMARK_REGRESSION_THRESHOLD)
+            self.assertGreaterEqual(
+                result.ops_per_sec, floor,
+                f"{name} regressed from {previous['ops_per_sec']:,.0f} to {result.ops_per_sec:,.0f} ops/s"
+            )
+        return result
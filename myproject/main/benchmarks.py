@@ -0,0 +1,129 @@
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client, RequestFactory, override_settings
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import auth_events
+from .authentication import CookieJWTAuthentication
+from .benchmarking import BenchmarkTestCase
+from .models import CustomUser, Notification
+from .serializers import LoginSerializer
+from .throttling import LocalStore, TokenBucketThrottle, parse_rate
+from .tokens import issue_tokens
+from .views import LoginView
+
+
+class AuthenticationBenchmark(BenchmarkTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='bench', email='bench@example.com', role='job_seeker')
+
+    def test_cookie_jwt_authenticate(self):
+        request = RequestFactory().get('/api/main/users/profile/')
+        request.COOKIES['access_token'] = str(issue_tokens(self.user).access_token)
+        authentication = CookieJWTAuthentication()
+
+        # The token version is cached after the warm-up call, so no query is expected
+        self.benchmark('CookieJWTAuthentication.authenticate', lambda: authentication.authenticate(request),
+                       max_queries=0)
+
+    def test_cookie_jwt_authenticate_legacy_token(self):
+        request = RequestFactory().get('/api/main/users/profile/')
+        request.COOKIES['access_token'] = str(AccessToken.for_user(self.user))
+        authentication = CookieJWTAuthentication()
+
+        self.benchmark('CookieJWTAuthentication.authenticate[legacy token]',
+                       lambda: authentication.authenticate(request), max_queries=1)
+
+
+class AdminNotificationBenchmark(BenchmarkTestCase):
+    ADMIN_COUNTS = (1, 10, 100)
+
+    @classmethod
+    def setUpTestData(cls):
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'admin-{i}', email=f'admin{i}@example.com', role='admin')
+            for i in range(max(cls.ADMIN_COUNTS))
+        ])
+
+    def test_create_admin_notification(self):
+        for count in self.ADMIN_COUNTS:
+            # Deactivate the admins beyond `count` so the fan-out matches the scenario
+            CustomUser.objects.update(is_active=False)
+            CustomUser.objects.filter(
+                id__in=CustomUser.objects.order_by('id').values_list('id', flat=True)[:count]
+            ).update(is_active=True)
+
+            # One SELECT plus the INSERT batches the backend needs (SQLite caps parameters per statement)
+            fields = [field for field in Notification._meta.concrete_fields if not field.primary_key]
+            batch_size = connection.ops.bulk_batch_size(fields, [None] * count)
+            self.benchmark(
+                f'Notification.create_admin_notification[{count} admins]',
+                lambda: Notification.create_admin_notification(title='Benchmark', message='Benchmark'),
+                max_queries=1 + -(-count // batch_size),
+            )
+
+
+class LoginBenchmark(BenchmarkTestCase):
+    PASSWORD = 'benchmark-password'
+
+    def create_user(self, profile):
+        with override_settings(PASSWORD_HASHING_PROFILE=profile):
+            return CustomUser.objects.create(
+                username=f'login-{profile}', email=f'login-{profile}@example.com',
+                role='job_seeker', password=make_password(self.PASSWORD),
+            )
+
+    def test_login_serializer(self):
+        for profile in ('strong', 'balanced'):
+            user = self.create_user(profile)
+            data = {'email': user.email, 'password': self.PASSWORD}
+            with override_settings(PASSWORD_HASHING_PROFILE=profile):
+                self.benchmark(f'LoginSerializer.is_valid[{profile}]',
+                               lambda: LoginSerializer(data=data).is_valid(raise_exception=True),
+                               max_queries=1, min_time=0, min_iterations=3)
+
+    def test_login_view(self):
+        user = self.create_user('balanced')
+        # Write buffered auth events while the test database still exists, not at interpreter exit
+        self.addCleanup(auth_events.flush)
+
+        def login():
+            # A new client per login, so no access_token cookie is sent along
+            response = Client().post('/api/main/auth/login/', {'email': user.email, 'password': self.PASSWORD},
+                                     content_type='application/json', secure=True)
+            self.assertEqual(response.status_code, 200)
+
+        # The login notification is deferred until commit, which never happens inside a TestCase
+        with override_settings(PASSWORD_HASHING_PROFILE='balanced'):
+            self.benchmark('LoginView.post[balanced]', login, max_queries=1, min_time=0, min_iterations=3)
+
+
+class ThrottleBenchmark(BenchmarkTestCase):
+    """
+    Cost of a rate-limit check on the allowed path. The rate is high enough that no call in
+    the timed loop is throttled.
+
+    The sub-microsecond target for the allowed path is not met. On the reference machine,
+    LocalStore.hit takes about 1.0-1.3 us here. About 0.2 us of that is the harness's call
+    and timer overhead. allow_request takes about 2 us, mostly DRF's request.user property
+    and the client IP lookup. The cache store adds a cache round trip on top.
+    """
+    RATE = '100000000/min'
+
+    def test_local_store(self):
+        store = LocalStore()
+        rate = parse_rate(self.RATE)
+        result = self.benchmark('LocalStore.hit', lambda: store.hit('login:127.0.0.1', *rate), max_queries=0)
+        self.assertEqual(store.hit('login:127.0.0.1', *rate), 0.0)
+        self.assertGreater(result.ops_per_sec, 0)
+
+    def test_throttle(self):
+        request = APIView().initialize_request(RequestFactory().post('/api/main/auth/login/'))
+        view = LoginView()
+        throttle = TokenBucketThrottle()
+        with override_settings(RATE_LIMITS={'login': self.RATE}, RATE_LIMIT_STORE='local'):
+            self.benchmark('TokenBucketThrottle.allow_request', lambda: throttle.allow_request(request, view),
+                           max_queries=0)
+            self.assertTrue(throttle.allow_request(request, view))
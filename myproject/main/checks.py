@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.security, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Refresh-token reuse detection and token revocation rely on the default cache being shared
+    by every worker process.
+    """
+    if settings.CACHES['default']['BACKEND'] in PER_PROCESS_CACHES:
+        return [Warning(
+            'The default cache is per process, so a refresh token reused on another worker is not '
+            'detected and revoked tokens keep working there for up to TOKEN_VERSION_CACHE_TIMEOUT seconds.',
+            hint='Set REDIS_URL for production.',
+            id='main.W001',
+        )]
+    return []
@@ -0,0 +1,130 @@
+"""
+Deferred, batched signal work.
+
+Signal receivers call defer(handler, key, payload) instead of writing straight away. Within a
+deferred_signals() scope (every request gets one from DeferredSignalsMiddleware), work is
+collected per handler and keyed. A repeated key replaces the earlier payload, or is combined
+with it when a merge function is given. When the scope ends, each handler runs once with all
+its payloads, so ten profile saves in one request send one notification, and stats deltas for
+one institution become a single UPDATE.
+
+Work only joins the batch once the transaction it was deferred in commits. If that transaction
+rolls back, the work is dropped with it. A scope that ends inside a transaction runs its batch
+when that transaction commits.
+
+suppressed_signals() drops deferred work instead, for bulk operations that fix up their
+side effects themselves. Outside any scope, defer() runs the handler with the single
+payload on commit, which is what the receivers did before.
+"""
+
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_batch = ContextVar('deferred_signal_batch', default=None)
+
+
+class Batch:
+    def __init__(self, suppress=False):
+        self.suppress = suppress
+        self.work = {}
+
+    def add(self, handler, key, payload, merge=None):
+        payloads = self.work.setdefault(handler, {})
+        if merge is not None and key in payloads:
+            payload = merge(payloads[key], payload)
+        payloads[key] = payload
+
+    def run(self):
+        # Work the handlers defer in turn (a profile save notifying, say) joins this batch
+        token = _batch.set(self)
+        try:
+            self.drain()
+        finally:
+            _batch.reset(token)
+
+    def drain(self):
+        while self.work:
+            work, self.work = self.work, {}
+            for handler, payloads in work.items():
+                try:
+                    handler(payloads)
+                except Exception as e:
+                    logger.error(f"Deferred signal handler {handler.__qualname__} failed: {str(e)}", exc_info=True)
+
+
+def defer(handler, key, payload, merge=None, using=None):
+    """
+    Run handler({key: payload, ...}) once the surrounding deferred_signals() scope ends and the
+    current transaction has committed. merge(old, new) combines payloads deferred under the same
+    key; without it the latest payload wins.
+    """
+    batch = _batch.get()
+    if batch is None:
+        transaction.on_commit(lambda: handler({key: payload}), using=using)
+    elif not batch.suppress:
+        transaction.on_commit(lambda: batch.add(handler, key, payload, merge), using=using)
+
+
+@contextmanager
+def deferred_signals(using=None):
+    """
+    Collect deferred signal work and run it in batches when the block ends (or, inside a
+    transaction, when it commits). Nested scopes share the outermost batch.
+    """
+    if _batch.get() is not None and not _batch.get().suppress:
+        yield
+        return
+    batch = Batch()
+    token = _batch.set(batch)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        # Runs straight away in autocommit, after the items' own on_commit callbacks otherwise
+        transaction.on_commit(batch.run, using=using)
+
+
+@asynccontextmanager
+async def adeferred_signals():
+    """
+    deferred_signals() for async code. Sync views run from it share the batch (their thread
+    gets a copy of the context), and the batch runs on the sync thread when the block ends.
+    """
+    if _batch.get() is not None and not _batch.get().suppress:
+        yield
+        return
+    batch = Batch()
+    token = _batch.set(batch)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        await sync_to_async(batch.run)()
+
+
+@contextmanager
+def suppressed_signals():
+    """
+    Drop all work deferred inside the block.
+    """
+    token = _batch.set(Batch(suppress=True))
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+
+
+def merge_counts(old, new):
+    """
+    merge for payloads that are {field: delta} dicts.
+    """
+    merged = dict(old)
+    for field, delta in new.items():
+        merged[field] = merged.get(field, 0) + delta
+    return merged
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ProfiledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher whose work factor comes from settings.PASSWORD_HASHING_PROFILE.
+
+    The algorithm name is unchanged, so existing hashes stay valid and are
+    rehashed on the next login whenever the profile's iteration count changes.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASHING_PROFILES[settings.PASSWORD_HASHING_PROFILE]
@@ -0,0 +1,104 @@
+"""
+Idempotency-Key support for write endpoints that clients retry.
+
+A client sends `Idempotency-Key: <unique value>` with a POST. The first request runs normally
+and its response is kept in the cache for IDEMPOTENCY_KEY_TTL seconds. Replays of the same key
+get that response back, with `Idempotent-Replayed: true`, without running the view again.
+Keys are scoped per endpoint and per user, or per client IP for anonymous requests (registration),
+so a client's key never reaches another client's response. Anonymous clients behind one address
+(NAT, NUM_PROXIES too low) do share a key space; use random keys such as UUIDs.
+
+Each entry holds a 16-byte fingerprint of the request body, the status code and the response
+data. Reusing a key with a different body is rejected with 422. A retry that arrives while the
+first request is still running gets 409 and a Retry-After header. Errors are not stored:
+exceptions and 5xx responses release the key, so the next retry runs the request again.
+"""
+
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .throttling import client_ip
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+_IN_PROGRESS = 'in-progress'
+
+
+def fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.blake2b(f'{request.method} {request.path}\n{body}'.encode(), digest_size=16).digest()
+
+
+def cache_key(scope, request, key):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        owner = user.pk
+    else:
+        owner = f"ip-{client_ip(request.META, api_settings.NUM_PROXIES)}"
+    digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    return f'idempotency:{scope}:{owner}:{digest}'
+
+
+def idempotent(scope):
+    """
+    Decorator for an APIView handler (post) that honours the Idempotency-Key header.
+    Put it outside transaction_atomic so a response is only stored once its writes are committed.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.META.get(HEADER)
+            if not key:
+                return handler(self, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response({'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            entry_key = cache_key(scope, request, key)
+            request_fingerprint = fingerprint(request)
+            # add() is atomic, so of two racing retries exactly one runs the request
+            if not cache.add(entry_key, (_IN_PROGRESS, request_fingerprint),
+                             timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                return replay(cache.get(entry_key), request_fingerprint)
+
+            try:
+                response = handler(self, request, *args, **kwargs)
+            except Exception:
+                cache.delete(entry_key)
+                raise
+            if response.status_code >= 500 or not isinstance(response, Response):
+                cache.delete(entry_key)
+            else:
+                cache.set(entry_key, (request_fingerprint, response.status_code, response.data),
+                          timeout=settings.IDEMPOTENCY_KEY_TTL)
+            return response
+        return wrapper
+    return decorator
+
+
+def replay(entry, request_fingerprint):
+    if entry is None:
+        # Released between add() and get(): the first attempt failed and can be retried
+        return Response({'error': 'A request with this Idempotency-Key failed; retry it.'},
+                        status=status.HTTP_409_CONFLICT, headers={'Retry-After': '0'})
+    if entry[0] == _IN_PROGRESS:
+        if entry[1] != request_fingerprint:
+            return mismatch()
+        return Response({'error': 'A request with this Idempotency-Key is still being processed.'},
+                        status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+    stored_fingerprint, status_code, data = entry
+    if stored_fingerprint != request_fingerprint:
+        return mismatch()
+    return Response(data, status=status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def mismatch():
+    return Response({'error': 'This Idempotency-Key was already used with a different request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from main.models import ProfileSkill, UserProfile
+from main.skills import canonical_key, resolve
+
+
+class Command(BaseCommand):
+    help = 'Fill the ProfileSkill index from UserProfile.skills for profiles saved before it existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true', help='Delete all ProfileSkill rows first')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            ProfileSkill.objects.all().delete()
+
+        profiles = UserProfile.objects.exclude(skills=[]).values_list('user_id', 'skills').order_by('user_id')
+        batch, written = [], 0
+        for profile in profiles.iterator(chunk_size=options['batch_size']):
+            batch.append(profile)
+            if len(batch) >= options['batch_size']:
+                written += self.index(batch)
+                batch = []
+        written += self.index(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} profile skills"))
+
+    def index(self, profiles):
+        """
+        Resolve every skill name in the batch at once and insert the missing rows in bulk.
+        """
+        skills_by_profile = {
+            profile_id: skills for profile_id, skills in profiles if isinstance(skills, list)
+        }
+        skill_ids = resolve([name for skills in skills_by_profile.values() for name in skills], create=True)
+        rows = {
+            (profile_id, skill_ids[canonical_key(name)])
+            for profile_id, skills in skills_by_profile.items()
+            for name in skills if canonical_key(name) in skill_ids
+        }
+        ProfileSkill.objects.bulk_create(
+            [ProfileSkill(profile_id=profile_id, skill_id=skill_id) for profile_id, skill_id in rows],
+            batch_size=1000, ignore_conflicts=True,
+        )
+        return len(rows)
@@ -0,0 +1,188 @@
+import http.client
+import json
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import CustomUser
+from main.tokens import issue_tokens
+from institutions.models import Job
+from .bench_db_connections import percentile
+from .run_load_test import git_commit
+
+SERVERS = {
+    # Sync DRF views on a threaded WSGI worker
+    'wsgi': ('gunicorn myproject.wsgi:application --workers 1 --threads {threads} '
+             '--bind 127.0.0.1:{port} --log-level warning', {'ASYNC_VIEWS_ENABLED': 'False'}),
+    # Async views on a single ASGI event loop
+    'asgi': ('uvicorn myproject.asgi:application --workers 1 --host 127.0.0.1 --port {port} '
+             '--log-level warning', {'ASYNC_VIEWS_ENABLED': 'True'}),
+}
+
+
+class Command(BaseCommand):
+    help = ('Start the project under a WSGI and an ASGI server in turn and drive the async-capable '
+            'read endpoints at increasing concurrency, recording throughput and latency for each')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='employer0@loadtest.local',
+                            help='Company member the requests authenticate as (job lists need one)')
+        parser.add_argument('--concurrency', default='1,8,32,128',
+                            help='Comma-separated numbers of concurrent clients')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--servers', default='wsgi,asgi')
+        parser.add_argument('--wsgi-command', default=SERVERS['wsgi'][0])
+        parser.add_argument('--asgi-command', default=SERVERS['asgi'][0])
+        parser.add_argument('--output', help='Result file (defaults to benchmarks/results/<timestamp>-async-views.json)')
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User {options['email']} not found; run seed_load_data or pass --email")
+        job = Job.objects.filter(posted_by=user).first() or Job.objects.first()
+        if job is None:
+            raise CommandError('No jobs found; run seed_load_data first')
+
+        paths = [
+            '/api/main/notifications/',
+            '/api/main/users/profile/',
+            '/api/institutions/jobs/',
+            f'/api/institutions/jobs/{job.id}/',
+        ]
+        access_token = str(issue_tokens(user).access_token)
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        started = datetime.now(timezone.utc)
+
+        results = {}
+        for name in options['servers'].split(','):
+            command = options[f'{name}_command'].format(port=options['port'], threads=options['threads'])
+            server = self.start_server(command, SERVERS[name][1], options['port'])
+            try:
+                self.check_server(options['port'], paths[0], access_token)
+                results[name] = []
+                for level in levels:
+                    run = self.drive(options['port'], paths, access_token, level, options['duration'])
+                    results[name].append(run)
+                    self.stdout.write(
+                        f"{name} c={level:<4} {run['throughput_rps']:>8.1f} req/s  "
+                        f"p50 {run['latency_ms']['p50']:>7.1f} ms  p99 {run['latency_ms']['p99']:>7.1f} ms  "
+                        f"{run['errors']} errors"
+                    )
+            finally:
+                server.terminate()
+                server.wait(timeout=10)
+
+        result = {
+            'commit': git_commit(),
+            'started_at': started.isoformat(),
+            'config': {
+                'paths': paths,
+                'duration': options['duration'],
+                'wsgi_threads': options['threads'],
+                'vendor': settings.DATABASES['default']['ENGINE'],
+            },
+            'servers': results,
+        }
+        output = options['output'] or str(
+            settings.BASE_DIR / 'benchmarks' / 'results' / f"{started.strftime('%Y%m%dT%H%M%S')}-async-views.json"
+        )
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(json.dumps(result, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def start_server(self, command, env, port, timeout=30):
+        try:
+            server = subprocess.Popen(shlex.split(command), cwd=settings.BASE_DIR, env={**os.environ, **env})
+        except FileNotFoundError:
+            raise CommandError(f"Cannot run '{command.split()[0]}'; install it or pass --wsgi-command/--asgi-command")
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"'{command}' exited with status {server.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"'{command}' did not start listening on port {port} within {timeout}s")
+
+    def check_server(self, port, path, access_token):
+        status, location = self.request(http.client.HTTPConnection('127.0.0.1', port), path, access_token)
+        if status in (301, 302) and location.startswith('https://'):
+            raise CommandError('The server redirects to HTTPS; run with DJANGO_DEBUG=True for local benchmarks')
+        if status != 200:
+            raise CommandError(f"GET {path} returned {status}")
+
+    def request(self, conn, path, access_token):
+        conn.request('GET', path, headers={
+            'Host': settings.ALLOWED_HOSTS[0],
+            'Cookie': f'access_token={access_token}',
+        })
+        response = conn.getresponse()
+        response.read()
+        return response.status, response.getheader('Location', '')
+
+    def drive(self, port, paths, access_token, concurrency, duration):
+        """
+        Closed loop: each client sends its next request as soon as the previous one answers.
+        """
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + duration
+
+        def client(offset):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            samples, failed, i = [], 0, offset
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                try:
+                    status, _ = self.request(conn, paths[i % len(paths)], access_token)
+                    if status != 200:
+                        failed += 1
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                samples.append((time.perf_counter() - start) * 1000)
+                i += 1
+            conn.close()
+            with lock:
+                latencies.extend(samples)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - wall_start
+
+        return {
+            'concurrency': concurrency,
+            'requests': len(latencies),
+            'errors': sum(errors),
+            'throughput_rps': len(latencies) / wall_seconds,
+            'latency_ms': {
+                'mean': statistics.fmean(latencies),
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': max(latencies),
+            },
+        }
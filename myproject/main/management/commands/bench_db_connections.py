@@ -0,0 +1,162 @@
+import json
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from main.models import CustomUser
+from main.tokens import issue_tokens
+from .run_load_test import git_commit
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Measure per-request latency and database connection usage of the current connection '
+            'settings under concurrent threads; run once with DB_POOL_ENABLED=True and once without to compare')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/main/notifications/')
+        parser.add_argument('--email', default='admin0@loadtest.local', help='User the requests authenticate as')
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per thread')
+        parser.add_argument('--label', default='')
+        parser.add_argument('--output', help='Result file (defaults to benchmarks/results/<timestamp>-connections.json)')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['requests'] < 1:
+            raise CommandError('--threads and --requests must be at least 1')
+        try:
+            user = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User {options['email']} not found; run seed_load_data or pass --email")
+        # A versioned token, so requests take the same cached path as real logins
+        access_token = str(issue_tokens(user).access_token)
+
+        opened = []
+        counter_lock = threading.Lock()
+
+        def count_connection(sender, **kwargs):
+            with counter_lock:
+                opened.append(threading.get_ident())
+
+        latencies = []
+        errors = []
+        failures = []
+        # Workers hold their connections until the server-side count has been sampled
+        finished = threading.Barrier(options['threads'] + 1)
+        sampled = threading.Barrier(options['threads'] + 1)
+        connection_created.connect(count_connection)
+
+        def worker():
+            try:
+                client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+                client.cookies['access_token'] = access_token
+                samples = []
+                for _ in range(options['requests']):
+                    start = time.perf_counter()
+                    response = client.get(options['path'], secure=True)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+                with counter_lock:
+                    latencies.extend(samples)
+                finished.wait()
+                sampled.wait()
+            except threading.BrokenBarrierError:
+                pass
+            except Exception as e:
+                failures.append(e)
+                # Release the other workers and the main thread instead of leaving them waiting
+                finished.abort()
+                sampled.abort()
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = datetime.now(timezone.utc)
+        wall_start = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            finished.wait()
+            wall_seconds = time.perf_counter() - wall_start
+            server_connections = self.server_connections()
+            pool_stats = connection.pool.get_stats() if getattr(connection, 'pool', None) is not None else None
+            sampled.wait()
+        except threading.BrokenBarrierError:
+            failure = failures[0] if failures else None
+            raise CommandError(f"A worker failed: {failure!r}") from failure
+        except BaseException:
+            finished.abort()
+            sampled.abort()
+            raise
+        finally:
+            for thread in threads:
+                if thread.ident is not None:
+                    thread.join()
+            connection_created.disconnect(count_connection)
+
+        result = {
+            'commit': git_commit(),
+            'label': options['label'],
+            'started_at': started.isoformat(),
+            'config': {
+                'path': options['path'],
+                'threads': options['threads'],
+                'requests_per_thread': options['requests'],
+                'vendor': connection.vendor,
+                'pooled': getattr(connection, 'pool', None) is not None,
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'conn_health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+            },
+            'requests': len(latencies),
+            'errors': len(errors),
+            'throughput_rps': len(latencies) / wall_seconds,
+            'latency_ms': {
+                'mean': statistics.fmean(latencies),
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': max(latencies),
+            },
+            # connection_created fires for every new connection and every pool checkout
+            'connections_opened': len(opened),
+            'server_connections': server_connections,
+            'pool': pool_stats,
+        }
+
+        output = options['output'] or str(
+            settings.BASE_DIR / 'benchmarks' / 'results' / f"{started.strftime('%Y%m%dT%H%M%S')}-connections.json"
+        )
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(json.dumps(result, indent=2))
+
+        self.stdout.write(
+            f"{result['requests']} requests, {result['errors']} errors, {result['throughput_rps']:.1f} req/s, "
+            f"p50 {result['latency_ms']['p50']:.1f} ms, p95 {result['latency_ms']['p95']:.1f} ms, "
+            f"p99 {result['latency_ms']['p99']:.1f} ms, {result['connections_opened']} connections opened, "
+            f"{result['server_connections']} server connections"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def server_connections(self):
+        """
+        Connections the database server currently holds for this database (PostgreSQL only).
+        """
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()')
+            return cursor.fetchone()[0]
@@ -0,0 +1,92 @@
+import gzip
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from main.models import Notification
+
+ARCHIVE_FIELDS = [
+    'id', 'recipient_id', 'notification_type', 'title', 'message', 'is_read',
+    'created_at', 'related_object_id', 'related_object_type', 'group_key', 'aggregate_count',
+]
+
+
+class Command(BaseCommand):
+    help = ('Delete notifications older than their type\'s NOTIFICATION_RETENTION_DAYS in bounded batches, '
+            'optionally archiving them to a gzipped NDJSON file first')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', dest='types', action='append',
+                            help='Only prune this notification type (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help='Seconds to pause between batches so other writers get the table')
+        parser.add_argument('--archive', action='store_true',
+                            help='Write pruned rows to NOTIFICATION_ARCHIVE_DIR as NDJSON.gz before deleting')
+        parser.add_argument('--archive-dir', default=str(settings.NOTIFICATION_ARCHIVE_DIR))
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be pruned')
+
+    def handle(self, *args, **options):
+        retention = settings.NOTIFICATION_RETENTION_DAYS
+        types = options['types'] or list(retention)
+        unknown = [t for t in types if t not in retention]
+        if unknown:
+            raise CommandError(f"No retention configured for: {', '.join(unknown)}")
+
+        now = timezone.now()
+        archive = None
+        if options['archive'] and not options['dry_run']:
+            archive_dir = Path(options['archive_dir'])
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            archive_path = archive_dir / f"notifications-{now:%Y%m%dT%H%M%S}.ndjson.gz"
+            archive = gzip.open(archive_path, 'wt', encoding='utf-8')
+
+        try:
+            total = 0
+            for notification_type in types:
+                cutoff = now - timedelta(days=retention[notification_type])
+                expired = Notification.objects.filter(notification_type=notification_type, created_at__lt=cutoff)
+
+                if options['dry_run']:
+                    count = expired.count()
+                else:
+                    count = self.prune(expired, archive, options['batch_size'], options['sleep'])
+                total += count
+                self.stdout.write(f"{notification_type}: {count} older than {cutoff:%Y-%m-%d}")
+        finally:
+            if archive:
+                archive.close()
+
+        verb = 'Would prune' if options['dry_run'] else 'Pruned'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} notifications"))
+        if archive and total:
+            self.stdout.write(f"Archived to {archive_path}")
+        elif archive:
+            archive_path.unlink()
+
+    def prune(self, expired, archive, batch_size, sleep):
+        """
+        Delete matching rows one batch at a time, oldest first along the
+        (notification_type, created_at) index, so each DELETE holds its locks briefly.
+        """
+        pruned = 0
+        while True:
+            batch = list(expired.order_by('created_at').values(*ARCHIVE_FIELDS)[:batch_size])
+            if not batch:
+                return pruned
+
+            if archive:
+                for row in batch:
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                archive.flush()
+
+            deleted, _ = Notification.objects.filter(id__in=[row['id'] for row in batch]).delete()
+            pruned += deleted
+            if sleep:
+                time.sleep(sleep)
@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main.models import AuthEvent
+
+
+class Command(BaseCommand):
+    help = 'Delete auth events older than AUTH_EVENT_RETENTION_DAYS in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.AUTH_EVENT_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        while True:
+            # Oldest first along the created_at index; each batch is a short transaction
+            ids = list(
+                AuthEvent.objects.filter(created_at__lt=cutoff)
+                .order_by('created_at').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            deleted, _ = AuthEvent.objects.filter(id__in=ids).delete()
+            total += deleted
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} auth events older than {cutoff:%Y-%m-%d %H:%M}"))
@@ -0,0 +1,161 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.throttling import parse_rate
+
+PERCENTILES = ['50%', '90%', '95%', '99%', '99.9%']
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_stats(path):
+    """
+    Convert a Locust *_stats.csv file into a list of per-endpoint results.
+    """
+    results = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            results.append({
+                'method': row['Type'] or None,
+                'name': row['Name'],
+                'requests': int(row['Request Count']),
+                'failures': int(row['Failure Count']),
+                'rps': float(row['Requests/s']),
+                'avg_ms': float(row['Average Response Time']),
+                'max_ms': float(row['Max Response Time']),
+                'percentiles_ms': {p: _number(row[p]) for p in PERCENTILES},
+            })
+    return results
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Run the Locust scenarios headless and record throughput and latency percentiles as JSON. '
+            'All simulated users log in from one address, so start the target server with '
+            'RATE_LIMIT_ENABLED=False or RATE_LIMIT_LOGIN above --users.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--spawn-rate', type=float, default=10)
+        parser.add_argument('--run-time', default='1m')
+        parser.add_argument('--label', default='', help='Free-form label stored with the results (e.g. "asgi")')
+        parser.add_argument('--manifest', default=str(settings.BASE_DIR / 'benchmarks' / 'manifest.json'))
+        parser.add_argument('--output', help='Result file (defaults to benchmarks/results/<timestamp>-<commit>.json)')
+        parser.add_argument('--compare', help='Previous result file to print latency/throughput deltas against')
+
+    def handle(self, *args, **options):
+        if not Path(options['manifest']).exists():
+            raise CommandError(f"Manifest {options['manifest']} not found; run seed_load_data first")
+
+        self.check_login_limit(options['users'])
+
+        locustfile = Path(__file__).resolve().parents[3] / 'myproject' / 'locustfile.py'
+        commit = git_commit()
+        started = datetime.now(timezone.utc)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_prefix = os.path.join(tmp, 'run')
+            command = [
+                sys.executable, '-m', 'locust',
+                '-f', str(locustfile),
+                '--headless', '--only-summary',
+                '--host', options['host'],
+                '--users', str(options['users']),
+                '--spawn-rate', str(options['spawn_rate']),
+                '--run-time', options['run_time'],
+                '--csv', csv_prefix,
+            ]
+            env = dict(os.environ, LOADTEST_MANIFEST=options['manifest'])
+            self.stdout.write(f"Running: {' '.join(command)}")
+            completed = subprocess.run(command, env=env)
+            # Locust exits with 1 when any request failed; the stats are still valid
+            if completed.returncode not in (0, 1):
+                raise CommandError(f"Locust exited with status {completed.returncode}")
+
+            endpoints = parse_stats(f'{csv_prefix}_stats.csv')
+
+        aggregated = next((e for e in endpoints if e['name'] == 'Aggregated'), None)
+        result = {
+            'commit': commit,
+            'label': options['label'],
+            'started_at': started.isoformat(),
+            'config': {
+                'host': options['host'],
+                'users': options['users'],
+                'spawn_rate': options['spawn_rate'],
+                'run_time': options['run_time'],
+            },
+            'aggregated': aggregated,
+            'endpoints': [e for e in endpoints if e['name'] != 'Aggregated'],
+        }
+
+        output = options['output'] or str(
+            settings.BASE_DIR / 'benchmarks' / 'results' /
+            f"{started.strftime('%Y%m%dT%H%M%S')}-{commit or 'nocommit'}.json"
+        )
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(json.dumps(result, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if aggregated:
+            self.stdout.write(
+                f"{aggregated['rps']:.1f} req/s, p50 {aggregated['percentiles_ms']['50%']} ms, "
+                f"p95 {aggregated['percentiles_ms']['95%']} ms, p99 {aggregated['percentiles_ms']['99%']} ms, "
+                f"{aggregated['failures']} failures"
+            )
+
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), result)
+
+    def check_login_limit(self, users):
+        # The server usually runs with the same environment; warn if its login limit would
+        # throttle the users' logins (they wait out Retry-After, which skews the run)
+        if not settings.RATE_LIMIT_ENABLED or 'login' not in settings.RATE_LIMITS:
+            return
+        interval, tolerance, period = parse_rate(settings.RATE_LIMITS['login'])
+        burst = round(period / interval)
+        if burst < users:
+            self.stderr.write(self.style.WARNING(
+                f"The login rate limit ({settings.RATE_LIMITS['login']} per IP) is below --users {users}; "
+                f"start the target server with RATE_LIMIT_ENABLED=False or RATE_LIMIT_LOGIN={users}/min"
+            ))
+
+    def compare(self, baseline, current):
+        previous = {(e['method'], e['name']): e for e in baseline['endpoints']}
+        self.stdout.write(f"\nCompared with {baseline.get('commit')} ({baseline.get('label') or 'no label'}):")
+        for endpoint in current['endpoints']:
+            before = previous.get((endpoint['method'], endpoint['name']))
+            if not before:
+                continue
+            p95_before = before['percentiles_ms']['95%']
+            p95_after = endpoint['percentiles_ms']['95%']
+            if not p95_before or p95_after is None:
+                continue
+            change = (p95_after - p95_before) / p95_before * 100
+            self.stdout.write(
+                f"  {endpoint['method']} {endpoint['name']}: p95 {p95_before:.0f} -> {p95_after:.0f} ms "
+                f"({change:+.1f}%), {before['rps']:.1f} -> {endpoint['rps']:.1f} req/s"
+            )
@@ -1,8 +1,19 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+import random
+import threading
 import time
 import logging
 
+from .db_routers import replica_aliases, replica_reads
+from .deferred import adeferred_signals, deferred_signals
+from .profiling import StackSampler, write_collapsed
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,6 +35,30 @@ class RequestLogMiddleware(MiddlewareMixin):
         return response
 
 
+class DeferredSignalsMiddleware:
+    """
+    Collect the signal work deferred during a request (main.deferred) and run it in
+    batches once the view is done.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with deferred_signals():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with adeferred_signals():
+            return await self.get_response(request)
+
+
 class APIExceptionMiddleware(MiddlewareMixin):
     """
     Middleware to handle any unhandled exceptions in the views
@@ -34,3 +69,157 @@ class APIExceptionMiddleware(MiddlewareMixin):
         return JsonResponse({
             "error": "An unexpected error occurred. Please try again later."
         }, status=500)
+
+
+class SamplingProfilerMiddleware(MiddlewareMixin):
+    """
+    Middleware to profile a fraction of requests with a stack sampler and
+    store the collapsed stacks per route under PROFILING_OUTPUT_DIR.
+
+    A request is profiled when it falls within PROFILING_SAMPLE_RATE or when an
+    admin sends the PROFILING_HEADER header. With PROFILING_ENABLED off the
+    middleware removes itself from the stack.
+
+    Sampling starts in process_view, which runs in the thread of a sync view under
+    both WSGI and ASGI (Django runs a request's thread-sensitive calls in one thread).
+    Async views are not profiled: they share the event loop thread with every other
+    in-flight request, so its stack samples could not be attributed to one view.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.interval = settings.PROFILING_INTERVAL
+        self.header = 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+        self.slots = threading.BoundedSemaphore(settings.PROFILING_MAX_CONCURRENT)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if iscoroutinefunction(view_func) or not self._should_profile(request):
+            return
+        if not self.slots.acquire(blocking=False):
+            return
+        request._profiler = StackSampler(threading.get_ident(), interval=self.interval)
+        request._profiler.start()
+
+    def process_response(self, request, response):
+        sampler = getattr(request, '_profiler', None)
+        if sampler is None:
+            return response
+
+        try:
+            sampler.stop()
+            match = getattr(request, 'resolver_match', None)
+            route = match.route if match else request.path
+            path = write_collapsed(route, sampler.samples)
+            logger.info(
+                f"Profiled {request.method} {request.path}: "
+                f"{sum(sampler.samples.values())} samples written to {path}"
+            )
+        except OSError as e:
+            logger.error(f"Failed to write profile for {request.path}: {str(e)}")
+        finally:
+            request._profiler = None
+            self.slots.release()
+        return response
+
+    def _should_profile(self, request):
+        if request.META.get(self.header):
+            return self._is_admin(request)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _is_admin(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return getattr(user, 'role', None) == 'admin'
+
+        # API clients authenticate with the JWT cookie, which DRF only checks inside the view
+        from .authentication import CookieJWTAuthentication
+        try:
+            result = CookieJWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return bool(result) and result[0].role == 'admin'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Middleware to let safe requests read from replicas while keeping read-your-writes consistency.
+
+    After a successful write the client is pinned to the primary for REPLICA_PIN_SECONDS,
+    either with a cookie or, with REPLICA_PIN_STORE = 'cache', a per-user cache entry keyed
+    by the authenticated user (session or access token); anonymous clients are not pinned then.
+    Without replicas configured the middleware removes itself from the stack.
+
+    The replica flag is a context variable, so it is set and reset around get_response in one
+    call rather than across process_request/process_response, which run in separate contexts
+    under ASGI.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    PIN_COOKIE = 'db_pin'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.pin_seconds = settings.REPLICA_PIN_SECONDS
+        self.use_cache = settings.REPLICA_PIN_STORE == 'cache'
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method in self.SAFE_METHODS:
+            if self._is_pinned(request):
+                return self.get_response(request)
+            with replica_reads():
+                return self.get_response(request)
+        response = self.get_response(request)
+        if response.status_code < 400:
+            self._pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if request.method in self.SAFE_METHODS:
+            # The cache store looks up request.user, which may need the database
+            pinned = await sync_to_async(self._is_pinned)(request) if self.use_cache else self._is_pinned(request)
+            if pinned:
+                return await self.get_response(request)
+            with replica_reads():
+                return await self.get_response(request)
+        response = await self.get_response(request)
+        if response.status_code < 400:
+            await sync_to_async(self._pin)(request, response)
+        return response
+
+    def _pin_key(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f"replica-pin:{user.id}"
+
+        # API clients authenticate with the JWT cookie, which DRF only checks inside the view.
+        # Only a token with a valid signature names the user; plain cookies are client-controlled.
+        from .authentication import CookieJWTAuthentication
+        try:
+            token = CookieJWTAuthentication()._get_token(request)
+        except AuthenticationFailed:
+            return None
+        return f"replica-pin:{token['user_id']}" if token is not None else None
+
+    def _is_pinned(self, request):
+        if self.use_cache:
+            key = self._pin_key(request)
+            return bool(key and cache.get(key))
+        return self.PIN_COOKIE in request.COOKIES
+
+    def _pin(self, request, response):
+        if self.use_cache:
+            key = self._pin_key(request)
+            if key:
+                cache.set(key, True, self.pin_seconds)
+            return
+        response.set_cookie(self.PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
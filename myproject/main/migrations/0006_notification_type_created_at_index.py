@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_authevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['notification_type', 'created_at'], name='main_notifi_notific_4dfde2_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='main_notifi_notific_edb308_idx',
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+DEFAULT_ALIASES = {
+    'JavaScript': ['js', 'ecmascript'],
+    'TypeScript': ['ts'],
+    'React': ['reactjs', 'react.js'],
+    'Node.js': ['node', 'nodejs'],
+    'PostgreSQL': ['postgres', 'psql'],
+    'Go': ['golang'],
+    'Kubernetes': ['k8s'],
+    'AWS': ['amazon web services'],
+    'Excel': ['ms excel', 'microsoft excel'],
+    'Machine Learning': ['ml'],
+}
+
+
+def create_default_aliases(apps, schema_editor):
+    Skill = apps.get_model('main', 'Skill')
+    SkillAlias = apps.get_model('main', 'SkillAlias')
+    for name, aliases in DEFAULT_ALIASES.items():
+        skill, _ = Skill.objects.get_or_create(key=name.lower(), defaults={'name': name})
+        SkillAlias.objects.bulk_create([SkillAlias(alias=alias, skill=skill) for alias in aliases],
+                                       ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_notification_coalescing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SkillAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='main.skill')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProfileSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_skills', to='main.userprofile')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_skills', to='main.skill')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['skill', 'profile'], name='main_profil_skill_i_edaf3a_idx')],
+                'unique_together': {('profile', 'skill')},
+            },
+        ),
+        migrations.RunPython(create_default_aliases, migrations.RunPython.noop),
+    ]
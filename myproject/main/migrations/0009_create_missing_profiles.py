@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    # The profile signal was never connected before, so older users may have no profile
+    CustomUser = apps.get_model('main', 'CustomUser')
+    UserProfile = apps.get_model('main', 'UserProfile')
+    user_ids = CustomUser.objects.filter(userprofile__isnull=True).values_list('id', flat=True)
+    UserProfile.objects.bulk_create([UserProfile(user_id=user_id) for user_id in user_ids.iterator()],
+                                    batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_skill_taxonomy'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_create_missing_profiles'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('account', 'Account'), ('profile', 'Profile'), ('application', 'Application'), ('job', 'Job'), ('job_application', 'Job Application'), ('institution', 'Institution'), ('system', 'System')], max_length=20),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
@@ -35,6 +37,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Embedded in issued JWTs; bumping it revokes every outstanding token (see main.tokens)
+    token_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -44,6 +48,18 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.username} ({self.role})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .tokens import forget_token_version
+        forget_token_version(self.id)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.id
+        result = super().delete(*args, **kwargs)
+        from .tokens import forget_token_version
+        forget_token_version(user_id)
+        return result
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
@@ -58,6 +74,49 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"Profile of {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'skills' in update_fields:
+            from .skills import sync_profile_skills
+            sync_profile_skills(self)
+
+
+class Skill(models.Model):
+    """
+    Canonical skill. key is the normalized name (see main.skills.canonical_key) that
+    free-form profile entries and aliases resolve to.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+
+class SkillAlias(models.Model):
+    alias = models.CharField(max_length=100, unique=True)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='aliases')
+
+    def __str__(self):
+        return f"{self.alias} -> {self.skill.name}"
+
+
+class ProfileSkill(models.Model):
+    """
+    Indexed copy of UserProfile.skills, kept in sync on profile save.
+    """
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='profile_skills')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='profile_skills')
+
+    class Meta:
+        unique_together = ('profile', 'skill')
+        # Posting list per skill: candidate search filters on skill and groups by profile
+        indexes = [models.Index(fields=['skill', 'profile'])]
+
+    def __str__(self):
+        return f"{self.profile_id}: {self.skill_id}"
+
 
 class Notification(models.Model):
     NOTIFICATION_TYPES = (
@@ -65,6 +124,8 @@ class Notification(models.Model):
         ('profile', 'Profile'),
         ('application', 'Application'),
         ('job', 'Job'),
+        ('job_application', 'Job Application'),
+        ('institution', 'Institution'),
         ('system', 'System'),
     )
 
@@ -76,14 +137,18 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     related_object_id = models.PositiveIntegerField(null=True, blank=True)
     related_object_type = models.CharField(max_length=100, null=True, blank=True)
-
+    # Set on digest rows built by create_or_coalesce; aggregate_count is how many events they stand for
+    group_key = models.CharField(max_length=100, null=True, blank=True)
+    aggregate_count = models.PositiveIntegerField(default=1)
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', 'is_read']),
-            models.Index(fields=['notification_type']),
+            # Serves type filters and the per-type retention sweep (prune_notifications)
+            models.Index(fields=['notification_type', 'created_at']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['recipient', 'group_key', 'created_at']),
         ]
 
     def __str__(self):
@@ -104,6 +169,48 @@ class Notification(models.Model):
             related_object_type=related_object_type
         )
 
+    @classmethod
+    def create_or_coalesce(cls, recipient, notification_type, group_key, title, message, related_object_id=None,
+                           related_object_type=None):
+        """
+        Fold the event into the recipient's unread notification with the same group_key whose
+        latest event is within NOTIFICATION_COALESCE_WINDOW seconds, or start a new one.
+        message may be a callable taking the new aggregate_count, for digest text such as
+        "3 new applications for ...". related_object_id and created_at always follow the latest
+        event, so an updated digest moves back to the top of the newest-first list.
+        """
+        render = message if callable(message) else (lambda count: message)
+        since = timezone.now() - timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW)
+        digest = cls.objects.filter(
+            recipient=recipient, group_key=group_key, is_read=False, created_at__gte=since
+        ).order_by('-created_at').values('id', 'aggregate_count').first()
+
+        if digest:
+            count = digest['aggregate_count'] + 1
+            # Conditional on the count read above; a concurrent writer that got there first makes this a no-op
+            updated = cls.objects.filter(
+                id=digest['id'], aggregate_count=digest['aggregate_count'], is_read=False
+            ).update(
+                aggregate_count=count,
+                created_at=timezone.now(),
+                title=title,
+                message=render(count),
+                related_object_id=related_object_id,
+                related_object_type=related_object_type,
+            )
+            if updated:
+                return digest['id']
+
+        return cls.objects.create(
+            recipient=recipient,
+            notification_type=notification_type,
+            group_key=group_key,
+            title=title,
+            message=render(1),
+            related_object_id=related_object_id,
+            related_object_type=related_object_type
+        ).id
+
     @classmethod
     def create_admin_notification(cls, title, message, related_object_id=None, related_object_type=None):
         """
@@ -128,3 +235,42 @@ class Notification(models.Model):
             cls.objects.bulk_create(notifications)
 
         return notifications
+
+
+class AuthEvent(models.Model):
+    """
+    Append-only log of authentication events, written in batches by main.auth_events.
+
+    Not partitioned: reads are admin queries bounded by user or time along the created_at
+    indexes, and purge_auth_events deletes expired rows oldest first in short batches, so
+    retention costs no long locks. Monthly range partitions (retention as DROP PARTITION)
+    are the next step if deletes stop keeping up with the insert rate.
+    """
+    LOGIN = 1
+    LOGOUT = 2
+    REFRESH = 3
+    LOGIN_FAILED = 4
+    EVENT_TYPES = (
+        (LOGIN, 'login'),
+        (LOGOUT, 'logout'),
+        (REFRESH, 'refresh'),
+        (LOGIN_FAILED, 'login_failed'),
+    )
+
+    # No database constraint: the log outlives deleted users and inserts skip the FK check
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+                             null=True, blank=True, related_name='+')
+    event_type = models.PositiveSmallIntegerField(choices=EVENT_TYPES)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Time-leading indexes: retention deletes and range queries walk created_at
+            models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} by user {self.user_id} at {self.created_at}"
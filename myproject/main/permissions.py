@@ -1,3 +1,4 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import permissions
 
 
@@ -28,6 +29,16 @@ class IsJobSeeker(permissions.BasePermission):
         return bool(request.user and request.user.is_authenticated and request.user.role == 'job_seeker')
 
 
+class IsEmployerOrAdmin(permissions.BasePermission):
+    """
+    Custom permission to allow employers or admins, e.g. to search candidates.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and
+                    request.user.role in ['admin', 'employer'])
+
+
 class IsRecruiterOrAdmin(permissions.BasePermission):
     """
     Custom permission to allow recruiters or admins to review job applications.
@@ -50,17 +61,39 @@ class IsAdminUserRole(permissions.BasePermission):
 class IsOwnerOrAdmin(permissions.BasePermission):
     """
     Custom permission to only allow owners of an object or admins to view/edit it.
+    Ownership is the object's user (or, for notifications, recipient) foreign key id, so the
+    check runs no query. scope() applies the same rule to a queryset.
     """
+    owner_fields = ('user', 'recipient')
 
     def has_object_permission(self, request, view, obj):
         # Admins can access any object
         if request.user.role == 'admin':
             return True
 
-        # Check if the object has a user attribute
-        if hasattr(obj, 'user'):
-            return obj.user == request.user
-        # For notifications
-        elif hasattr(obj, 'recipient'):
-            return obj.recipient == request.user
-        return False
\ No newline at end of file
+        field = self.owner_field(type(obj))
+        return field is not None and getattr(obj, field) == request.user.pk
+
+    @classmethod
+    def owner_field(cls, model):
+        """
+        The attname of model's owner foreign key (user_id, recipient_id), or None.
+        """
+        for name in cls.owner_fields:
+            try:
+                return model._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                continue
+        return None
+
+    @classmethod
+    def scope(cls, request, queryset):
+        """
+        queryset limited in SQL to the rows has_object_permission would allow.
+        """
+        if request.user.role == 'admin':
+            return queryset
+        field = cls.owner_field(queryset.model)
+        if field is None:
+            return queryset.none()
+        return queryset.filter(**{field: request.user.pk})
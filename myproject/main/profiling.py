@@ -0,0 +1,87 @@
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval.
+    Samples are aggregated as collapsed stacks ("outer;inner;leaf"), the
+    input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval=0.005, max_depth=128):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+
+    def _collapse(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+            frame = frame.f_back
+        stack.reverse()
+        return ';'.join(stack)
+
+
+_write_lock = threading.Lock()
+
+
+def route_filename(route):
+    """
+    Turn a URL route (e.g. 'api/main/admin/users/<int:user_id>/') into a file name.
+    """
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_')
+    return f"{slug or 'root'}.collapsed"
+
+
+def write_collapsed(route, samples):
+    """
+    Merge collapsed stack samples into the per-route profile file.
+    """
+    if not samples:
+        return None
+
+    output_dir = Path(settings.PROFILING_OUTPUT_DIR)
+    path = output_dir / route_filename(route)
+
+    with _write_lock:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        merged = Counter()
+        if path.exists():
+            with open(path) as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if stack and count.isdigit():
+                        merged[stack] += int(count)
+        merged.update(samples)
+
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            for stack, count in merged.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp_path, path)
+
+    return path
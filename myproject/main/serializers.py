@@ -1,6 +1,6 @@
 from rest_framework import serializers
-from django.contrib.auth import authenticate
-from .models import CustomUser, UserProfile, Notification
+from .backends import EmailBackend
+from .models import CustomUser, UserProfile, Notification, AuthEvent
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -29,7 +29,10 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True, style={'input_type': 'password'})
 
     def validate(self, data):
-        user = authenticate(email=data['email'], password=data['password'])
+        # Call the email backend directly rather than walking AUTHENTICATION_BACKENDS
+        user = EmailBackend().authenticate(
+            self.context.get('request'), email=data['email'], password=data['password']
+        )
         if not user:
             raise serializers.ValidationError({"error": "Invalid credentials"})
         if not user.is_active:
@@ -61,7 +64,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     def get_profile_picture_url(self, obj):
         try:
-            profile = obj.userprofile
+            # Also used to represent CustomUser instances (e.g. Job.posted_by)
+            profile = obj if isinstance(obj, UserProfile) else obj.userprofile
             if profile.profile_picture and hasattr(profile.profile_picture, 'url'):
                 return profile.profile_picture.url
         except UserProfile.DoesNotExist:
@@ -74,6 +78,13 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return value
 
 
+class CandidateSerializer(UserProfileSerializer):
+    matched_skills = serializers.IntegerField(read_only=True)
+
+    class Meta(UserProfileSerializer.Meta):
+        fields = UserProfileSerializer.Meta.fields + ['matched_skills']
+
+
 class AdminUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
@@ -107,6 +118,33 @@ class NotificationSerializer(serializers.ModelSerializer):
             'is_read',
             'created_at',
             'related_object_id',
-            'related_object_type'
+            'related_object_type',
+            'aggregate_count'
         ]
-        read_only_fields = ['id', 'recipient', 'notification_type', 'title', 'message', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'recipient', 'notification_type', 'title', 'message', 'created_at',
+                            'aggregate_count']
+
+
+class NotificationBulkActionSerializer(serializers.Serializer):
+    ACTIONS = ('mark_read', 'mark_unread', 'delete')
+
+    action = serializers.ChoiceField(choices=ACTIONS)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False,
+                                allow_empty=False, max_length=1000)
+    type = serializers.ChoiceField(choices=Notification.NOTIFICATION_TYPES, required=False)
+    before = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        # Without a selector the action would hit the whole inbox; mark-all-read covers that case
+        if not any(key in data for key in ('ids', 'type', 'before')):
+            raise serializers.ValidationError({"error": "Provide ids or at least one filter (type, before)"})
+        return data
+
+
+class AuthEventSerializer(serializers.ModelSerializer):
+    event_type = serializers.CharField(source='get_event_type_display', read_only=True)
+
+    class Meta:
+        model = AuthEvent
+        fields = ['id', 'user', 'event_type', 'ip_address', 'created_at']
+        read_only_fields = fields
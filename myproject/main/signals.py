@@ -1,46 +1,67 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
+from .deferred import defer
 from .models import UserProfile, CustomUser, Notification
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, **kwargs):
     """
-    Create or update user profile when user is created or updated
+    Create the profile of new users right away, so code in the same transaction can read
+    user.userprofile; the welcome notifications wait for the commit. Later saves (password
+    changes, last_login) leave the profile alone; migration 0009 filled in profiles for older users.
     """
     if created:
-        UserProfile.objects.create(user=instance)
+        # One INSERT, without UserProfile.save()'s skill sync (a new profile has no skills)
+        UserProfile.objects.bulk_create([UserProfile(user=instance)], ignore_conflicts=True)
+        defer(welcome_users, instance.id, (instance.username, instance.role))
 
-        # Create notification for the user
-        Notification.create_notification(
-            recipient=instance,
+
+def welcome_users(users):
+    """
+    {user_id: (username, role)} -> welcome notifications and admin notices, in bulk.
+    """
+    notifications = [
+        Notification(
+            recipient_id=user_id,
             notification_type='account',
             title='Welcome to Job Portal',
-            message=f'Welcome to the Job Portal, {instance.username}! Complete your profile to get started.'
+            message=f'Welcome to the Job Portal, {username}! Complete your profile to get started.'
         )
-
-        # Create notification for admins
-        Notification.create_admin_notification(
+        for user_id, (username, role) in users.items()
+    ]
+    admin_ids = CustomUser.objects.filter(role='admin', is_active=True).values_list('id', flat=True)
+    notifications += [
+        Notification(
+            recipient_id=admin_id,
+            notification_type='system',
             title='New User Registration',
-            message=f'New user {instance.username} registered as {instance.role}',
-            related_object_id=instance.id,
+            message=f'New user {username} registered as {role}',
+            related_object_id=user_id,
             related_object_type='user'
         )
-    else:
-        # Ensure the profile exists
-        UserProfile.objects.get_or_create(user=instance)
+        for admin_id in admin_ids for user_id, (username, role) in users.items()
+    ]
+    Notification.objects.bulk_create(notifications, batch_size=1000)
 
 
 @receiver(post_save, sender=UserProfile)
 def notify_profile_update(sender, instance, created, **kwargs):
     """
-    Create notification when user profile is updated
+    Create notification when user profile is updated; several saves in one request notify once
     """
     if not created:
-        Notification.create_notification(
-            recipient=instance.user,
+        defer(notify_profiles_updated, instance.user_id, None)
+
+
+def notify_profiles_updated(profiles):
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=user_id,
             notification_type='profile',
             title='Profile Updated',
             message='Your profile has been successfully updated.'
         )
+        for user_id in profiles
+    ])
@@ -0,0 +1,60 @@
+"""
+Skill taxonomy: resolves the free-form strings in UserProfile.skills to canonical
+Skill rows and mirrors them into ProfileSkill, which candidate search queries.
+"""
+
+import re
+
+from .models import ProfileSkill, Skill, SkillAlias
+
+
+def clean_name(name):
+    return re.sub(r'\s+', ' ', str(name)).strip()[:100]
+
+
+def canonical_key(name):
+    """
+    Normalized form used for matching: lowercased, trimmed, inner whitespace collapsed.
+    """
+    return clean_name(name).lower()
+
+
+def resolve(names, create=False):
+    """
+    Map skill names to Skill ids as {key: skill_id}, following aliases. Unknown names are
+    created as new skills when create is set and left out otherwise.
+    """
+    display = {}
+    for name in names:
+        key = canonical_key(name)
+        if key:
+            display.setdefault(key, clean_name(name))
+    if not display:
+        return {}
+
+    resolved = dict(SkillAlias.objects.filter(alias__in=display).values_list('alias', 'skill_id'))
+    remaining = [key for key in display if key not in resolved]
+    if remaining:
+        resolved.update(Skill.objects.filter(key__in=remaining).values_list('key', 'id'))
+
+    missing = [key for key in display if key not in resolved]
+    if missing and create:
+        Skill.objects.bulk_create([Skill(key=key, name=display[key]) for key in missing], ignore_conflicts=True)
+        resolved.update(Skill.objects.filter(key__in=missing).values_list('key', 'id'))
+    return resolved
+
+
+def sync_profile_skills(profile):
+    """
+    Make the profile's ProfileSkill rows match profile.skills.
+    """
+    wanted = set(resolve(profile.skills or [], create=True).values())
+    current = set(ProfileSkill.objects.filter(profile=profile).values_list('skill_id', flat=True))
+
+    if current - wanted:
+        ProfileSkill.objects.filter(profile=profile, skill_id__in=current - wanted).delete()
+    if wanted - current:
+        ProfileSkill.objects.bulk_create(
+            [ProfileSkill(profile=profile, skill_id=skill_id) for skill_id in wanted - current],
+            ignore_conflicts=True,
+        )
@@ -0,0 +1,47 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_TASK_WORKERS, thread_name_prefix='background-task'
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Background task {func.__qualname__} failed: {str(e)}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) on a worker thread right away, without waiting for a
+    transaction; usable from async views. With BACKGROUND_TASKS_EAGER it runs inline.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        _run(func, args, kwargs)
+    else:
+        _get_executor().submit(_run, func, args, kwargs)
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) on a worker thread once the current transaction commits,
+    so side effects that the response does not depend on stay off the request path.
+    With BACKGROUND_TASKS_EAGER the task runs inline on commit instead.
+    """
+    transaction.on_commit(lambda: submit(func, *args, **kwargs))
@@ -1,3 +1,1028 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import JsonResponse
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import auth_events
+from .backends import EmailBackend, rehash_password
+from .checks import check_shared_cache
+from .db_routers import _replica_reads
+from .deferred import defer, deferred_signals, merge_counts, suppressed_signals
+from .hashers import ProfiledPBKDF2PasswordHasher
+from .idempotency import idempotent
+from .models import AuthEvent, CustomUser, Notification, ProfileSkill, Skill, UserProfile
+from .signals import welcome_users
+from .skills import resolve
+from .permissions import IsAdmin, IsEmployerOrAdmin, IsOwnerOrAdmin
+from .profiling import route_filename, write_collapsed
+from .throttling import STORES
+from .tokens import bump_token_version, issue_tokens, user_from_token
+
+
+def replica_flag(request):
+    return JsonResponse({'replica_reads': _replica_reads.get()})
+
+
+async def async_replica_flag(request):
+    return JsonResponse({'replica_reads': _replica_reads.get()})
+
+
+def slow_view(request, n):
+    time.sleep(0.05)
+    return JsonResponse({})
+
+
+async def async_slow_view(request):
+    await asyncio.sleep(0.05)
+    return JsonResponse({})
+
+
+class IdempotentView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    calls = []
+    during = None  # called while the request runs, to send a concurrent retry
+
+    @idempotent('test')
+    def post(self, request):
+        self.calls.append(request.data)
+        if IdempotentView.during:
+            IdempotentView.during()
+        if request.data.get('raise'):
+            raise RuntimeError('handler failed')
+        if request.data.get('fail'):
+            return Response({'error': 'unavailable'}, status=503)
+        return Response({'call': len(self.calls)}, status=201)
+
+
+# ROOT_URLCONF for ReplicaRoutingMiddlewareTest, SamplingProfilerTest and IdempotencyTest
+urlpatterns = [
+    path('flag/', replica_flag),
+    path('async-flag/', async_replica_flag),
+    path('slow/<int:n>/', slow_view),
+    path('async-slow/', async_slow_view),
+    path('idempotent/', IdempotentView.as_view()),
+]
+
+
+class OwnerPermissionTest(TestCase):
+    """
+    Object permission checks compare foreign key ids, so they must not load the related user.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create(username='owner', email='owner@example.com', role='job_seeker')
+        cls.other = CustomUser.objects.create(username='other', email='other@example.com', role='employer')
+        cls.admin = CustomUser.objects.create(username='admin', email='admin@example.com', role='admin')
+        cls.notification = Notification.objects.create(
+            recipient=cls.owner, notification_type='system', title='Hello', message='Hello'
+        )
+
+    def make_request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def fresh(self, model, pk):
+        # As get_object() returns it: foreign key ids loaded, related rows not
+        return model.objects.get(pk=pk)
+
+    def test_object_permission_runs_no_query(self):
+        permission = IsOwnerOrAdmin()
+        cases = (
+            (self.owner, Notification, self.notification.pk, True),
+            (self.other, Notification, self.notification.pk, False),
+            (self.admin, Notification, self.notification.pk, True),
+            (self.owner, UserProfile, self.owner.pk, True),
+            (self.other, UserProfile, self.owner.pk, False),
+        )
+        for user, model, pk, allowed in cases:
+            request, obj = self.make_request(user), self.fresh(model, pk)
+            with self.subTest(user=user.username, model=model.__name__), self.assertNumQueries(0):
+                self.assertIs(permission.has_object_permission(request, None, obj), allowed)
+
+    def test_object_without_owner_is_denied(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(IsOwnerOrAdmin().has_object_permission(self.make_request(self.other), None, self.owner))
+
+    def test_role_permissions_run_no_query(self):
+        request = self.make_request(self.fresh(CustomUser, self.other.pk))
+        with self.assertNumQueries(0):
+            self.assertFalse(IsAdmin().has_permission(request, None))
+            self.assertTrue(IsEmployerOrAdmin().has_permission(request, None))
+
+    def test_scope_matches_object_permission(self):
+        Notification.objects.create(recipient=self.other, notification_type='system', title='Hi', message='Hi')
+        for user in (self.owner, self.other, self.admin):
+            request = self.make_request(user)
+            expected = [
+                notification.pk for notification in Notification.objects.order_by('pk')
+                if IsOwnerOrAdmin().has_object_permission(request, None, notification)
+            ]
+            with self.subTest(user=user.username):
+                scoped = IsOwnerOrAdmin.scope(request, Notification.objects.order_by('pk'))
+                self.assertEqual(list(scoped.values_list('pk', flat=True)), expected)
+
+    def test_notification_detail_is_scoped(self):
+        url = reverse('notification_detail', args=[self.notification.pk])
+        client = APIClient()
+
+        client.force_authenticate(self.other)
+        self.assertEqual(client.get(url, secure=True).status_code, 404)
+        self.assertEqual(client.delete(url, secure=True).status_code, 404)
+
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.get(url, secure=True).status_code, 200)
+        client.force_authenticate(self.admin)
+        self.assertEqual(client.get(url, secure=True).status_code, 200)
+
+
+@override_settings(ROOT_URLCONF='main.tests', REPLICA_PIN_STORE='cookie')
+@mock.patch('main.middleware.replica_aliases', lambda: ['replica_1'])
+class ReplicaRoutingMiddlewareTest(TestCase):
+    """
+    Safe requests read from replicas unless the client wrote recently; the flag must be set and
+    reset in the same context under both the WSGI and the ASGI handler.
+    """
+    def test_sync_handler(self):
+        client = Client()
+        for url in ('/flag/', '/async-flag/'):
+            with self.subTest(url=url):
+                response = client.get(url, secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertIs(response.json()['replica_reads'], True)
+        self.assertIs(_replica_reads.get(), False)
+
+        # A successful write pins the client to the primary
+        self.assertEqual(client.post('/flag/', secure=True).status_code, 200)
+        self.assertIs(client.get('/flag/', secure=True).json()['replica_reads'], False)
+
+    async def test_async_handler(self):
+        client = AsyncClient()
+        for url in ('/flag/', '/async-flag/'):
+            with self.subTest(url=url):
+                response = await client.get(url, secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertIs(response.json()['replica_reads'], True)
+        self.assertIs(_replica_reads.get(), False)
+
+        self.assertEqual((await client.post('/flag/', secure=True)).status_code, 200)
+        self.assertIs((await client.get('/flag/', secure=True)).json()['replica_reads'], False)
+
+    @override_settings(REPLICA_PIN_STORE='cache')
+    def test_cache_store_pins_the_token_user_only(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = CustomUser.objects.create(username='writer', email='writer@example.com', role='job_seeker')
+        writer = Client()
+        writer.cookies['access_token'] = str(issue_tokens(user).access_token)
+        self.assertEqual(writer.post('/flag/', secure=True).status_code, 200)
+        self.assertIs(writer.get('/flag/', secure=True).json()['replica_reads'], False)
+
+        # The user_id cookie is client-controlled: it neither reads nor sets another user's pin
+        forger = Client()
+        forger.cookies['user_id'] = str(user.id)
+        self.assertIs(forger.get('/flag/', secure=True).json()['replica_reads'], True)
+        cache.clear()
+        self.assertEqual(forger.post('/flag/', secure=True).status_code, 200)
+        self.assertIs(writer.get('/flag/', secure=True).json()['replica_reads'], True)
+
+        forger.cookies['access_token'] = 'not-a-token'
+        self.assertIs(forger.get('/flag/', secure=True).json()['replica_reads'], True)
+
+
+class SamplingProfilerTest(TestCase):
+    """
+    Sampled requests record the stacks of the thread running the view, under both handlers.
+    """
+    def setUp(self):
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.output_dir = Path(output_dir.name)
+        settings = override_settings(
+            ROOT_URLCONF='main.tests', PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0,
+            PROFILING_INTERVAL=0.001, PROFILING_OUTPUT_DIR=self.output_dir,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def view_samples(self):
+        path = self.output_dir / route_filename('slow/<int:n>/')
+        lines = path.read_text().splitlines()
+        self.assertTrue(lines)
+        return sum(int(line.rpartition(' ')[2]) for line in lines if ':slow_view:' in line)
+
+    def test_sync_handler(self):
+        self.assertEqual(Client().get('/slow/1/', secure=True).status_code, 200)
+        first = self.view_samples()
+        self.assertGreater(first, 0)
+
+        # Later requests to the same route merge into its file
+        Client().get('/slow/2/', secure=True)
+        self.assertGreater(self.view_samples(), first)
+
+    async def test_async_handler(self):
+        response = await AsyncClient().get('/slow/1/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.view_samples(), 0)
+
+        await AsyncClient().get('/async-slow/', secure=True)
+        self.assertFalse((self.output_dir / route_filename('async-slow/')).exists())
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_header_requires_admin(self):
+        Client().get('/slow/1/', secure=True, headers={'X-Profile': '1'})
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+
+    def test_write_collapsed(self):
+        self.assertIsNone(write_collapsed('jobs/', {}))
+        write_collapsed('jobs/', {'a;b': 2, 'a;c': 1})
+        path = write_collapsed('jobs/', {'a;b': 1})
+        self.assertEqual(path.name, 'jobs.collapsed')
+        self.assertEqual(path.read_text(), 'a;b 3\na;c 1\n')
+
+
+@override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMIT_STORE='local',
+                   RATE_LIMITS={'login': '3/min', 'user_search': '2/min'},
+                   PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RateLimitTest(TestCase):
+    """
+    Over the limit a client gets 429 with Retry-After; anonymous clients are limited per IP,
+    authenticated ones per user.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('admin', 'admin@example.com', 'secret-password', role='admin')
+        cls.other_admin = CustomUser.objects.create_user('admin2', 'admin2@example.com', 'secret-password',
+                                                         role='admin')
+
+    def setUp(self):
+        STORES['local'].tats.clear()
+        self.addCleanup(STORES['local'].tats.clear)
+        # Write the failed logins' buffered auth events while the test database exists
+        self.addCleanup(auth_events.flush)
+
+    def login(self, ip='10.0.0.1'):
+        return APIClient().post(reverse('login'), {'email': 'admin@example.com', 'password': 'wrong'},
+                                format='json', secure=True, REMOTE_ADDR=ip)
+
+    def test_login_burst_then_429(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 400)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        retry_after = int(response['Retry-After'])
+        self.assertTrue(0 < retry_after <= 20)
+
+    def test_login_limited_per_ip(self):
+        for _ in range(3):
+            self.login()
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(ip='10.0.0.2').status_code, 400)
+
+    def test_search_limited_per_user(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse('user_search') + '?q=admin'
+        for _ in range(2):
+            self.assertEqual(client.get(url, secure=True).status_code, 200)
+        response = client.get(url, secure=True)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        client.force_authenticate(self.other_admin)
+        self.assertEqual(client.get(url, secure=True).status_code, 200)
+
+    def test_disabled(self):
+        with self.settings(RATE_LIMIT_ENABLED=False):
+            for _ in range(5):
+                self.assertEqual(self.login().status_code, 400)
+
+
+@override_settings(ROOT_URLCONF='main.tests')
+class IdempotencyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        IdempotentView.calls = []
+        IdempotentView.during = None
+        self.client = APIClient()
+
+    def post(self, data, key='key-1', **extra):
+        return self.client.post('/idempotent/', data, format='json', secure=True, HTTP_IDEMPOTENCY_KEY=key, **extra)
+
+    def test_replay(self):
+        first = self.post({'a': 1})
+        second = self.post({'a': 1})
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(IdempotentView.calls), 1)
+
+    def test_without_key_runs_every_time(self):
+        self.client.post('/idempotent/', {'a': 1}, format='json', secure=True)
+        self.client.post('/idempotent/', {'a': 1}, format='json', secure=True)
+        self.assertEqual(len(IdempotentView.calls), 2)
+
+    def test_different_body_is_rejected(self):
+        self.post({'a': 1})
+        self.assertEqual(self.post({'a': 2}).status_code, 422)
+        self.assertEqual(len(IdempotentView.calls), 1)
+
+    def test_retry_while_in_progress(self):
+        retries = []
+        IdempotentView.during = lambda: retries.append(self.post({'a': 1})) if not retries else None
+        self.assertEqual(self.post({'a': 1}).status_code, 201)
+        self.assertEqual(retries[0].status_code, 409)
+        self.assertEqual(retries[0]['Retry-After'], '1')
+        self.assertEqual(len(IdempotentView.calls), 1)
+
+    def test_server_error_releases_key(self):
+        self.assertEqual(self.post({'fail': True}).status_code, 503)
+        self.assertEqual(self.post({'fail': True}).status_code, 503)
+        self.assertEqual(len(IdempotentView.calls), 2)
+
+    def test_exception_releases_key(self):
+        self.client.raise_request_exception = False
+        self.assertEqual(self.post({'raise': True}).status_code, 500)
+        self.post({'raise': True})
+        self.assertEqual(len(IdempotentView.calls), 2)
+
+    def test_keys_are_scoped_per_user(self):
+        owner = CustomUser.objects.create(username='owner', email='owner@example.com', role='job_seeker')
+        other = CustomUser.objects.create(username='other', email='other@example.com', role='job_seeker')
+        for user in (owner, other):
+            # force_authenticate bypasses authentication_classes = []
+            self.client.force_authenticate(user)
+            self.assertNotIn('Idempotent-Replayed', self.post({'a': 1}))
+        self.assertEqual(len(IdempotentView.calls), 2)
+
+    def test_anonymous_keys_are_scoped_per_ip(self):
+        self.post({'a': 1}, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(self.post({'a': 2}, REMOTE_ADDR='10.0.0.2').status_code, 201)
+        self.assertEqual(self.post({'a': 2}, REMOTE_ADDR='10.0.0.1').status_code, 422)
+        self.assertEqual(len(IdempotentView.calls), 2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], RATE_LIMIT_ENABLED=False)
+class RegisterIdempotencyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def register(self, username, ip):
+        return APIClient().post(reverse('register'), {
+            'username': username, 'email': f'{username}@example.com', 'role': 'job_seeker',
+            'password': 'secret-password', 'confirm_password': 'secret-password',
+        }, format='json', secure=True, HTTP_IDEMPOTENCY_KEY='same-key', REMOTE_ADDR=ip)
+
+    def test_anonymous_clients_do_not_share_keys(self):
+        self.assertEqual(self.register('first', '10.0.0.1').status_code, 201)
+        self.assertEqual(self.register('second', '10.0.0.2').status_code, 201)
+        replay = self.register('first', '10.0.0.1')
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(CustomUser.objects.filter(username__in=['first', 'second']).count(), 2)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class TokenVersionTest(TestCase):
+    """
+    Bumping token_version (logout, password change, deactivation, refresh reuse) revokes every
+    access and refresh token issued before it.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('seeker', 'seeker@example.com', 'secret-password')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # Refreshes buffer an auth event; write it while the test database exists
+        self.addCleanup(auth_events.flush)
+
+    def client_with(self, access=None, refresh=None):
+        client = APIClient()
+        if access is not None:
+            client.cookies['access_token'] = str(access)
+        if refresh is not None:
+            client.cookies['refresh_token'] = str(refresh)
+        return client
+
+    def get_notifications(self, access):
+        return self.client_with(access=access).get(reverse('notification_list'), secure=True)
+
+    def assertRejected(self, response, detail='Token has been revoked'):
+        # CookieJWTAuthentication sends no WWW-Authenticate challenge, so DRF answers 403
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['detail'], detail)
+
+    def refresh(self, refresh):
+        return self.client_with(refresh=refresh).post(reverse('refresh_token'), secure=True)
+
+    def test_bump_revokes_access_and_refresh_tokens(self):
+        tokens = issue_tokens(self.user)
+        self.assertEqual(self.get_notifications(tokens.access_token).status_code, 200)
+
+        bump_token_version(self.user)
+        self.assertRejected(self.get_notifications(tokens.access_token))
+        self.assertEqual(self.refresh(tokens).status_code, 401)
+
+        fresh = issue_tokens(self.user)
+        self.assertEqual(self.get_notifications(fresh.access_token).status_code, 200)
+
+    def test_deactivation_revokes_tokens(self):
+        tokens = issue_tokens(self.user)
+        self.user.is_active = False
+        self.user.save()
+        bump_token_version(self.user)
+        self.assertRejected(self.get_notifications(tokens.access_token))
+
+    def test_refresh_rotates(self):
+        response = self.refresh(issue_tokens(self.user))
+        self.assertEqual(response.status_code, 200)
+        access = response.cookies['access_token'].value
+        self.assertEqual(self.get_notifications(access).status_code, 200)
+        self.assertEqual(self.refresh(response.cookies['refresh_token'].value).status_code, 200)
+
+    def test_refresh_reuse_revokes_the_session(self):
+        stolen = issue_tokens(self.user)
+        rotated = self.refresh(stolen)
+        self.assertEqual(rotated.status_code, 200)
+
+        reused = self.refresh(stolen)
+        self.assertEqual(reused.status_code, 401)
+        self.assertEqual(reused.data['error'], 'Refresh token already used')
+        # The tokens the first refresh handed out are revoked too
+        self.assertRejected(self.get_notifications(rotated.cookies['access_token'].value))
+        self.assertEqual(self.refresh(rotated.cookies['refresh_token'].value).status_code, 401)
+
+    def test_legacy_token_without_version(self):
+        legacy = AccessToken.for_user(self.user)
+        self.assertNotIn('tv', legacy.payload)
+        self.assertEqual(self.get_notifications(legacy).status_code, 200)
+
+        CustomUser.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertRejected(self.get_notifications(legacy), 'User account is disabled')
+
+    def test_legacy_refresh_token_without_version(self):
+        legacy = RefreshToken.for_user(self.user)
+        self.assertNotIn('tv', legacy.payload)
+        response = self.refresh(legacy)
+        self.assertEqual(response.status_code, 200)
+        # The rotated tokens carry the version
+        self.assertIn('tv', AccessToken(response.cookies['access_token'].value).payload)
+
+        old_session = RefreshToken.for_user(self.user)
+        bump_token_version(self.user)
+        self.assertEqual(self.refresh(old_session).status_code, 401)
+
+    def test_user_from_token_has_an_int_pk(self):
+        token = AccessToken(str(issue_tokens(self.user).access_token))
+        user = user_from_token(token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsInstance(user.pk, int)
+        # Ownership checks compare model instances
+        self.assertEqual(user, self.user)
+
+
+class DeferredSignalsTest(TestCase):
+    """
+    Deferred work runs once per handler and scope, after commit, and not at all on rollback.
+    """
+    def setUp(self):
+        self.batches = []
+
+    def handler(self, payloads):
+        self.batches.append(payloads)
+
+    def test_one_batch_per_scope_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with deferred_signals():
+                defer(self.handler, 1, 'a')
+                defer(self.handler, 2, 'b')
+                with deferred_signals():
+                    # Nested scopes share the outer batch
+                    defer(self.handler, 3, 'c')
+            self.assertEqual(self.batches, [])
+        self.assertEqual(self.batches, [{1: 'a', 2: 'b', 3: 'c'}])
+
+    def test_without_a_scope_each_payload_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            defer(self.handler, 1, 'a')
+            defer(self.handler, 1, 'b')
+        self.assertEqual(self.batches, [{1: 'a'}, {1: 'b'}])
+
+    def test_rollback_drops_work(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with deferred_signals():
+                defer(self.handler, 1, 'kept')
+                try:
+                    with transaction.atomic():
+                        defer(self.handler, 2, 'dropped')
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+        self.assertEqual(self.batches, [{1: 'kept'}])
+
+    def test_suppressed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with suppressed_signals():
+                defer(self.handler, 1, 'a')
+        self.assertEqual(self.batches, [])
+
+    def test_merge(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with deferred_signals():
+                defer(self.handler, 'latest', 1)
+                defer(self.handler, 'latest', 2)
+                defer(self.handler, 'sum', 1, merge=int.__add__)
+                defer(self.handler, 'sum', 2, merge=int.__add__)
+                defer(self.handler, 'counts', {'jobs': 1}, merge=merge_counts)
+                defer(self.handler, 'counts', {'jobs': -1, 'members': 1}, merge=merge_counts)
+        self.assertEqual(self.batches, [{'latest': 2, 'sum': 3, 'counts': {'jobs': 0, 'members': 1}}])
+
+    def test_failing_handler_does_not_stop_the_others(self):
+        def failing(payloads):
+            raise RuntimeError('handler failed')
+
+        with self.assertLogs('main.deferred', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            with deferred_signals():
+                defer(failing, 1, 'a')
+                defer(self.handler, 2, 'b')
+        self.assertEqual(self.batches, [{2: 'b'}])
+
+    def test_new_users_are_welcomed_in_one_batch(self):
+        with mock.patch('main.signals.welcome_users', wraps=welcome_users) as handler:
+            with self.captureOnCommitCallbacks(execute=True), deferred_signals():
+                first = CustomUser.objects.create(username='first', email='first@example.com', role='job_seeker')
+                second = CustomUser.objects.create(username='second', email='second@example.com', role='employer')
+        handler.assert_called_once_with({first.id: ('first', 'job_seeker'), second.id: ('second', 'employer')})
+        self.assertEqual(UserProfile.objects.filter(user__in=[first, second]).count(), 2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], RATE_LIMIT_ENABLED=False)
+class RegisterWelcomeTest(TestCase):
+    def test_profile_exists_inside_the_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                user = CustomUser.objects.create_user('inside', 'inside@example.com', 'secret-password')
+                self.assertEqual(CustomUser.objects.get(id=user.id).userprofile.skills, [])
+                # Only the side effects wait for the commit
+                self.assertFalse(Notification.objects.filter(recipient=user).exists())
+        self.assertTrue(Notification.objects.filter(recipient=user, title='Welcome to Job Portal').exists())
+
+    def test_profile_exists_when_the_request_ends(self):
+        admin = CustomUser.objects.create(username='admin', email='admin@example.com', role='admin')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(reverse('register'), {
+                'username': 'newcomer', 'email': 'newcomer@example.com', 'role': 'job_seeker',
+                'password': 'secret-password', 'confirm_password': 'secret-password',
+            }, format='json', secure=True)
+        self.assertEqual(response.status_code, 201)
+        user = CustomUser.objects.get(username='newcomer')
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+        self.assertTrue(Notification.objects.filter(recipient=user, title='Welcome to Job Portal').exists())
+        self.assertTrue(Notification.objects.filter(recipient=admin, related_object_id=user.id).exists())
+
+
+@override_settings(NOTIFICATION_COALESCE_WINDOW=3600)
+class CoalesceNotificationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.poster = CustomUser.objects.create(username='poster', email='poster@example.com', role='employer')
+        cls.other = CustomUser.objects.create(username='other', email='other@example.com', role='employer')
+
+    def notify(self, related_object_id, recipient=None, group_key='job-applications:1'):
+        return Notification.create_or_coalesce(
+            recipient=recipient or self.poster, notification_type='job_application', group_key=group_key,
+            title='New Job Application', message=lambda count: f'{count} new applications',
+            related_object_id=related_object_id, related_object_type='job_application',
+        )
+
+    def test_events_fold_into_one_digest(self):
+        first = self.notify(1)
+        self.assertEqual(self.notify(2), first)
+        self.assertEqual(self.notify(3), first)
+        digest = Notification.objects.get(id=first)
+        self.assertEqual(digest.aggregate_count, 3)
+        self.assertEqual(digest.message, '3 new applications')
+        self.assertEqual(digest.related_object_id, 3)
+        self.assertEqual(Notification.objects.filter(recipient=self.poster).count(), 1)
+
+    def test_read_digest_starts_a_new_one(self):
+        first = self.notify(1)
+        Notification.objects.filter(id=first).update(is_read=True)
+        second = self.notify(2)
+        self.assertNotEqual(second, first)
+        self.assertEqual(Notification.objects.get(id=second).message, '1 new applications')
+        self.assertEqual(Notification.objects.get(id=first).aggregate_count, 1)
+
+    def test_window(self):
+        first = self.notify(1)
+        Notification.objects.filter(id=first).update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertNotEqual(self.notify(2), first)
+
+    def test_window_follows_the_latest_event(self):
+        first = self.notify(1)
+        Notification.objects.filter(id=first).update(created_at=timezone.now() - timedelta(minutes=50))
+        self.assertEqual(self.notify(2), first)
+        # 70 minutes after the first event, 20 after the latest
+        Notification.objects.filter(id=first).update(
+            created_at=Notification.objects.get(id=first).created_at - timedelta(minutes=20))
+        self.assertEqual(self.notify(3), first)
+
+    def test_updated_digest_moves_to_the_top(self):
+        digest = self.notify(1)
+        Notification.objects.filter(id=digest).update(created_at=timezone.now() - timedelta(minutes=30))
+        other = Notification.objects.create(recipient=self.poster, notification_type='system',
+                                            title='Other', message='Other')
+        self.notify(2)
+        client = APIClient()
+        client.force_authenticate(self.poster)
+        rows = client.get(reverse('notification_list'), secure=True).json()['results']
+        self.assertEqual([row['id'] for row in rows], [digest, other.id])
+
+    def test_scoped_by_recipient_and_group(self):
+        first = self.notify(1)
+        self.assertNotEqual(self.notify(2, recipient=self.other), first)
+        self.assertNotEqual(self.notify(3, group_key='job-applications:2'), first)
+        self.assertEqual(Notification.objects.get(id=first).aggregate_count, 1)
+
+    def test_plain_message(self):
+        first = Notification.create_or_coalesce(self.poster, 'system', 'digest', 'Title', 'Same text')
+        Notification.create_or_coalesce(self.poster, 'system', 'digest', 'Title', 'Same text')
+        digest = Notification.objects.get(id=first)
+        self.assertEqual((digest.aggregate_count, digest.message), (2, 'Same text'))
+
+
+class NotificationBulkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='seeker', email='seeker@example.com')
+        cls.other = CustomUser.objects.create(username='other', email='other@example.com')
+
+    def setUp(self):
+        def notification(recipient, notification_type='job', is_read=False):
+            return Notification.objects.create(recipient=recipient, notification_type=notification_type,
+                                               title='Title', message='Message', is_read=is_read)
+
+        self.job = notification(self.user)
+        self.application = notification(self.user, 'job_application')
+        self.read = notification(self.user, is_read=True)
+        self.foreign = notification(self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk(self, **data):
+        return self.client.post(reverse('notification_bulk'), data, format='json', secure=True)
+
+    def unread_ids(self, recipient):
+        return set(Notification.objects.filter(recipient=recipient, is_read=False).values_list('id', flat=True))
+
+    def test_mark_read_by_ids_ignores_other_users(self):
+        response = self.bulk(action='mark_read', ids=[self.job.id, self.read.id, self.foreign.id])
+        self.assertEqual(response.json(), {'action': 'mark_read', 'count': 1})
+        self.assertEqual(self.unread_ids(self.user), {self.application.id})
+        self.assertEqual(self.unread_ids(self.other), {self.foreign.id})
+
+    def test_mark_unread_by_type(self):
+        response = self.bulk(action='mark_unread', type='job')
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(self.unread_ids(self.user), {self.job.id, self.application.id, self.read.id})
+
+    def test_delete_before(self):
+        Notification.objects.filter(id__in=[self.job.id, self.foreign.id]).update(
+            created_at=timezone.now() - timedelta(days=30))
+        response = self.bulk(action='delete', before=(timezone.now() - timedelta(days=1)).isoformat())
+        self.assertEqual(response.json()['count'], 1)
+        self.assertFalse(Notification.objects.filter(id=self.job.id).exists())
+        self.assertTrue(Notification.objects.filter(id=self.foreign.id).exists())
+
+    def test_delete_other_users_ids(self):
+        self.assertEqual(self.bulk(action='delete', ids=[self.foreign.id]).json()['count'], 0)
+        self.assertTrue(Notification.objects.filter(id=self.foreign.id).exists())
+
+    def test_validation(self):
+        for data in ({'action': 'mark_read'}, {'action': 'archive', 'ids': [1]},
+                     {'action': 'delete', 'type': 'jobs'}, {'action': 'delete', 'ids': []}):
+            with self.subTest(data=data):
+                self.assertEqual(self.bulk(**data).status_code, 400)
+        self.assertEqual(Notification.objects.count(), 4)
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS={'system': 30, 'profile': 7})
+class PruneNotificationsTest(TestCase):
+    """
+    prune_notifications deletes, in batches, only rows older than their type's retention.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='seeker', email='seeker@example.com')
+
+    def setUp(self):
+        now = timezone.now()
+        self.expired = self.notifications('system', now - timedelta(days=31), 5)
+        self.expired += self.notifications('profile', now - timedelta(days=8), 1)
+        self.recent = self.notifications('system', now - timedelta(days=29), 2)
+        self.recent += self.notifications('profile', now - timedelta(days=6), 1)
+        # No retention configured for this type: kept forever
+        self.recent += self.notifications('job', now - timedelta(days=1000), 1)
+
+    def notifications(self, notification_type, created_at, count):
+        ids = [
+            Notification.objects.create(recipient=self.user, notification_type=notification_type,
+                                        title='Title', message='Message').id
+            for _ in range(count)
+        ]
+        Notification.objects.filter(id__in=ids).update(created_at=created_at)
+        return ids
+
+    def prune(self, *args):
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('prune_notifications', '--sleep=0', *args, stdout=out)
+        deletes = sum(query['sql'].startswith('DELETE') for query in queries)
+        return out.getvalue(), deletes
+
+    def remaining(self):
+        return set(Notification.objects.values_list('id', flat=True))
+
+    def test_prunes_expired_in_batches(self):
+        out, deletes = self.prune('--batch-size=2')
+        self.assertIn('Pruned 6 notifications', out)
+        self.assertEqual(self.remaining(), set(self.recent))
+        # 5 expired system rows in batches of 2, then the profile row
+        self.assertEqual(deletes, 4)
+
+    def test_type_filter_and_dry_run(self):
+        out, deletes = self.prune('--dry-run')
+        self.assertIn('Would prune 6 notifications', out)
+        self.assertEqual(deletes, 0)
+        self.assertEqual(self.remaining(), set(self.expired + self.recent))
+
+        self.prune('--type=profile')
+        self.assertEqual(self.remaining(), set(self.expired[:5] + self.recent))
+
+    def test_archive(self):
+        with tempfile.TemporaryDirectory() as archive_dir:
+            out, _ = self.prune('--archive', f'--archive-dir={archive_dir}')
+            [archive] = Path(archive_dir).iterdir()
+            with gzip.open(archive, 'rt') as f:
+                archived = [json.loads(line)['id'] for line in f]
+        self.assertEqual(sorted(archived), sorted(self.expired))
+        self.assertIn(f'Archived to {archive}', out)
+
+    def test_unknown_type(self):
+        with self.assertRaisesMessage(CommandError, 'No retention configured for: job'):
+            self.prune('--type=job')
+
+
+class CandidateSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = CustomUser.objects.create(username='employer', email='employer@example.com', role='employer')
+
+        def seeker(name, skills, **fields):
+            user = CustomUser.objects.create(username=name, email=f'{name}@example.com', role='job_seeker', **fields)
+            user.userprofile.skills = skills
+            user.userprofile.save()
+            return user
+
+        seeker('gopher', ['Golang', 'Postgres'])
+        seeker('fullstack', ['go', 'JS', '  react.JS '])
+        seeker('frontend', ['JavaScript', 'React'])
+        seeker('inactive', ['Go', 'PostgreSQL'], is_active=False)
+        employer = CustomUser.objects.create(username='hiring', email='hiring@example.com', role='employer')
+        employer.userprofile.skills = ['Go']
+        employer.userprofile.save()
+
+    def search(self, skills, match=None):
+        client = APIClient()
+        client.force_authenticate(self.employer)
+        params = {'skills': skills} if match is None else {'skills': skills, 'match': match}
+        response = client.get(reverse('candidate_search'), params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return [(row['username'], row['matched_skills']) for row in response.json()['results']]
+
+    def test_aliases_resolve_to_one_skill(self):
+        go = Skill.objects.get(key='go')
+        self.assertEqual(resolve(['golang', ' GO ', 'Go']), {'golang': go.id, 'go': go.id})
+        self.assertEqual(
+            set(ProfileSkill.objects.filter(profile__user__username='fullstack').values_list('skill__key', flat=True)),
+            {'go', 'javascript', 'react'},
+        )
+
+    def test_unknown_names_are_not_created_by_search(self):
+        self.assertEqual(resolve(['COBOL']), {})
+        self.assertEqual(self.search('cobol', 'any'), [])
+        self.assertFalse(Skill.objects.filter(key='cobol').exists())
+
+    def test_match_all(self):
+        self.assertEqual(self.search('golang,postgresql'), [('gopher', 2)])
+        self.assertEqual(self.search('GO,javascript', 'all'), [('fullstack', 2)])
+        # An unknown skill can never be matched by every candidate
+        self.assertEqual(self.search('go,cobol'), [])
+
+    def test_match_any_ranks_by_matches(self):
+        self.assertEqual(self.search('go,js,reactjs', 'any'),
+                         [('fullstack', 3), ('frontend', 2), ('gopher', 1)])
+        self.assertEqual(self.search('go,cobol', 'any'), [('gopher', 1), ('fullstack', 1)])
+
+    def test_invalid(self):
+        client = APIClient()
+        client.force_authenticate(self.employer)
+        self.assertEqual(client.get(reverse('candidate_search'), secure=True).status_code, 400)
+        self.assertEqual(client.get(reverse('candidate_search'), {'skills': 'go', 'match': 'some'},
+                                    secure=True).status_code, 400)
+
+
+@override_settings(PASSWORD_HASHING_PROFILE='testing', BACKGROUND_TASKS_EAGER=True)
+class PasswordHashingTest(TestCase):
+    """
+    EmailBackend logs in with one lookup and rehashes outdated passwords after the commit,
+    unless the password changed in the meantime.
+    """
+    password = 'secret-password'
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('hasher', 'hasher@example.com', self.password)
+
+    def outdate_password(self, iterations=500):
+        hasher = ProfiledPBKDF2PasswordHasher()
+        encoded = hasher.encode(self.password, hasher.salt(), iterations=iterations)
+        CustomUser.objects.filter(id=self.user.id).update(password=encoded)
+        return encoded
+
+    def stored_password(self):
+        return CustomUser.objects.values_list('password', flat=True).get(id=self.user.id)
+
+    def test_login_by_email(self):
+        backend = EmailBackend()
+        self.assertEqual(backend.authenticate(None, email='hasher@example.com', password=self.password), self.user)
+        self.assertIsNone(backend.authenticate(None, email='hasher@example.com', password='wrong'))
+        self.assertIsNone(backend.authenticate(None, email='nobody@example.com', password=self.password))
+        self.assertIsNone(backend.authenticate(None, email='hasher@example.com'))
+
+    def test_login_by_username(self):
+        # django.contrib.auth.authenticate passes USERNAME_FIELD (the email) as username
+        user = authenticate(None, username='hasher@example.com', password=self.password)
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.backend, 'main.backends.EmailBackend')
+        self.assertIsNone(authenticate(None, username='hasher@example.com', password='wrong'))
+
+    def test_iterations_follow_the_profile(self):
+        self.assertTrue(self.stored_password().startswith('pbkdf2_sha256$1000$'))
+        with override_settings(PASSWORD_HASHING_PROFILE='balanced'):
+            self.assertEqual(ProfiledPBKDF2PasswordHasher().iterations, 600_000)
+            # Hashes of the previous profile still verify but are due for an upgrade
+            self.assertTrue(ProfiledPBKDF2PasswordHasher().must_update(self.stored_password()))
+            self.assertTrue(check_password(self.password, self.stored_password()))
+
+    def test_outdated_hash_is_rehashed_after_login(self):
+        outdated = self.outdate_password()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            user = EmailBackend().authenticate(None, email='hasher@example.com', password=self.password)
+            self.assertIsNotNone(user)
+            # Nothing is rewritten on the login path
+            self.assertEqual(self.stored_password(), outdated)
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(self.stored_password().startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(check_password(self.password, self.stored_password()))
+
+        # Up-to-date hashes schedule nothing
+        with self.captureOnCommitCallbacks() as callbacks:
+            EmailBackend().authenticate(None, email='hasher@example.com', password=self.password)
+        self.assertEqual(callbacks, [])
+
+    def test_concurrent_password_change_wins(self):
+        self.outdate_password()
+        with self.captureOnCommitCallbacks(execute=True):
+            EmailBackend().authenticate(None, email='hasher@example.com', password=self.password)
+            # The user changes their password before the background rehash runs
+            user = CustomUser.objects.get(id=self.user.id)
+            user.set_password('new-password')
+            user.save(update_fields=['password'])
+            changed = self.stored_password()
+        self.assertEqual(self.stored_password(), changed)
+        self.assertTrue(check_password('new-password', self.stored_password()))
+
+        # The conditional UPDATE matches nothing once the stored hash differs
+        with CaptureQueriesContext(connection) as queries:
+            rehash_password(self.user.id, 'pbkdf2_sha256$500$stale$hash', self.password)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.stored_password(), changed)
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    def test_per_process_cache_warns(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ['main.W001'])
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                               'LOCATION': 'redis://localhost:6379'}}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class AuthEventTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username='admin', email='admin@example.com', role='admin')
+        cls.user = CustomUser.objects.create(username='seeker', email='seeker@example.com')
+
+    def setUp(self):
+        auth_events.flush()
+        self.addCleanup(auth_events.flush)
+
+    def record(self, event_type=AuthEvent.LOGIN, user=None, ip='10.0.0.1'):
+        auth_events.record(event_type, (user or self.user).id, RequestFactory().get('/', REMOTE_ADDR=ip))
+
+    def test_record_and_flush(self):
+        self.record()
+        self.record(AuthEvent.LOGOUT, ip='10.0.0.2')
+        self.assertFalse(AuthEvent.objects.exists())
+        self.assertEqual(auth_events.flush(), 2)
+        self.assertEqual(
+            sorted(AuthEvent.objects.values_list('user_id', 'event_type', 'ip_address')),
+            [(self.user.id, AuthEvent.LOGIN, '10.0.0.1'), (self.user.id, AuthEvent.LOGOUT, '10.0.0.2')],
+        )
+        self.assertEqual(auth_events.flush(), 0)
+
+    @override_settings(AUTH_EVENT_BATCH_SIZE=2, BACKGROUND_TASKS_EAGER=True)
+    def test_full_batch_is_written_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record()
+            self.record()
+            self.assertFalse(AuthEvent.objects.exists())
+        self.assertEqual(AuthEvent.objects.count(), 2)
+
+    @override_settings(AUTH_EVENT_FLUSH_INTERVAL=0.01)
+    def test_buffer_is_flushed_on_a_timer(self):
+        flushed = threading.Event()
+        with mock.patch('main.auth_events.submit', side_effect=lambda func: flushed.set()) as submit:
+            self.record()
+            self.assertTrue(flushed.wait(5))
+        submit.assert_called_once_with(auth_events.flush)
+
+    def test_purge_deletes_old_events_in_batches(self):
+        now = timezone.now()
+        AuthEvent.objects.bulk_create(
+            [AuthEvent(user_id=self.user.id, event_type=AuthEvent.LOGIN, created_at=now - timedelta(days=40 + i))
+             for i in range(5)] +
+            [AuthEvent(user_id=self.user.id, event_type=AuthEvent.REFRESH, created_at=now - timedelta(days=i))
+             for i in range(3)]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            call_command('purge_auth_events', '--days', '30', '--batch-size', '2', stdout=io.StringIO())
+        deletes = [q['sql'] for q in queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(set(AuthEvent.objects.values_list('event_type', flat=True)), {AuthEvent.REFRESH})
+        self.assertEqual(AuthEvent.objects.count(), 3)
+
+    def list_events(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        return client.get(reverse('admin_auth_event_list'), params, secure=True)
+
+    def test_admin_list(self):
+        self.record(user=self.admin)
+        self.record(AuthEvent.LOGIN_FAILED)
+        # Buffered events are included
+        response = self.list_events()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+
+        rows = self.list_events(user_id=self.user.id).json()['results']
+        self.assertEqual([(row['user'], row['event_type']) for row in rows], [(self.user.id, 'login_failed')])
+        self.assertEqual(self.list_events(event_type='login').json()['count'], 1)
+        since = (timezone.now() + timedelta(minutes=1)).isoformat()
+        self.assertEqual(self.list_events(since=since).json()['count'], 0)
+
+    def test_admin_list_validation(self):
+        for params in ({'user_id': 'abc'}, {'user_id': '-1'}, {'event_type': 'signup'}, {'since': 'yesterday'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.list_events(**params).status_code, 400)
+
+    def test_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(reverse('admin_auth_event_list'), secure=True).status_code, 403)
@@ -0,0 +1,156 @@
+"""
+Token-bucket rate limiting as a DRF throttle, using the generic cell rate algorithm (GCRA).
+
+A rate of N requests per period lets a client send a burst of up to N requests at once. After
+that, one more request is allowed every period / N seconds. Each client needs only a single
+number: the theoretical arrival time (TAT) of its next request. A check reads the TAT and
+compares it with now. If the request is allowed, it writes TAT + interval back.
+
+Views opt in with `throttle_classes = [TokenBucketThrottle]` and a `throttle_scope`. The rate
+for each scope is set in settings.RATE_LIMITS. Authenticated requests are limited per user,
+anonymous ones per client IP.
+"""
+
+import math
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'sec': 1, 'second': 1, 'm': 60, 'min': 60, 'minute': 60,
+           'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+monotonic = time.monotonic
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """
+    '10/min' -> (interval, tolerance, period): seconds between requests once the burst is spent,
+    how far ahead of now the TAT may run (the burst), and the period itself.
+    """
+    count, period = rate.split('/')
+    period = PERIODS[period.strip()]
+    interval = period / int(count)
+    return interval, period - interval, period
+
+
+class LocalStore:
+    """
+    Per-process store: a dict of TATs on the monotonic clock. It takes no lock; each check is
+    one dict read and at most one write. Two threads checking the same client at the same
+    moment may both be allowed, so the limit can be exceeded by a request or two under
+    contention, but it is never tightened. Each process keeps its own count, so with several
+    workers the effective limit is multiplied. The cache store, the default when
+    REDIS_URL is set, avoids that.
+    """
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self.tats = {}
+
+    def hit(self, key, interval, tolerance, period):
+        """
+        key is a (scope, client) pair. Returns the seconds to wait before the request would be
+        allowed; 0.0 means it is allowed (and counted).
+        """
+        now = monotonic()
+        tats = self.tats
+        tat = tats.get(key, now)
+        if tat < now:
+            tat = now
+        elif tat - now > tolerance:
+            return tat - now - tolerance
+        if len(tats) >= self.max_keys:
+            self.evict(now)
+        tats[key] = tat + interval
+        return 0.0
+
+    def evict(self, now):
+        # Clients whose TAT has passed have a full bucket, the same as a client never seen
+        for key, tat in list(self.tats.items()):
+            if tat <= now:
+                self.tats.pop(key, None)
+        if len(self.tats) >= self.max_keys:
+            self.tats.clear()
+
+
+class CacheStore:
+    """
+    Shared store in the Django cache (Redis when REDIS_URL is set), so all workers and hosts
+    share one limit. It uses wall-clock time, and each entry expires once its bucket would be
+    full again. The read and the write are separate cache calls, so racing requests from the
+    same client can slip past the limit by a request or two.
+    """
+    def hit(self, key, interval, tolerance, period):
+        key = 'ratelimit:{}:{}'.format(*key)
+        now = time.time()
+        tat = cache.get(key, now)
+        if tat < now:
+            tat = now
+        elif tat - now > tolerance:
+            return tat - now - tolerance
+        tat += interval
+        cache.set(key, tat, timeout=math.ceil(tat - now))
+        return 0.0
+
+
+STORES = {'local': LocalStore(), 'cache': CacheStore()}
+
+_config = None
+
+
+def get_config():
+    """
+    (rates by scope, store, NUM_PROXIES), built once. Settings lookups cost more than
+    the check itself, so they are not repeated per request.
+    """
+    global _config
+    if _config is None:
+        rates = {scope: parse_rate(rate) for scope, rate in settings.RATE_LIMITS.items()}
+        _config = (rates if settings.RATE_LIMIT_ENABLED else {},
+                   STORES[settings.RATE_LIMIT_STORE], api_settings.NUM_PROXIES)
+    return _config
+
+
+@receiver(setting_changed)
+def reset_config(*, setting, **kwargs):
+    global _config
+    if setting in ('RATE_LIMITS', 'RATE_LIMIT_ENABLED', 'RATE_LIMIT_STORE', 'REST_FRAMEWORK'):
+        _config = None
+
+
+def client_ip(meta, num_proxies):
+    """
+    The client address, trusting X-Forwarded-For only as far as num_proxies proxies go.
+    """
+    if num_proxies:
+        forwarded = meta.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            addresses = forwarded.split(',')
+            return addresses[-min(num_proxies, len(addresses))].strip()
+    return meta.get('REMOTE_ADDR')
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Limits a view to settings.RATE_LIMITS[view.throttle_scope]. Views without a configured
+    rate are not limited. A throttled request gets 429 with a Retry-After header.
+    """
+    def allow_request(self, request, view):
+        rates, store, num_proxies = _config or get_config()
+        scope = getattr(view, 'throttle_scope', None)
+        rate = rates.get(scope)
+        if rate is None:
+            return True
+        user = request.user
+        ident = user.pk if user.is_authenticated else client_ip(request._request.META, num_proxies)
+        self.retry_after = store.hit((scope, ident), *rate)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import CustomUser
+
+TOKEN_VERSION_CLAIM = 'tv'
+# Cached version for users that are inactive or deleted; never matches a token
+REVOKED = -1
+
+
+def _cache_key(user_id):
+    return f"token-version:{user_id}"
+
+
+def _version_row(user_id):
+    return CustomUser.objects.filter(id=user_id).values_list('token_version', 'is_active')
+
+
+def get_token_version(user_id):
+    """
+    Return the user's current token version, or REVOKED if the user cannot authenticate.
+    Cached for TOKEN_VERSION_CACHE_TIMEOUT seconds so token checks do not touch CustomUser.
+    """
+    version = cache.get(_cache_key(user_id))
+    if version is None:
+        row = _version_row(user_id).first()
+        version = row[0] if row and row[1] else REVOKED
+        cache.set(_cache_key(user_id), version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def aget_token_version(user_id):
+    """
+    Async version of get_token_version for the async views.
+    """
+    version = await cache.aget(_cache_key(user_id))
+    if version is None:
+        row = await _version_row(user_id).afirst()
+        version = row[0] if row and row[1] else REVOKED
+        await cache.aset(_cache_key(user_id), version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(user_id):
+    """
+    Drop the cached version now and again on commit, so a concurrent request
+    cannot re-cache the value from before the surrounding transaction.
+    """
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def bump_token_version(user):
+    """
+    Invalidate every access and refresh token issued to the user so far.
+    """
+    CustomUser.objects.filter(id=user.id).update(token_version=F('token_version') + 1)
+    user.refresh_from_db(fields=['token_version'])
+    forget_token_version(user.id)
+
+
+def issue_tokens(user):
+    """
+    Create a refresh token (and through it the access token) carrying the user's token
+    version, role and username, so authentication can build request.user from the claims.
+    """
+    refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    refresh['role'] = user.role
+    refresh['username'] = user.username
+    return refresh
+
+
+def user_from_token(token):
+    """
+    Build a CustomUser from token claims without a query; other fields load on first access.
+    """
+    # simplejwt serializes user_id as a string; model equality (e.g. obj.posted_by == request.user) needs the int
+    user_id = CustomUser._meta.pk.to_python(token['user_id'])
+    return CustomUser.from_db(
+        'default',
+        ['id', 'username', 'role', 'is_active', 'token_version'],
+        [user_id, token['username'], token['role'], True, token[TOKEN_VERSION_CLAIM]],
+    )
+
+
+def set_token_cookies(response, refresh):
+    access_expiry = timezone.now() + timedelta(days=1)
+    refresh_expiry = timezone.now() + timedelta(days=7)
+
+    response.set_cookie(
+        key='access_token',
+        value=str(refresh.access_token),
+        expires=access_expiry,
+        httponly=True,
+        secure=False,  # Set to True in production with HTTPS
+        samesite='Lax'
+    )
+    response.set_cookie(
+        key='refresh_token',
+        value=str(refresh),
+        expires=refresh_expiry,
+        httponly=True,
+        secure=False,  # Set to True in production with HTTPS
+        samesite='Lax'
+    )
+    return response
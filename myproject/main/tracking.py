@@ -0,0 +1,78 @@
+"""
+Field change tracking without extra queries.
+
+Models list the attnames to watch in tracked_fields. Instances loaded from the database
+snapshot those values in from_db, as a tuple ordered like tracked_fields. save() compares
+against the snapshot. While the save runs (so post_save receivers can see it) and after it
+returns, instance.saved_changes maps each changed field to its old value. The snapshot then
+moves forward to the saved values.
+"""
+
+from types import MappingProxyType
+
+_DEFERRED = object()
+
+
+class TrackedFieldsMixin:
+    """
+    Mixin for models: class Job(TrackedFieldsMixin, models.Model), with tracked_fields = ('status',).
+    Fields deferred by only()/defer() are read with one query if a save needs their old value.
+    """
+    tracked_fields = ()
+    # Read-only default for instances never saved; saves store a plain dict, so instances
+    # still pickle and deepcopy (cache, TestCase.setUpTestData)
+    saved_changes = MappingProxyType({})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self, fields=None):
+        values = self.__dict__
+        if fields is None or '_tracked' not in values:
+            self._tracked = tuple(values.get(field, _DEFERRED) for field in self.tracked_fields)
+        else:
+            self._tracked = tuple(
+                values.get(field, _DEFERRED) if field in fields else old
+                for field, old in zip(self.tracked_fields, self._tracked)
+            )
+
+    def _attnames(self, field_names):
+        return {self._meta.get_field(name).attname for name in field_names}
+
+    def changed_fields(self, fields=None):
+        """
+        {attname: old value} of the tracked fields (limited to fields, if given) whose current
+        value differs from the stored one. Empty for instances not loaded from the database.
+        """
+        snapshot = self.__dict__.get('_tracked')
+        if snapshot is None:
+            return {}
+        fields = self.tracked_fields if fields is None else self._attnames(fields)
+        old = dict(zip(self.tracked_fields, snapshot))
+        deferred = [field for field in fields if field in old and old[field] is _DEFERRED]
+        if deferred:
+            old.update(type(self)._base_manager.filter(pk=self.pk).values(*deferred).first() or {})
+        return {
+            field: old[field] for field in fields
+            if field in old and old[field] is not _DEFERRED and old[field] != self.__dict__.get(field, old[field])
+        }
+
+    def previous(self, field):
+        """
+        The value field had before the current (or last) save.
+        """
+        return self.saved_changes.get(field, getattr(self, field))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        adding = self._state.adding
+        self.saved_changes = {} if adding else self.changed_fields(update_fields)
+        super().save(*args, **kwargs)
+        self._snapshot(None if adding or update_fields is None else self._attnames(update_fields))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot(None if fields is None else self._attnames(fields))
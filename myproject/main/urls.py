@@ -5,9 +5,11 @@ from .views import (
     RegisterView, LoginView, LogoutView, ChangePasswordView,
     UserProfileView, AdminUserListView, AdminUserDetailView,
     RefreshTokenView, NotificationListView, NotificationDetailView,
-    NotificationMarkAllReadView, AdminNotificationListView,
-    AdminCreateNotificationView, UserSearchView
+    NotificationMarkAllReadView, NotificationBulkView, AdminNotificationListView,
+    AdminCreateNotificationView, UserSearchView, AdminDatabaseConnectionsView,
+    AdminAuthEventListView, CandidateSearchView
 )
+from .async_views import async_get, notification_list, user_profile
 
 urlpatterns = [
                   # Authentication endpoints
@@ -18,14 +20,19 @@ urlpatterns = [
                   path('auth/change-password/', ChangePasswordView.as_view(), name='change_password'),
 
                   # User profile endpoints
-                  path('users/profile/', UserProfileView.as_view(), name='user_profile'),
+                  path('users/profile/', async_get(UserProfileView.as_view(), user_profile), name='user_profile'),
+
+                  # Candidate search
+                  path('candidates/search/', CandidateSearchView.as_view(), name='candidate_search'),
 
                   # Notification endpoints
-                  path('notifications/', NotificationListView.as_view(), name='notification_list'),
+                  path('notifications/', async_get(NotificationListView.as_view(), notification_list),
+                       name='notification_list'),
                   path('notifications/<int:notification_id>/', NotificationDetailView.as_view(),
                        name='notification_detail'),
                   path('notifications/mark-all-read/', NotificationMarkAllReadView.as_view(),
                        name='notification_mark_all_read'),
+                  path('notifications/bulk/', NotificationBulkView.as_view(), name='notification_bulk'),
 
                   # Admin endpoints
                   path('admin/users/', AdminUserListView.as_view(), name='admin_user_list'),
@@ -34,4 +41,7 @@ urlpatterns = [
                   path('admin/notifications/', AdminNotificationListView.as_view(), name='admin_notification_list'),
                   path('admin/notifications/create/', AdminCreateNotificationView.as_view(),
                        name='admin_create_notification'),
+                  path('admin/auth-events/', AdminAuthEventListView.as_view(), name='admin_auth_event_list'),
+                  path('admin/db-connections/', AdminDatabaseConnectionsView.as_view(),
+                       name='admin_db_connections'),
               ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
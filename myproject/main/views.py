@@ -6,17 +6,28 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import update_session_auth_hash
+from django.core.cache import cache
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db import connections
+from django.db.models import Count, Q
 from rest_framework.parsers import MultiPartParser, FormParser
-from .models import CustomUser, UserProfile, Notification
+from . import auth_events
+from .idempotency import idempotent
+from .models import CustomUser, UserProfile, Notification, AuthEvent
 from .serializers import (
     RegisterSerializer, LoginSerializer, UserProfileSerializer,
-    AdminUserSerializer, PasswordChangeSerializer, NotificationSerializer
+    AdminUserSerializer, PasswordChangeSerializer, NotificationSerializer,
+    NotificationBulkActionSerializer, AuthEventSerializer, CandidateSerializer
+)
+from .permissions import IsAdminUserRole, IsEmployerOrAdmin, IsOwnerOrAdmin
+from .skills import canonical_key, resolve as resolve_skills
+from .throttling import TokenBucketThrottle
+from .tokens import (
+    TOKEN_VERSION_CLAIM, bump_token_version, get_token_version,
+    issue_tokens, set_token_cookies
 )
-from .permissions import IsAdminUserRole, IsOwnerOrAdmin
 from .utils import transaction_atomic
 
 
@@ -31,10 +42,14 @@ class StandardResultsSetPagination(PageNumberPagination):
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'register'
     """
     API endpoint for user registration
     """
 
+    @idempotent('register')
     @transaction_atomic
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -47,17 +62,19 @@ class RegisterView(APIView):
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    # A stale or revoked access_token cookie must not block logging in again
+    authentication_classes = []
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'login'
     """
     API endpoint for user login
     """
 
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             user = serializer.validated_data['user']
-            refresh = RefreshToken.for_user(user)
-            access_token = str(refresh.access_token)
-            refresh_token = str(refresh)
+            refresh = issue_tokens(user)
 
             response = Response({
                 "message": "Login successful",
@@ -66,40 +83,17 @@ class LoginView(APIView):
                 "username": user.username,
             }, status=status.HTTP_200_OK)
 
-            access_expiry = timezone.now() + timedelta(days=1)
-            refresh_expiry = timezone.now() + timedelta(days=7)
-
-            response.set_cookie(
-                key='access_token',
-                value=access_token,
-                expires=access_expiry,
-                httponly=True,
-                secure=False,  # Set to True in production with HTTPS
-                samesite='Lax'
-            )
-            response.set_cookie(
-                key='refresh_token',
-                value=refresh_token,
-                expires=refresh_expiry,
-                httponly=True,
-                secure=False,  # Set to True in production with HTTPS
-                samesite='Lax'
-            )
+            set_token_cookies(response, refresh)
 
             # Set non-sensitive cookies for frontend use
             response.set_cookie('role', user.role)
             response.set_cookie('user_id', user.id)
             response.set_cookie('username', user.username)
 
-            # Create notification
-            Notification.create_notification(
-                recipient=user,
-                notification_type='account',
-                title='Login Successful',
-                message=f'Successfully logged in at {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'
-            )
+            auth_events.record(AuthEvent.LOGIN, user.id, request)
 
             return response
+        auth_events.record(AuthEvent.LOGIN_FAILED, request=request)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -111,13 +105,10 @@ class LogoutView(APIView):
 
     def post(self, request):
         try:
-            # Create logout notification
-            Notification.create_notification(
-                recipient=request.user,
-                notification_type='account',
-                title='Logout Successful',
-                message=f'Successfully logged out at {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'
-            )
+            # Revoke the access and refresh tokens issued so far
+            bump_token_version(request.user)
+
+            auth_events.record(AuthEvent.LOGOUT, request.user.id, request)
 
             response = Response({"message": "Logout successful"}, status=status.HTTP_205_RESET_CONTENT)
 
@@ -150,8 +141,10 @@ class ChangePasswordView(APIView):
             return Response({"error": "Old password is incorrect"}, status=status.HTTP_400_BAD_REQUEST)
 
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
         update_session_auth_hash(request, user)
+        # Sign out other sessions; this client gets fresh tokens below
+        bump_token_version(user)
 
         # Create notification
         Notification.create_notification(
@@ -161,7 +154,8 @@ class ChangePasswordView(APIView):
             message='Your password has been successfully changed.'
         )
 
-        return Response({"message": "Password changed successfully"}, status=status.HTTP_200_OK)
+        response = Response({"message": "Password changed successfully"}, status=status.HTTP_200_OK)
+        return set_token_cookies(response, issue_tokens(user))
 
 
 import logging
@@ -278,12 +272,17 @@ class AdminUserDetailView(APIView):
         profile = getattr(user, 'userprofile', None)
 
         # Update user data
+        claims_before = (user.username, user.role, user.is_active)
         user_serializer = AdminUserSerializer(user, data=request.data, partial=True)
         if user_serializer.is_valid():
             user_serializer.save()
         else:
             return Response(user_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        # Tokens embed username and role, and must stop working once the account is disabled
+        if (user.username, user.role, user.is_active) != claims_before:
+            bump_token_version(user)
+
         # Update profile data if provided
         if profile and 'profile' in request.data:
             profile_serializer = UserProfileSerializer(
@@ -335,6 +334,7 @@ class RefreshTokenView(APIView):
     """
     API endpoint to refresh access token
     """
+    authentication_classes = []
 
     def post(self, request):
         refresh_token = request.COOKIES.get('refresh_token')
@@ -343,22 +343,30 @@ class RefreshTokenView(APIView):
 
         try:
             token = RefreshToken(refresh_token)
-            access_token = str(token.access_token)
+        except TokenError:
+            return Response({"error": "Invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
 
-            response = Response({'message': 'Token refreshed successfully'}, status=status.HTTP_200_OK)
+        user_id = token.get('user_id')
+        # Tokens issued before token versions existed count as version 0: sessions survive the
+        # upgrade and end at the user's first logout or password change
+        if token.get(TOKEN_VERSION_CLAIM, 0) != get_token_version(user_id):
+            return Response({"error": "Invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
 
-            # Set new access token in cookie
-            response.set_cookie(
-                key='access_token',
-                value=access_token,
-                httponly=True,
-                samesite='Lax',
-                secure=False  # Set to True in production with HTTPS
-            )
+        # Refresh tokens are single use; a second use means the token leaked, so revoke them all.
+        # Needs a cache shared by all workers (REDIS_URL) to see a reuse on another worker.
+        remaining = max(int(token['exp'] - timezone.now().timestamp()), 1)
+        if not cache.add(f"refresh-used:{token['jti']}", True, remaining):
+            user = CustomUser.objects.filter(id=user_id).first()
+            if user:
+                bump_token_version(user)
+            return Response({"error": "Refresh token already used"}, status=status.HTTP_401_UNAUTHORIZED)
 
-            return response
-        except TokenError:
-            return Response({"error": "Invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
+        user = CustomUser.objects.only('id', 'username', 'role', 'token_version').get(id=user_id)
+        auth_events.record(AuthEvent.REFRESH, user.id, request)
+        response = Response({'message': 'Token refreshed successfully'}, status=status.HTTP_200_OK)
+
+        # Rotate: set a new access token and a new refresh token
+        return set_token_cookies(response, issue_tokens(user))
 
 
 class NotificationListView(APIView):
@@ -396,20 +404,21 @@ class NotificationDetailView(APIView):
     """
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
 
-    def get(self, request, notification_id):
-        notification = get_object_or_404(Notification, id=notification_id)
-
-        # Check permissions
+    def get_notification(self, request, notification_id):
+        # Scoped in SQL, so another user's notification is a 404 rather than a 403
+        notifications = IsOwnerOrAdmin.scope(request, Notification.objects.all())
+        notification = get_object_or_404(notifications, id=notification_id)
         self.check_object_permissions(request, notification)
+        return notification
+
+    def get(self, request, notification_id):
+        notification = self.get_notification(request, notification_id)
 
         serializer = NotificationSerializer(notification)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def put(self, request, notification_id):
-        notification = get_object_or_404(Notification, id=notification_id)
-
-        # Check permissions
-        self.check_object_permissions(request, notification)
+        notification = self.get_notification(request, notification_id)
 
         # Only allow updating the is_read field
         notification.is_read = request.data.get('is_read', notification.is_read)
@@ -419,10 +428,7 @@ class NotificationDetailView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def delete(self, request, notification_id):
-        notification = get_object_or_404(Notification, id=notification_id)
-
-        # Check permissions
-        self.check_object_permissions(request, notification)
+        notification = self.get_notification(request, notification_id)
 
         notification.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -440,6 +446,39 @@ class NotificationMarkAllReadView(APIView):
         return Response({"message": f"Marked {count} notifications as read"}, status=status.HTTP_200_OK)
 
 
+class NotificationBulkView(APIView):
+    """
+    API endpoint to mark read/unread or delete many of the user's notifications at once
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = NotificationBulkActionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        # Scoping to the recipient replaces the per-object IsOwnerOrAdmin check;
+        # ids belonging to other users simply match nothing
+        notifications = Notification.objects.filter(recipient=request.user)
+        if 'ids' in data:
+            notifications = notifications.filter(id__in=data['ids'])
+        if 'type' in data:
+            notifications = notifications.filter(notification_type=data['type'])
+        if 'before' in data:
+            notifications = notifications.filter(created_at__lt=data['before'])
+
+        action = data['action']
+        if action == 'delete':
+            # Notification has no dependants or delete signals, so this is a single DELETE
+            count, _ = notifications.delete()
+        else:
+            is_read = action == 'mark_read'
+            count = notifications.filter(is_read=not is_read).update(is_read=is_read)
+
+        return Response({"action": action, "count": count}, status=status.HTTP_200_OK)
+
+
 class AdminNotificationListView(APIView):
     """
     API endpoint for admin to list all notifications
@@ -479,6 +518,8 @@ class AdminCreateNotificationView(APIView):
     API endpoint for admin to create notifications for users
     """
     permission_classes = [IsAuthenticated, IsAdminUserRole]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'admin_notification'
 
     @transaction_atomic
     def post(self, request):
@@ -546,6 +587,8 @@ class UserSearchView(APIView):
     API endpoint to search for users
     """
     permission_classes = [IsAuthenticated, IsAdminUserRole]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'user_search'
     pagination_class = StandardResultsSetPagination
 
     def get(self, request):
@@ -567,3 +610,113 @@ class UserSearchView(APIView):
         serializer = AdminUserSerializer(paginated_users, many=True)
 
         return paginator.get_paginated_response(serializer.data)
+
+
+class CandidateSearchView(APIView):
+    """
+    API endpoint to find job seekers by skill, matching all or any of the given skills
+    """
+    permission_classes = [IsAuthenticated, IsEmployerOrAdmin]
+    pagination_class = StandardResultsSetPagination
+
+    def get(self, request):
+        names = [name for name in request.query_params.get('skills', '').split(',') if name.strip()]
+        if not names:
+            return Response({
+                "error": "Query parameter 'skills' is required (comma-separated)"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        match = request.query_params.get('match', 'all')
+        if match not in ('all', 'any'):
+            return Response({"error": "match must be 'all' or 'any'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        resolved = resolve_skills(names)
+        skill_ids = set(resolved.values())
+        unknown = {canonical_key(name) for name in names} - set(resolved)
+
+        if not skill_ids or (match == 'all' and unknown):
+            profiles = UserProfile.objects.none()
+        else:
+            # One pass over the (skill, profile) index, grouped per profile; HAVING for 'all'
+            profiles = UserProfile.objects.filter(
+                profile_skills__skill_id__in=skill_ids,
+                user__role='job_seeker',
+                user__is_active=True,
+            ).annotate(matched_skills=Count('profile_skills')).select_related('user')
+            if match == 'all':
+                profiles = profiles.filter(matched_skills=len(skill_ids))
+            profiles = profiles.order_by('-matched_skills', 'user_id')
+
+        paginator = self.pagination_class()
+        paginated_profiles = paginator.paginate_queryset(profiles, request)
+        serializer = CandidateSerializer(paginated_profiles, many=True, context={'request': request})
+
+        return paginator.get_paginated_response(serializer.data)
+
+
+class AdminAuthEventListView(APIView):
+    """
+    API endpoint for admin to query the login/logout/refresh event log
+    """
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+    pagination_class = StandardResultsSetPagination
+
+    def get(self, request):
+        # Include events still buffered in this process
+        auth_events.flush()
+
+        paginator = self.pagination_class()
+        events = AuthEvent.objects.all()
+
+        user_id = request.query_params.get('user_id')
+        if user_id:
+            if not user_id.isdigit():
+                return Response({"error": "user_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            events = events.filter(user_id=int(user_id))
+
+        event_type = request.query_params.get('event_type')
+        if event_type:
+            event_types = {name: value for value, name in AuthEvent.EVENT_TYPES}
+            if event_type not in event_types:
+                return Response({
+                    "error": f"event_type must be one of {', '.join(event_types)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            events = events.filter(event_type=event_types[event_type])
+
+        # Time range filters (ISO 8601)
+        for param, lookup in (('since', 'created_at__gte'), ('until', 'created_at__lt')):
+            value = request.query_params.get(param)
+            if value:
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    return Response({
+                        "error": f"{param} must be an ISO 8601 datetime"
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                events = events.filter(**{lookup: parsed})
+
+        paginated_events = paginator.paginate_queryset(events, request)
+        serializer = AuthEventSerializer(paginated_events, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
+
+
+class AdminDatabaseConnectionsView(APIView):
+    """
+    API endpoint for admin to inspect database connection settings and pool metrics
+    """
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def get(self, request):
+        databases = {}
+        for alias in connections:
+            connection = connections[alias]
+            pool = getattr(connection, 'pool', None)
+            databases[alias] = {
+                'vendor': connection.vendor,
+                'pooled': pool is not None,
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'conn_health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+                # Counters such as requests_waiting, connections_num and usage_ms
+                'pool': pool.get_stats() if pool is not None else None,
+            }
+        return Response(databases, status=status.HTTP_200_OK)
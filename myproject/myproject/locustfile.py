@@ -1,60 +1,192 @@
+"""
+Locust scenarios for the job portal API.
+
+Seed data first with `python manage.py seed_load_data`, which writes the
+manifest of accounts and job ids these users log in with. Authentication uses
+the access_token/refresh_token cookies set by /api/main/auth/login/, which the
+Locust client session keeps between requests.
+
+Run headless and record results with `python manage.py run_load_test`.
+
+Every simulated user logs in from the same address, so the login rate limit
+(RATE_LIMIT_LOGIN, 10/min per IP by default) would throttle all but the first
+few. Start the target server with RATE_LIMIT_ENABLED=False, or a login limit
+above --users. Users that are throttled anyway wait out Retry-After and retry.
+"""
+
+import functools
+import json
+import os
+import random
+import time
+from pathlib import Path
+
 from locust import HttpUser, task, between
 
+MANIFEST_PATH = os.getenv(
+    'LOADTEST_MANIFEST',
+    str(Path(__file__).resolve().parent.parent / 'benchmarks' / 'manifest.json')
+)
 
-class WebsiteUser(HttpUser):
+
+@functools.cache
+def load_manifest():
+    """
+    Read the manifest on first use rather than at import, so `locust --help` and the like
+    work without seeded data and a missing file gets an actionable message.
+    """
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise RuntimeError(
+            f"Load-test manifest {MANIFEST_PATH} not found; run `python manage.py seed_load_data` "
+            f"first or point LOADTEST_MANIFEST at it"
+        ) from None
+
+
+class PortalUser(HttpUser):
+    abstract = True
     wait_time = between(1, 3)  # simulate user think-time
 
+    LOGIN_ATTEMPTS = 5
+
     def on_start(self):
-        # Login and store token for authenticated requests
-        login_data = {
-            "email": "testuser@example.com",
-            "password": "testpassword"
-        }
-        response = self.client.post("/api/login/", json=login_data)
-        if response.status_code == 200:
-            token = response.json().get("access")
-            self.client.headers.update({"Authorization": f"Bearer {token}"})
-        else:
-            print("Login failed:", response.text)
-
-    @task
+        self.manifest = load_manifest()
+
+    def login(self, email):
+        for attempt in range(self.LOGIN_ATTEMPTS):
+            with self.client.post("/api/main/auth/login/", json={
+                "email": email,
+                "password": self.manifest['password'],
+            }, name="/api/main/auth/login/", catch_response=True) as response:
+                if response.status_code == 429 and attempt + 1 < self.LOGIN_ATTEMPTS:
+                    # Rate limited (see the module docstring): not a failure, wait and retry
+                    response.success()
+                    retry_after = float(response.headers.get('Retry-After', 1))
+                elif response.status_code != 200 or 'access_token' not in self.client.cookies:
+                    response.failure(f"Login failed for {email}: {response.text}")
+                    return
+                else:
+                    return
+            # Locust patches time.sleep to yield to the other users
+            time.sleep(retry_after)
+
+    def random_job_id(self):
+        return random.choice(self.manifest['job_ids'])
+
+
+class JobSeekerUser(PortalUser):
+    weight = 6
+
+    def on_start(self):
+        super().on_start()
+        self.login(random.choice(self.manifest['seekers']))
+
+    @task(3)
     def view_profile(self):
-        self.client.get("/api/profile/")
-
-    @task
-    def change_password(self):
-        self.client.post("/api/change-password/", json={
-            "old_password": "testpassword",
-            "new_password": "newtestpassword",
-            "confirm_password": "newtestpassword"
-        })
+        self.client.get("/api/main/users/profile/")
 
-    @task
+    @task(4)
+    def list_notifications(self):
+        self.client.get("/api/main/notifications/?is_read=false")
+
+    @task(2)
     def list_institutions(self):
-        self.client.get("/api/job/institutions/")
+        self.client.get("/api/institutions/institutions/")
 
-    @task
-    def create_institution(self):
-        self.client.post("/api/job/institutions/", json={
-            "name": "Test Institution",
-            "description": "A demo institution"
-        })
+    @task(2)
+    def list_own_applications(self):
+        self.client.get("/api/institutions/job-applications/", name="/api/institutions/job-applications/ [list]")
 
-    @task
-    def list_jobs(self):
-        self.client.get("/api/job/jobs/")
+    @task(3)
+    def view_job(self):
+        # Seekers may open active jobs only; their views are what job analytics counts
+        job_id = random.choice(self.manifest.get('active_job_ids') or self.manifest['job_ids'])
+        self.client.get(f"/api/institutions/jobs/{job_id}/", name="/api/institutions/jobs/<id>/")
 
-    @task
+    @task(1)
     def apply_for_job(self):
-        self.client.post("/api/job/job-applications/", json={
-            "job": 1,
+        with self.client.post("/api/institutions/job-applications/", json={
+            "job_id": self.random_job_id(),
             "cover_letter": "I am interested in this position."
+        }, name="/api/institutions/job-applications/ [apply]", catch_response=True) as response:
+            # Re-applying to the same job is an expected validation error, not a failure
+            if response.status_code == 400 and 'already applied' in response.text:
+                response.success()
+
+    @task(1)
+    def mark_notifications_read(self):
+        self.client.post("/api/main/notifications/mark-all-read/")
+
+
+class EmployerUser(PortalUser):
+    weight = 3
+
+    def on_start(self):
+        super().on_start()
+        employer = random.choice(self.manifest['employers'])
+        self.institution_id = employer['institution_id']
+        # Employers open their own jobs, inactive ones included
+        self.job_ids = employer['job_ids'] or self.manifest['job_ids']
+        self.login(employer['email'])
+
+    @task(4)
+    def list_jobs(self):
+        self.client.get("/api/institutions/jobs/?status=active")
+
+    @task(2)
+    def search_jobs(self):
+        self.client.get("/api/institutions/jobs/?search=Engineer", name="/api/institutions/jobs/?search=")
+
+    @task(2)
+    def view_job(self):
+        job_id = random.choice(self.job_ids)
+        self.client.get(f"/api/institutions/jobs/{job_id}/", name="/api/institutions/jobs/<id>/")
+
+    @task(2)
+    def list_institution_jobs(self):
+        self.client.get(
+            f"/api/institutions/jobs/?institution_id={self.institution_id}",
+            name="/api/institutions/jobs/?institution_id="
+        )
+
+    @task(1)
+    def post_job(self):
+        self.client.post("/api/institutions/jobs/", json={
+            "title": "Load Test Engineer",
+            "description": "Posted by the load test.",
+            "location": "Kathmandu",
+            "salary_range": "NPR 50,000 - 80,000 per month",
+            "job_type": "full_time",
+            "institution_id": self.institution_id,
         })
 
-    @task
-    def list_users_admin(self):
-        self.client.get("/api/admin/users/")
+    @task(2)
+    def list_notifications(self):
+        self.client.get("/api/main/notifications/")
+
+
+class AdminUser(PortalUser):
+    weight = 1
+
+    def on_start(self):
+        super().on_start()
+        self.login(random.choice(self.manifest['admins']))
+
+    @task(3)
+    def list_users(self):
+        self.client.get("/api/main/admin/users/")
+
+    @task(2)
+    def view_user_detail(self):
+        user_id = random.choice(self.manifest['user_ids'])
+        self.client.get(f"/api/main/admin/users/{user_id}/", name="/api/main/admin/users/<id>/")
+
+    @task(1)
+    def search_users(self):
+        self.client.get("/api/main/admin/users/search/?q=seeker-1", name="/api/main/admin/users/search/")
 
-    @task
-    def view_user_detail_admin(self):
-        self.client.get("/api/admin/users/1/")  # simulate viewing user with ID 1
+    @task(2)
+    def list_all_notifications(self):
+        self.client.get("/api/main/admin/notifications/?is_read=false")
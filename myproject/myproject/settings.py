@@ -8,6 +8,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -40,9 +41,12 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.SamplingProfilerMiddleware',
     'main.middleware.RequestLogMiddleware',
+    'main.middleware.DeferredSignalsMiddleware',
     'main.middleware.APIExceptionMiddleware',
 ]
 
@@ -75,6 +79,60 @@ DATABASES = {
     )
 }
 
+# Shared cache (Redis) when REDIS_URL is set, otherwise a per-process in-memory cache
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica1/db,postgres://replica2/db
+# (two local SQLite files work too). Safe requests read from a random replica
+# unless the client wrote within REPLICA_PIN_SECONDS; see main.db_routers.
+DATABASE_REPLICA_URLS = [url for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url]
+for index, url in enumerate(DATABASE_REPLICA_URLS):
+    DATABASES[f'replica_{index}'] = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    DATABASES[f'replica_{index}']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['main.db_routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+REPLICA_PIN_STORE = os.getenv('REPLICA_PIN_STORE', 'cookie')  # 'cookie' or 'cache'
+
+# Connection pooling for PostgreSQL (requires psycopg[pool]). Each process keeps
+# between min_size and max_size connections shared by all its threads instead of
+# one persistent connection per thread; connections idle for max_idle seconds are
+# closed and checkouts wait at most timeout seconds.
+DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'False') == 'True'
+DB_POOL_OPTIONS = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+}
+if DB_POOL_ENABLED:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            database.setdefault('OPTIONS', {})['pool'] = dict(DB_POOL_OPTIONS)
+            # The pool owns connection lifetime and only hands out healthy connections
+            database['CONN_MAX_AGE'] = 0
+            database['CONN_HEALTH_CHECKS'] = False
+
+# Work factor of the default password hasher. Changing the profile rehashes
+# each user's password in the background on their next login.
+PASSWORD_HASHING_PROFILES = {
+    'strong': 1_000_000,   # Django's default for PBKDF2-SHA256
+    'balanced': 600_000,   # OWASP minimum for PBKDF2-SHA256
+    'testing': 1_000,      # local development and load tests only
+}
+PASSWORD_HASHING_PROFILE = os.getenv('PASSWORD_HASHING_PROFILE', 'strong')
+PASSWORD_HASHERS = [
+    'main.hashers.ProfiledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -107,15 +165,21 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'main.views.StandardResultsSetPagination',
     'PAGE_SIZE': 10,
     'EXCEPTION_HANDLER': 'main.utils.custom_exception_handler',
+    # Proxies in front of the app; throttles read the client IP from X-Forwarded-For only
+    # when this is set, since clients can send any X-Forwarded-For themselves
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
 }
 
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:8000,http://127.0.0.1:8000').split(',')
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880
 
 AUTHENTICATION_BACKENDS = (
+    'main.backends.EmailBackend',
     'social_core.backends.google.GoogleOAuth2',
     'django.contrib.auth.backends.ModelBackend',
 )
@@ -184,6 +248,85 @@ LOGGING = {
               'propagate': False,
           },
 }
+# Serve the hottest GET endpoints with async views (main.async_views); enable when running under ASGI
+ASYNC_VIEWS_ENABLED = os.getenv('ASYNC_VIEWS_ENABLED', 'False') == 'True'
+
+# Background tasks (main.tasks.run_in_background)
+BACKGROUND_TASK_WORKERS = int(os.getenv('BACKGROUND_TASK_WORKERS', '4'))
+BACKGROUND_TASKS_EAGER = os.getenv('BACKGROUND_TASKS_EAGER', 'False') == 'True'
+
+# Auth event log (main.auth_events)
+AUTH_EVENT_BATCH_SIZE = int(os.getenv('AUTH_EVENT_BATCH_SIZE', '100'))
+AUTH_EVENT_FLUSH_INTERVAL = float(os.getenv('AUTH_EVENT_FLUSH_INTERVAL', '5'))
+AUTH_EVENT_RETENTION_DAYS = int(os.getenv('AUTH_EVENT_RETENTION_DAYS', '90'))
+
+# Idempotency-Key replay store (main.idempotency): how long a stored response is replayed,
+# and how long a key stays claimed by a request that never finishes
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(24 * 60 * 60)))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '60'))
+
+# Token-bucket rate limits per throttle_scope (main.throttling), as requests/period
+# (s, min, hour, day); the bucket holds that many requests. Anonymous requests are
+# limited per IP, authenticated ones per user. The 'local' store counts per process, so
+# every worker multiplies the limit; 'cache' shares the count through the cache and is
+# the default when REDIS_URL is set.
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'cache' if REDIS_URL else 'local')  # 'local' or 'cache'
+RATE_LIMITS = {
+    'login': os.getenv('RATE_LIMIT_LOGIN', '10/min'),
+    'register': os.getenv('RATE_LIMIT_REGISTER', '20/hour'),
+    'user_search': os.getenv('RATE_LIMIT_USER_SEARCH', '60/min'),
+    'admin_notification': os.getenv('RATE_LIMIT_ADMIN_NOTIFICATION', '10/min'),
+}
+
+# Buffered job view counters (institutions.analytics)
+JOB_VIEW_BATCH_SIZE = int(os.getenv('JOB_VIEW_BATCH_SIZE', '500'))
+JOB_VIEW_FLUSH_INTERVAL = float(os.getenv('JOB_VIEW_FLUSH_INTERVAL', '10'))
+
+# Job expiry (institutions.management.commands.expire_jobs)
+JOB_DEFAULT_TTL_DAYS = int(os.getenv('JOB_DEFAULT_TTL_DAYS', '60'))
+
+# NPR value of one unit of each currency a salary may be quoted in, used to put parsed
+# salaries on a common monthly NPR scale for filtering and ordering (institutions.salary).
+# Salaries in other currencies keep their parsed currency but get no normalized amount.
+SALARY_EXCHANGE_RATES = {
+    'NPR': 1.0,
+    'USD': float(os.getenv('SALARY_RATE_USD', '133')),
+    'INR': float(os.getenv('SALARY_RATE_INR', '1.6')),
+}
+
+# Days to keep notifications of each type; types not listed are kept forever.
+# Applied by `python manage.py prune_notifications`.
+NOTIFICATION_RETENTION_DAYS = {
+    'account': 90,
+    'profile': 30,
+    'system': 90,
+    'job': 180,
+    'job_application': 180,
+    'application': 180,
+    'institution': 180,
+}
+NOTIFICATION_ARCHIVE_DIR = BASE_DIR / 'archive' / 'notifications'
+# Seconds during which repeated events (e.g. applications to one job) fold into one digest notification
+NOTIFICATION_COALESCE_WINDOW = int(os.getenv('NOTIFICATION_COALESCE_WINDOW', '3600'))
+
+# Sampling profiler (main.middleware.SamplingProfilerMiddleware)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', '0.005'))
+PROFILING_MAX_CONCURRENT = int(os.getenv('PROFILING_MAX_CONCURRENT', '2'))
+PROFILING_HEADER = 'X-Profile'
+PROFILING_OUTPUT_DIR = BASE_DIR / 'logs' / 'profiles'
+
+# Micro-benchmarks (main.benchmarking)
+BENCHMARK_OUTPUT = os.getenv('BENCHMARK_OUTPUT')
+BENCHMARK_BASELINE = os.getenv('BENCHMARK_BASELINE')
+BENCHMARK_REGRESSION_THRESHOLD = float(os.getenv('BENCHMARK_REGRESSION_THRESHOLD', '0.25'))
+
+# How long a user's token version stays cached (main.tokens). With the in-memory
+# cache each process only sees revocations from other processes after this delay.
+TOKEN_VERSION_CACHE_TIMEOUT = int(os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', '300' if REDIS_URL else '30'))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=3),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1)